@@ -0,0 +1,71 @@
+"""
+Governor vs. a throttling provider.
+
+Fires a burst of model calls at a FakeChatModel that returns 429s above a
+fixed concurrency, once ungoverned and once through AdaptiveGovernor.
+Callers retry on 429 the way a client would, so the ungoverned run shows
+how retries amplify load.
+
+    python benchmarks/governor_throttle.py --requests 200 --capacity 6
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from pmm_agent.fakes import FakeChatModel, FakeRateLimitError
+from pmm_agent.governor import AdaptiveGovernor, Priority
+
+
+async def call_with_retries(model, governor, priority, retries: int = 5):
+    for attempt in range(retries + 1):
+        try:
+            if governor is None:
+                return await model.ainvoke("hello")
+            async with governor.slot(priority):
+                return await model.ainvoke("hello")
+        except FakeRateLimitError:
+            await asyncio.sleep(0.01 * 2 ** attempt)
+    return None
+
+
+async def run(requests: int, capacity: int, latency: float, governed: bool) -> dict:
+    model = FakeChatModel(max_concurrency=capacity, latency=latency)
+    governor = AdaptiveGovernor(initial_limit=capacity * 4, cooldown_seconds=latency) if governed else None
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        call_with_retries(model, governor, Priority.BATCH if i % 2 else Priority.INTERACTIVE)
+        for i in range(requests)
+    ])
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "governed": governed,
+        "succeeded": sum(r is not None for r in results),
+        "upstream_attempts": model.calls + model.throttled,
+        "throttled": model.throttled,
+        "seconds": round(elapsed, 3),
+    }
+    if governor is not None:
+        report["governor"] = governor.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    reports = [
+        asyncio.run(run(args.requests, args.capacity, args.latency, governed))
+        for governed in (False, True)
+    ]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Hedged streams vs. a long-tailed provider.
+
+Streams from a FakeChatModel whose first-token latency is usually fast
+but occasionally very slow, with and without a HedgePolicy, and reports
+time-to-first-token percentiles and how much extra load hedging cost.
+
+    python benchmarks/hedging.py --requests 400 --fast 0.05 --slow 1.0 --slow-fraction 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from pmm_agent.fakes import FakeChatModel, lognormal_latency, tail_latency
+from pmm_agent.hedging import HedgePolicy, hedged_stream, percentile
+
+
+async def one_stream(model, policy) -> float:
+    start = time.perf_counter()
+    stream = hedged_stream(policy, lambda: model.astream("hello")) if policy else model.astream("hello")
+    ttft = None
+    async for _ in stream:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+    return ttft
+
+
+async def run(args, hedged: bool) -> dict:
+    if args.distribution == "lognormal":
+        latency = lognormal_latency(args.fast, args.sigma)
+    else:
+        latency = tail_latency(args.fast, args.slow, args.slow_fraction)
+    model = FakeChatModel(responses=["one two three"], latency=latency)
+    policy = HedgePolicy(quantile=args.quantile, budget=args.budget, default_delay=args.fast * 4) if hedged else None
+
+    ttfts = []
+    for _ in range(args.requests // args.concurrency):
+        ttfts += await asyncio.gather(*[one_stream(model, policy) for _ in range(args.concurrency)])
+
+    report = {
+        "hedged": hedged,
+        "requests": len(ttfts),
+        "upstream_calls": model.calls,
+        "ttft_ms": {
+            f"p{int(q * 100)}": round(percentile(ttfts, q) * 1000, 1)
+            for q in (0.5, 0.95, 0.99)
+        },
+    }
+    if policy is not None:
+        report["hedging"] = policy.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--distribution", choices=["tail", "lognormal"], default="tail")
+    parser.add_argument("--fast", type=float, default=0.05, help="typical (or median) first-token latency")
+    parser.add_argument("--slow", type=float, default=1.0, help="tail latency for the 'tail' distribution")
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--sigma", type=float, default=0.8, help="spread for the 'lognormal' distribution")
+    parser.add_argument("--quantile", type=float, default=0.9)
+    parser.add_argument("--budget", type=float, default=0.1)
+    args = parser.parse_args()
+
+    reports = [asyncio.run(run(args, hedged)) for hedged in (False, True)]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
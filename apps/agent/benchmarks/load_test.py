@@ -0,0 +1,206 @@
+"""
+End-to-end load test against a scripted fake model.
+
+Starts the FastAPI server in-process on a local port with `ChatAnthropic`
+swapped for FakeChatModel, then drives `/chat` and `/chat/stream` at
+increasing concurrency. Each request is a fresh session: the fake calls
+a tool on the user turn, then streams a scripted answer once the tool
+result is back.
+
+Reports requests/sec, time-to-first-token p50/p95/p99, server event-loop
+lag and RSS growth per session, and writes everything to JSON so runs on
+different commits can be diffed.
+
+    python benchmarks/load_test.py --levels 1,8,32,64 --requests 200
+    python benchmarks/load_test.py --latency 0.2 --token-delay 0.01 --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from pmm_agent import server
+from pmm_agent.fakes import FakeChatModel
+from pmm_agent.hedging import percentile
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+ANSWER = " ".join(
+    ["Here is a positioning draft for your product, grounded in the checklist above."] * 8
+)
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux; fall back to peak RSS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _Server(uvicorn.Server):
+    """uvicorn server on its own thread that remembers its event loop."""
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    async def startup(self, sockets=None):
+        self.loop = asyncio.get_running_loop()
+        await super().startup(sockets)
+
+    def install_signal_handlers(self):
+        pass
+
+
+async def _lag_probe(samples: list[float], stop: threading.Event, interval: float = 0.01):
+    """Runs on the server loop: how late each `sleep(interval)` wakes up."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def _one_request(client: httpx.AsyncClient, endpoint: str, i: int) -> float | None:
+    """Send one turn; returns time to first token (None on error)."""
+    body = {"message": f"Help me create a positioning statement for product #{i}"}
+    start = time.perf_counter()
+    if endpoint == "/chat":
+        response = await client.post("/chat", json=body)
+        return time.perf_counter() - start if response.status_code == 200 else None
+
+    ttft = None
+    async with client.stream("POST", "/chat/stream", json=body) as response:
+        if response.status_code != 200:
+            return None
+        async for line in response.aiter_lines():
+            if ttft is None and line.startswith("data: ") and '"text"' in line:
+                ttft = time.perf_counter() - start
+    return ttft
+
+
+async def _run_level(base_url: str, endpoint: str, concurrency: int, requests: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        queue = iter(range(requests))
+        ttfts: list[float] = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for i in queue:
+                ttft = await _one_request(client, endpoint, i)
+                if ttft is None:
+                    errors += 1
+                else:
+                    ttfts.append(ttft)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(requests / elapsed, 2),
+        "ttft_ms": {
+            f"p{int(q * 100)}": round(percentile(ttfts, q) * 1000, 2) if ttfts else None
+            for q in (0.5, 0.95, 0.99)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", default="1,8,32,64", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per level and endpoint")
+    parser.add_argument("--endpoints", default="/chat,/chat/stream")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake first-token latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="fake delay between tokens (s)")
+    parser.add_argument("--tool", default="create_checklist", help="tool the fake calls on each turn ('' for none)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    fake = FakeChatModel(
+        responses=[ANSWER],
+        tool_calls=[{"name": args.tool, "args": {"task_type": "positioning", "context": "bench"}}] if args.tool else None,
+        latency=args.latency,
+        token_delay=args.token_delay,
+    )
+    server.set_model(fake)
+
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+    uv = _Server(config)
+    thread = threading.Thread(target=uv.run, daemon=True)
+    thread.start()
+    while not uv.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for endpoint in args.endpoints.split(","):
+        for concurrency in (int(c) for c in args.levels.split(",")):
+            lag: list[float] = []
+            stop = threading.Event()
+            probe = asyncio.run_coroutine_threadsafe(_lag_probe(lag, stop), uv.loop)
+
+            sessions_before, rss_before = len(server.sessions), rss_bytes()
+            level = asyncio.run(_run_level(base_url, endpoint, concurrency, args.requests))
+            new_sessions = len(server.sessions) - sessions_before
+
+            stop.set()
+            probe.result(timeout=5)
+            level["event_loop_lag_ms"] = {
+                "p50": round(percentile(lag, 0.5) * 1000, 2) if lag else None,
+                "p99": round(percentile(lag, 0.99) * 1000, 2) if lag else None,
+                "max": round(max(lag) * 1000, 2) if lag else None,
+            }
+            level["rss_growth_per_session_kb"] = (
+                round((rss_bytes() - rss_before) / new_sessions / 1024, 2) if new_sessions else None
+            )
+            results.append(level)
+            print(json.dumps(level), file=sys.stderr)
+
+    uv.should_exit = True
+    thread.join(timeout=10)
+
+    commit = git_commit()
+    report = {
+        "benchmark": "load_test",
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": vars(args),
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
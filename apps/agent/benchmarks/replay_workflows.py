@@ -0,0 +1,141 @@
+"""
+Replay recorded PMM workflows against the server.
+
+Runs each quick action from `config/domains/pmm.json` as a fresh
+`/chat/stream` session. With `--record`, model calls go to Claude (or the
+scripted fake with `--fake`) and are written to a cassette. Without it,
+the cassette is replayed, at recorded speed or with `--speed 0` as fast
+as possible, and per-workflow TTFT and turn time are reported as JSON.
+
+    ANTHROPIC_API_KEY=... python benchmarks/replay_workflows.py --record
+    python benchmarks/replay_workflows.py --speed 0 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from load_test import RESULTS_DIR, _Server, git_commit
+
+from pmm_agent import server
+from pmm_agent.cassettes import Cassette, RecordingChatModel, ReplayChatModel
+from pmm_agent.fakes import FakeChatModel
+from pmm_agent.hedging import percentile
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_CASSETTE = Path(__file__).parent / "cassettes" / "pmm-quick-actions.jsonl.gz"
+
+
+def quick_actions() -> list[dict]:
+    config = json.loads((REPO_ROOT / "config" / "domains" / "pmm.json").read_text())
+    return config["quick_actions"]
+
+
+async def _run_workflow(client: httpx.AsyncClient, prompt: str) -> dict:
+    start = time.perf_counter()
+    ttft = None
+    events = 0
+    async with client.stream("POST", "/chat/stream", json={"message": prompt, "cache": False}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            events += 1
+            if ttft is None and '"text"' in line:
+                ttft = time.perf_counter() - start
+    return {"ttft": ttft, "seconds": time.perf_counter() - start, "events": events}
+
+
+async def _run_all(base_url: str, actions: list[dict], repeat: int) -> dict:
+    results: dict[str, list[dict]] = {a["id"]: [] for a in actions}
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        for _ in range(repeat):
+            for action in actions:
+                results[action["id"]].append(await _run_workflow(client, action["prompt"]))
+    return results
+
+
+def _summary(runs: list[dict]) -> dict:
+    ttfts = [r["ttft"] for r in runs if r["ttft"] is not None]
+    seconds = [r["seconds"] for r in runs]
+    return {
+        "runs": len(runs),
+        "events": runs[0]["events"] if runs else 0,
+        "ttft_ms_p50": round(percentile(ttfts, 0.5) * 1000, 2) if ttfts else None,
+        "turn_ms_p50": round(percentile(seconds, 0.5) * 1000, 2),
+        "turn_ms_p95": round(percentile(seconds, 0.95) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cassette", default=str(DEFAULT_CASSETTE))
+    parser.add_argument("--record", action="store_true", help="record a new cassette instead of replaying")
+    parser.add_argument("--fake", action="store_true", help="record the scripted fake model instead of Claude")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (0 = as fast as possible)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of every workflow")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/replay-<commit>.json)")
+    args = parser.parse_args()
+
+    cassette_path = Path(args.cassette)
+    if args.record:
+        cassette_path.parent.mkdir(parents=True, exist_ok=True)
+        cassette_path.unlink(missing_ok=True)
+        inner = (
+            FakeChatModel(
+                responses=["Here is a first draft based on the checklist above."],
+                tool_calls=[{"name": "create_checklist", "args": {"task_type": "launch", "context": "replay"}}],
+                latency=0.2,
+                token_delay=0.01,
+            )
+            if args.fake
+            else server.llm
+        )
+        model = RecordingChatModel(inner=inner, cassette=Cassette(str(cassette_path)), model=inner.model)
+        server.set_model(model)
+        repeat = 1
+    else:
+        model = ReplayChatModel.load(str(cassette_path), speed=args.speed, cycle=True)
+        server.set_model(model)
+        repeat = args.repeat
+
+    uv = _Server(uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=uv.run, daemon=True)
+    thread.start()
+    while not uv.started:
+        time.sleep(0.05)
+
+    actions = quick_actions()
+    runs = asyncio.run(_run_all(f"http://127.0.0.1:{args.port}", actions, repeat))
+    uv.should_exit = True
+    thread.join(timeout=10)
+
+    if args.record:
+        model.cassette.close()
+        print(f"Recorded {model.cassette.calls} model calls to {cassette_path}")
+        return
+
+    report = {
+        "benchmark": "replay_workflows",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": vars(args),
+        "unmatched_requests": model.misses,
+        "workflows": {action_id: _summary(r) for action_id, r in runs.items()},
+    }
+    print(json.dumps(report["workflows"], indent=2), file=sys.stderr)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"replay-{report['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Micro-benchmarks for the tool layer.
+
+Covers every tool in `pmm_agent.tools.ALL_TOOLS`:
+
+- Template tools (intake, research, planning, risk): render throughput
+  with every string argument at several sizes.
+- `fetch_url`: against a local HTTP server with varying page sizes and
+  response latencies.
+- LangChain `@tool` overhead: `tool.invoke(args)` vs calling the wrapped
+  function directly.
+
+Results are written as JSON. Save one run as the baseline, then use
+`--check` on later runs to fail (exit 1) if anything got slower than the
+threshold allows.
+
+    python benchmarks/tools_bench.py --write-baseline
+    python benchmarks/tools_bench.py --check --threshold 1.25
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from pmm_agent.tools import ALL_TOOLS, fetch_url
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCH_DIR / "results" / "tools-baseline.json"
+
+INPUT_SIZES = {"small": 20, "medium": 1_000, "large": 20_000}
+PAGE_SIZES = {"1kb": 1_000, "100kb": 100_000, "1mb": 1_000_000}
+PAGE_LATENCIES = {"0ms": 0.0, "50ms": 0.05}
+
+ALL_TOOLS_BY_NAME = {t.name: t for t in ALL_TOOLS}
+
+
+def measure(fn, min_time: float = 0.2, min_runs: int = 5) -> dict:
+    """Call `fn` repeatedly for at least `min_time` seconds."""
+    fn()  # warm up
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time and runs >= min_runs:
+            break
+    return {
+        "runs": runs,
+        "us_per_call": round(elapsed / runs * 1e6, 2),
+        "calls_per_sec": round(runs / elapsed, 1),
+    }
+
+
+def string_args(tool, size: int) -> dict:
+    """Fill every argument of a tool's schema with a string of `size` chars."""
+    text = ("Positioning for mid-market RevOps teams. " * (size // 40 + 1))[:size]
+    return {name: text for name in tool.args}
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Serves /?size=N&delay=S with N bytes of HTML after S seconds."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        size = int(query.get("size", ["1000"])[0])
+        delay = float(query.get("delay", ["0"])[0])
+        if delay:
+            time.sleep(delay)
+        body = ("<p>Competitor messaging and pricing.</p>" * (size // 40 + 1))[:size].encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_templates(min_time: float) -> dict:
+    results = {}
+    for tool in ALL_TOOLS:
+        if tool is fetch_url:
+            continue
+        for label, size in INPUT_SIZES.items():
+            args = string_args(tool, size)
+            output_bytes = len(tool.func(**args))
+            result = measure(lambda: tool.func(**args), min_time)
+            result["output_bytes"] = output_bytes
+            results[f"render/{tool.name}/{label}"] = result
+
+    # The catalog checklists take a different path from custom ones
+    for task_type in ("launch", "positioning", "competitive", "messaging"):
+        args = {"task_type": task_type, "context": "bench"}
+        results[f"render/create_checklist/{task_type}"] = measure(
+            lambda: ALL_TOOLS_BY_NAME["create_checklist"].func(**args), min_time
+        )
+    return results
+
+
+def bench_fetch_url(min_time: float) -> dict:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+
+    results = {}
+    try:
+        for size_label, size in PAGE_SIZES.items():
+            for latency_label, delay in PAGE_LATENCIES.items():
+                url = f"http://127.0.0.1:{port}/?size={size}&delay={delay}"
+                results[f"fetch_url/{size_label}/{latency_label}"] = measure(
+                    lambda: fetch_url.func(url), min_time, min_runs=3
+                )
+    finally:
+        httpd.shutdown()
+    return results
+
+
+def bench_tool_overhead(min_time: float) -> dict:
+    results = {}
+    for name in ("create_positioning_statement", "create_checklist", "analyze_product"):
+        tool = ALL_TOOLS_BY_NAME[name]
+        args = string_args(tool, INPUT_SIZES["small"])
+        direct = measure(lambda: tool.func(**args), min_time)
+        wrapped = measure(lambda: tool.invoke(args), min_time)
+        results[f"overhead/{name}/direct"] = direct
+        results[f"overhead/{name}/invoke"] = wrapped
+        results[f"overhead/{name}/invoke"]["overhead_us"] = round(
+            wrapped["us_per_call"] - direct["us_per_call"], 2
+        )
+    return results
+
+
+def check(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Names of benchmarks that are more than `threshold`x slower than baseline."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        ratio = result["us_per_call"] / before["us_per_call"]
+        if ratio > threshold:
+            regressions.append(
+                f"{name}: {before['us_per_call']}us -> {result['us_per_call']}us ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per benchmark")
+    parser.add_argument("--only", choices=["render", "fetch_url", "overhead"])
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--write-baseline", action="store_true", help="save results as the baseline")
+    parser.add_argument("--check", action="store_true", help="compare against the baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="max allowed slowdown ratio")
+    args = parser.parse_args()
+
+    suites = {
+        "render": bench_templates,
+        "fetch_url": bench_fetch_url,
+        "overhead": bench_tool_overhead,
+    }
+    results = {}
+    for name, suite in suites.items():
+        if args.only in (None, name):
+            results.update(suite(args.min_time))
+
+    for name, result in results.items():
+        print(f"{name:<55} {result['us_per_call']:>12.2f} us/call", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.write_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"Wrote baseline {baseline_path}")
+
+    if args.check:
+        regressions = check(results, json.loads(baseline_path.read_text()), args.threshold)
+        if regressions:
+            print("Slower than baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,10 @@ Creates configurable PMM agents with different capability modes.
 from typing import Literal
 
 from langchain_anthropic import ChatAnthropic
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.tools import BaseTool, StructuredTool
 from langgraph.prebuilt import create_react_agent
+from langgraph.types import interrupt
 
 from .prompts import (
     MAIN_SYSTEM_PROMPT,
@@ -23,15 +26,40 @@ from .tools import (
     ALL_TOOLS,
     HUMAN_APPROVAL_TOOLS,
 )
+from .tracing import TracingCallbackHandler, configure_tracing
 
 
 AgentMode = Literal["full", "intake", "research", "planning", "risk"]
 
 
+def _with_approval(tool: BaseTool) -> BaseTool:
+    """
+    A copy of `tool` that interrupts the graph for a human decision first.
+
+    Resume the thread with `Command(resume={"approved": bool, "note": str})`.
+    """
+
+    def run(**kwargs) -> str:
+        decision = interrupt({"tool": tool.name, "args": kwargs}) or {}
+        if not decision.get("approved"):
+            return (
+                f"Not approved by the reviewer. Note: {decision.get('note') or 'none'}. "
+                f"Do not call {tool.name} again unless the user asks."
+            )
+        return tool.invoke(kwargs)
+
+    return StructuredTool.from_function(
+        func=run, name=tool.name, description=tool.description, args_schema=tool.args_schema
+    )
+
+
 def create_pmm_agent(
     mode: AgentMode = "full",
     model_name: str = "claude-sonnet-4-20250514",
     with_subagents: bool = True,
+    model: BaseChatModel | None = None,
+    checkpointer=None,
+    tracing: bool = True,
 ):
     """
     Create a PMM agent with the specified capabilities.
@@ -45,6 +73,14 @@ def create_pmm_agent(
             - "risk": Risk assessment and validation
         model_name: Claude model to use
         with_subagents: Whether to include specialist subagents
+        model: Chat model to use instead of creating one from `model_name`,
+            e.g. a local fake for offline runs
+        checkpointer: LangGraph checkpointer. When given, HUMAN_APPROVAL_TOOLS
+            interrupt the thread (state saved, nothing left running) until it
+            is resumed with a decision
+        tracing: Attach a TracingCallbackHandler, so runs record agent, model
+            and tool spans when TRACE_EXPORTER is set. Turn off to pass one
+            per run instead, e.g. tagged with a session id
 
     Returns:
         Configured LangGraph agent
@@ -63,17 +99,23 @@ def create_pmm_agent(
         tools = RISK_TOOLS + RESEARCH_TOOLS
 
     # Initialize model
-    llm = ChatAnthropic(
+    llm = model or ChatAnthropic(
         model_name=model_name,
         max_tokens=8192,
     )
 
+    if checkpointer is not None:
+        tools = [_with_approval(t) if t.name in HUMAN_APPROVAL_TOOLS else t for t in tools]
+
     # Create base agent
     agent = create_react_agent(
         model=llm,
         tools=tools,
         prompt=MAIN_SYSTEM_PROMPT,
+        checkpointer=checkpointer,
     )
+    if tracing:
+        agent = agent.with_config(callbacks=[TracingCallbackHandler()])
 
     return agent
 
@@ -108,5 +150,6 @@ def create_launch_coordinator():
     )
 
 
-# Convenience exports
+# Convenience exports; this is the graph `langgraph dev` serves, so set up its exporter
+configure_tracing()
 agent = create_pmm_agent()
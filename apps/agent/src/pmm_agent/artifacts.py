@@ -0,0 +1,319 @@
+"""
+Content-Addressed Artifact Store.
+
+Deliverables (positioning statements, battlecards, launch plans, ...) are
+kept once, under the hash of their content, instead of living inline in
+every session history that produced them. The conversation holds a short
+reference with the artifact's title and section outline; the full text is
+only put back into context when the model calls `get_artifact` or a
+client fetches `/artifacts/{id}`.
+
+Identical deliverables (the same tool with the same arguments, from any
+session) share one artifact. A revision's id also covers its parent, so
+artifacts are only shared between identical revision histories and no
+session reaches another's earlier drafts through `parent`. With a
+directory set, each artifact is also written to `<dir>/<id>.json` exactly
+once and survives restarts.
+
+Revisions: an artifact put with a `parent` is the next revision of that
+document and is stored as a line delta against it (see `deltas`), with a
+full keyframe every `keyframe_interval` revisions so rebuilding any
+version applies a bounded number of deltas. Storage grows with the size
+of the edits rather than the number of revisions, and `diff()` gives the
+model just the change between two revisions.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from langchain_core.tools import StructuredTool
+
+from .deltas import apply_delta, delta_size, line_changes, make_delta, unified_diff
+from .tools.outputs import headings
+
+# Hex digits of the SHA-256 used as the artifact id
+ID_LENGTH = 16
+
+
+@dataclass(frozen=True)
+class Artifact:
+    id: str
+    kind: str
+    title: str
+    sections: tuple[str, ...]
+    size: int
+    created: float
+    parent: str | None = None
+    revision: int = 1
+    added: int = 0  # lines added since the parent revision
+    removed: int = 0
+    stored: int = 0  # characters actually stored: the size, or the delta's
+    depth: int = 0  # deltas to apply from the nearest keyframe
+
+    def reference(self) -> str:
+        """What the conversation holds in place of the artifact."""
+        outline = "; ".join(self.sections) or "no sections"
+        if self.parent is None:
+            return (
+                f"[artifact {self.id}] {self.title} ({self.kind}, {self.size} chars, stored). "
+                f"Sections: {outline}. "
+                f"Call get_artifact with this id for the full text."
+            )
+        return (
+            f"[artifact {self.id}] {self.title} ({self.kind} revision {self.revision}, "
+            f"{self.size} chars, stored; +{self.added}/-{self.removed} lines since "
+            f"{self.parent}). Sections: {outline}. "
+            f"Call diff_artifact with this id to see what changed, "
+            f"or get_artifact for the full text."
+        )
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["sections"] = list(self.sections)
+        return data
+
+
+def content_id(content: str, parent: str | None = None) -> str:
+    """Id of `content`, or of `content` as the revision following `parent`."""
+    if parent:
+        content = f"revision of {parent}\n{content}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:ID_LENGTH]
+
+
+def _title(content: str, kind: str) -> str:
+    for line in content.splitlines():
+        if line.startswith("## "):
+            return line[3:].strip()
+    return kind.replace("_", " ").title()
+
+
+class ArtifactStore:
+    """
+    Deduplicating, revision-aware artifact store.
+
+    Metadata for every artifact stays in memory, as do the stored forms
+    (keyframe text or delta) unless a directory is given. Rebuilt contents
+    are kept in an LRU of `cache_size` entries. Artifacts persisted by an
+    earlier process are picked up on first use.
+
+    Args:
+        directory: Where to persist artifacts, or None for memory only
+        cache_size: Full contents kept in memory
+        keyframe_interval: Store a full copy after this many deltas in a row
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        cache_size: int = 256,
+        keyframe_interval: int = 8,
+    ):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.keyframe_interval = keyframe_interval
+        self.artifacts: dict[str, Artifact] = {}
+        self._records: dict[str, str | list] = {}
+        self._contents: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.RLock()
+        self.deduplicated = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.directory, f"{artifact_id}.json")
+
+    def _cache(self, artifact_id: str, content: str) -> None:
+        self._contents[artifact_id] = content
+        self._contents.move_to_end(artifact_id)
+        while len(self._contents) > self.cache_size:
+            self._contents.popitem(last=False)
+
+    def _load(self, artifact_id: str) -> Artifact | None:
+        """Pick up an artifact persisted by an earlier process. Call with the lock held."""
+        if not self.directory or not artifact_id.isalnum():
+            return None
+        try:
+            with open(self._path(artifact_id), encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        record.pop("content", None)
+        record.pop("delta", None)
+        artifact = Artifact(**{**record, "sections": tuple(record["sections"])})
+        self.artifacts[artifact_id] = artifact
+        return artifact
+
+    def _record(self, artifact_id: str) -> str | list:
+        """Stored form of an artifact: its text for keyframes, else its delta."""
+        if not self.directory:
+            return self._records[artifact_id]
+        with open(self._path(artifact_id), encoding="utf-8") as f:
+            record = json.load(f)
+        return record["content"] if "content" in record else record["delta"]
+
+    def _store(self, artifact: Artifact, record: str | list) -> None:
+        if not self.directory:
+            self._records[artifact.id] = record
+            return
+        data = {**artifact.to_dict(), ("content" if isinstance(record, str) else "delta"): record}
+        path = self._path(artifact.id)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def put(self, kind: str, content: str, parent: str | None = None) -> Artifact:
+        """
+        Store `content` unless an identical artifact exists; returns its metadata.
+
+        With `parent` (the id of the previous revision of the same document)
+        the content is stored as a delta against it. Content identical to
+        the parent's returns the parent.
+        """
+        with self._lock:
+            previous = self.get(parent) if parent else None
+            if previous is not None and self.content(previous.id) == content:
+                self.deduplicated += 1
+                return previous
+            artifact_id = content_id(content, previous.id if previous else None)
+            existing = self.artifacts.get(artifact_id) or self._load(artifact_id)
+            if existing is not None:
+                self.deduplicated += 1
+                return existing
+            record: str | list = content
+            fields = {}
+            if previous is not None:
+                delta = make_delta(self.content(previous.id), content)
+                added, removed = line_changes(delta)
+                fields = {"parent": previous.id, "revision": previous.revision + 1,
+                          "added": added, "removed": removed}
+                small = delta_size(delta) < len(content) // 2
+                if small and previous.depth < self.keyframe_interval:
+                    record = delta
+                    fields["depth"] = previous.depth + 1
+            artifact = Artifact(
+                id=artifact_id,
+                kind=kind,
+                title=_title(content, kind),
+                sections=tuple(headings(content)),
+                size=len(content),
+                created=time.time(),
+                stored=len(record) if isinstance(record, str) else delta_size(record),
+                **fields,
+            )
+            self._store(artifact, record)
+            self.artifacts[artifact_id] = artifact
+            self._cache(artifact_id, content)
+        return artifact
+
+    def get(self, artifact_id: str) -> Artifact | None:
+        with self._lock:
+            return self.artifacts.get(artifact_id) or self._load(artifact_id)
+
+    def content(self, artifact_id: str) -> str | None:
+        """Full text of an artifact, rebuilt from its deltas if needed; None if unknown."""
+        with self._lock:
+            if self.get(artifact_id) is None:
+                return None
+            # Walk back to a cached version or a keyframe, then replay the deltas
+            deltas = []
+            current = artifact_id
+            while (text := self._contents.get(current)) is None:
+                record = self._record(current)
+                if isinstance(record, str):
+                    text = record
+                    break
+                deltas.append(record)
+                current = self.get(current).parent
+            for delta in reversed(deltas):
+                text = apply_delta(text, delta)
+            self._cache(artifact_id, text)
+            return text
+
+    def revisions(self, artifact_id: str) -> list[Artifact]:
+        """The revision chain ending at `artifact_id`, oldest first."""
+        chain = []
+        artifact = self.get(artifact_id)
+        while artifact is not None:
+            chain.append(artifact)
+            artifact = self.get(artifact.parent) if artifact.parent else None
+        return chain[::-1]
+
+    def diff(self, artifact_id: str, against: str | None = None) -> str | None:
+        """
+        Unified diff from `against` (default: the previous revision) to `artifact_id`.
+
+        Returns None if either artifact is unknown or there is no previous revision.
+        """
+        artifact = self.get(artifact_id)
+        against = against or (artifact.parent if artifact else None)
+        old = self.get(against) if against else None
+        if artifact is None or old is None:
+            return None
+        return unified_diff(
+            self.content(old.id),
+            self.content(artifact.id),
+            f"{old.id} (revision {old.revision})",
+            f"{artifact.id} (revision {artifact.revision})",
+        )
+
+    def stats(self) -> dict:
+        return {
+            "artifacts": len(self.artifacts),
+            "bytes": sum(a.size for a in self.artifacts.values()),
+            "stored_bytes": sum(a.stored for a in self.artifacts.values()),
+            "revisions": sum(1 for a in self.artifacts.values() if a.parent),
+            "cached": len(self._contents),
+            "deduplicated": self.deduplicated,
+        }
+
+
+def artifact_tools(store: ArtifactStore) -> list[StructuredTool]:
+    """The `get_artifact` and `diff_artifact` tools, reading from `store`."""
+
+    def get_artifact(artifact_id: str) -> str:
+        """
+        Retrieve the full text of a deliverable produced earlier in the conversation.
+
+        Deliverables appear in the conversation as "[artifact <id>]" references
+        listing their sections. Only fetch one when you need its exact text,
+        for example to quote it or rework it from scratch.
+
+        Args:
+            artifact_id: The id from the "[artifact <id>]" reference
+
+        Returns:
+            The deliverable as markdown
+        """
+        content = store.content(artifact_id.strip())
+        if content is None:
+            return f"Error: unknown artifact {artifact_id}"
+        return content
+
+    def diff_artifact(artifact_id: str, against_id: str = "") -> str:
+        """
+        Show only what changed in a revised deliverable, as a unified diff.
+
+        Use this instead of get_artifact when reviewing or summarizing
+        changes between revisions.
+
+        Args:
+            artifact_id: The revision to inspect
+            against_id: Revision to compare with (defaults to the previous one)
+
+        Returns:
+            A unified diff from the older revision to this one
+        """
+        diff = store.diff(artifact_id.strip(), against_id.strip() or None)
+        if diff is None:
+            return f"Error: no earlier revision to compare {artifact_id} with"
+        return diff or "No changes."
+
+    return [
+        StructuredTool.from_function(get_artifact),
+        StructuredTool.from_function(diff_artifact),
+    ]
@@ -0,0 +1,309 @@
+"""
+Offline Batch Runs.
+
+Runs the agent over a JSONL file of products without the server, e.g. a
+whole portfolio overnight. Each input line is one record:
+
+    {"id": "acme-analytics", "product": "Acme Analytics is a ..."}
+    {"id": "acme-sso", "prompts": ["Analyze ...", "Now draft ..."]}
+
+A `product` record goes through the default passes (intake, ICP,
+positioning) as consecutive turns of one conversation; `prompts` gives
+the turns explicitly. Records are read lazily and run `concurrency` at a
+time. Each result is appended to the output JSONL and flushed as soon as
+it finishes, and that file doubles as the checkpoint: re-running with
+the same output skips every record already there with status "ok", so a
+crashed or interrupted run picks up where it stopped.
+
+    python -m pmm_agent.batch products.jsonl results.jsonl --concurrency 8
+    python -m pmm_agent.batch products.jsonl results.jsonl --fake
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Iterable, Iterator
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from .agent import AgentMode, create_pmm_agent
+from .governor import is_throttle
+from .hedging import percentile
+from .tracing import TracingCallbackHandler, configure_tracing
+
+DEFAULT_STEPS = (
+    ("intake", "Analyze this product for positioning work:\n\n{product}"),
+    ("icp", "Identify the ideal customer profile for this product."),
+    ("positioning", "Draft a positioning statement for this product."),
+)
+
+
+@dataclass
+class RecordResult:
+    id: str
+    status: str  # "ok" or "error"
+    steps: list[dict] = field(default_factory=list)
+    seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    error: str | None = None
+
+
+@dataclass
+class BatchReport:
+    records: int = 0
+    ok: int = 0
+    errors: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    record_seconds: list[float] = field(default_factory=list, repr=False)
+
+    def add(self, result: RecordResult) -> None:
+        self.records += 1
+        self.ok += result.status == "ok"
+        self.errors += result.status != "ok"
+        self.input_tokens += result.input_tokens
+        self.output_tokens += result.output_tokens
+        self.record_seconds.append(result.seconds)
+
+    def to_dict(self) -> dict:
+        seconds = self.record_seconds
+        return {
+            "records": self.records,
+            "ok": self.ok,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "seconds": round(self.seconds, 3),
+            "records_per_minute": round(self.records / self.seconds * 60, 2) if self.seconds else 0,
+            "record_seconds_p50": round(percentile(seconds, 0.5), 3) if seconds else None,
+            "record_seconds_p95": round(percentile(seconds, 0.95), 3) if seconds else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Input records, one per non-blank line, read lazily."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                record.setdefault("id", f"line-{number}")
+                yield record
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids already finished successfully in an output file (empty if it doesn't exist)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by a crash
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def record_prompts(record: dict) -> list[tuple[str, str]]:
+    """(step name, prompt) turns for a record."""
+    if "prompts" in record:
+        return [(f"turn-{i + 1}", prompt) for i, prompt in enumerate(record["prompts"])]
+    return [(name, prompt.format(product=record["product"])) for name, prompt in DEFAULT_STEPS]
+
+
+def _text(message: AIMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        item.get("text", "") for item in message.content
+        if isinstance(item, dict) and item.get("type") == "text"
+    )
+
+
+async def run_record(agent, record: dict, retries: int = 3) -> RecordResult:
+    """Run one record's turns through the agent; throttled calls are retried with backoff."""
+    started = time.perf_counter()
+    result = RecordResult(id=record["id"], status="ok")
+    messages: list = []
+    try:
+        for step, prompt in record_prompts(record):
+            turn = [*messages, HumanMessage(content=prompt)]
+            for attempt in range(retries + 1):
+                try:
+                    state = await agent.ainvoke(
+                        {"messages": turn},
+                        config={"callbacks": [TracingCallbackHandler(record["id"])]},
+                    )
+                    break
+                except Exception as e:
+                    if attempt == retries or not is_throttle(e):
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+            messages = state["messages"]
+            new = [m for m in messages[len(turn):] if isinstance(m, AIMessage)]
+            for m in new:
+                usage = m.usage_metadata or {}
+                result.input_tokens += usage.get("input_tokens", 0)
+                result.output_tokens += usage.get("output_tokens", 0)
+            result.steps.append({
+                "step": step,
+                "text": _text(new[-1]) if new else "",
+                "tool_calls": [tc["name"] for m in new for tc in m.tool_calls],
+            })
+    except Exception as e:
+        result.status = "error"
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+class BatchRunner:
+    """
+    Runs records through the agent with bounded concurrency.
+
+    Args:
+        output_path: Results JSONL, appended to and used as the checkpoint
+        agent: A compiled agent without tracing attached, since each record's
+            runs get a TracingCallbackHandler tagged with its id; built with
+            `create_pmm_agent(mode, model=model, tracing=False)` if None
+        concurrency: Records in flight at once
+        retries: Retries per turn when the model is throttled
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        agent=None,
+        mode: AgentMode = "full",
+        model=None,
+        concurrency: int = 4,
+        retries: int = 3,
+    ):
+        self.output_path = output_path
+        self.agent = agent or create_pmm_agent(mode, model=model, tracing=False)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.report = BatchReport()
+
+    async def run(self, records: Iterable[dict]) -> AsyncIterator[RecordResult]:
+        """Yield results in completion order, each written to the output first."""
+        started = time.perf_counter()
+        done = completed_ids(self.output_path)
+        # Small queues keep memory flat however long the input is
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+
+        async def feed():
+            try:
+                for record in records:
+                    if record["id"] in done:
+                        self.report.skipped += 1
+                        continue
+                    await queue.put(record)
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        async def work():
+            while (record := await queue.get()) is not None:
+                await results.put(await run_record(self.agent, record, self.retries))
+            await results.put(None)
+
+        tasks = [asyncio.create_task(feed())]
+        tasks += [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        try:
+            with open(self.output_path, "a+", encoding="utf-8") as output:
+                if output.tell():
+                    output.seek(output.tell() - 1)
+                    if output.read(1) != "\n":
+                        output.write("\n")  # end a line cut short by a crash
+                running = self.concurrency
+                while running:
+                    result = await results.get()
+                    if result is None:
+                        running -= 1
+                        continue
+                    output.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+                    output.flush()
+                    self.report.add(result)
+                    yield result
+            await tasks[0]  # surfaces errors reading the input
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.report.seconds = time.perf_counter() - started
+
+
+async def run_batch(records: Iterable[dict], output_path: str, **kwargs) -> BatchReport:
+    """Run a whole batch (see `BatchRunner` for arguments) and return its report."""
+    runner = BatchRunner(output_path, **kwargs)
+    async for _ in runner.run(records):
+        pass
+    return runner.report
+
+
+def _fake_model():
+    from .fakes import FakeChatModel
+
+    return FakeChatModel(
+        responses=["Here is a first draft based on the analysis above."],
+        tool_calls=[
+            {"name": "create_checklist", "args": {"task_type": "launch", "context": "batch"}}
+        ],
+        latency=0.05,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", help="JSONL of records with an id and a product or prompts")
+    parser.add_argument("output", help="results JSONL; re-running resumes from it")
+    parser.add_argument(
+        "--mode", default="full", choices=["full", "intake", "research", "planning", "risk"]
+    )
+    parser.add_argument("--model", default=os.getenv("MODEL", "claude-sonnet-4-20250514"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3, help="retries per turn when throttled")
+    parser.add_argument("--fake", action="store_true", help="use the local fake model (no API key)")
+    parser.add_argument("--report", help="also write the throughput report to this JSON file")
+    args = parser.parse_args()
+
+    configure_tracing()
+    agent = create_pmm_agent(
+        args.mode,
+        model_name=args.model,
+        model=_fake_model() if args.fake else None,
+        tracing=False,
+    )
+    runner = BatchRunner(
+        args.output, agent=agent, concurrency=args.concurrency, retries=args.retries
+    )
+
+    async def run():
+        async for result in runner.run(read_records(args.input)):
+            r = runner.report
+            print(f"[{r.records}] {result.id}: {result.status} in {result.seconds:.1f}s"
+                  + (f" ({result.error})" if result.error else ""), file=sys.stderr)
+
+    asyncio.run(run())
+    report = runner.report.to_dict()
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if runner.report.errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
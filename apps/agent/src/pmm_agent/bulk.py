@@ -0,0 +1,233 @@
+"""
+Bulk Battlecard Jobs.
+
+Generates battlecards for many competitors in one job instead of one
+model turn per card:
+
+- The shared context (our product, positioning and strengths, plus the
+  instructions) is built once per job as a single system block marked
+  for prompt caching, so every per-competitor call reuses it.
+- Each competitor's research and model call run concurrently, bounded by
+  `concurrency` (and by the server's model-call governor).
+- Cards are yielded the moment they finish, one `card_section` event
+  per `###` section as the template renders it and then a `card` event,
+  and saved to the job as they land. Re-running a job skips the cards it
+  already has; those are replayed whole.
+
+The model only writes the competitor-specific fields; the card itself is
+rendered from the same template `create_battlecard` uses.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from .tools import Battlecard
+
+CARD_INSTRUCTIONS = """You write the competitor half of sales battlecards.
+
+For the competitor in each request, using the research notes when there are any,
+reply with JSON only, no prose:
+{"their_positioning": "<how they position themselves, 1-2 sentences>",
+ "their_strengths": "<their real strengths, as '- ' bullet lines>"}
+
+Be specific and honest about their strengths; sales needs to handle them."""
+
+
+class BattlecardJob:
+    """
+    Inputs and progress of one bulk battlecard job.
+
+    `cards` maps competitor name to the rendered card once it is done;
+    `errors` holds the last failure for competitors that are not.
+    """
+
+    def __init__(
+        self,
+        our_product: str,
+        our_positioning: str,
+        our_strengths: str,
+        competitors: list[dict],
+        job_id: str | None = None,
+        tenant: str = "default",
+    ):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.our_product = our_product
+        self.our_positioning = our_positioning
+        self.our_strengths = our_strengths
+        self.competitors = competitors
+        self.tenant = tenant
+        self.cards: dict[str, str] = {}
+        self.errors: dict[str, str] = {}
+        self.created = time.time()
+
+    @property
+    def remaining(self) -> list[dict]:
+        return [c for c in self.competitors if c["name"] not in self.cards]
+
+    def shared_context(self) -> SystemMessage:
+        """The system message every card call shares, built once per job."""
+        text = (
+            f"{CARD_INSTRUCTIONS}\n\n"
+            f"Our product: {self.our_product}\n"
+            f"Our positioning: {self.our_positioning}\n"
+            f"Our strengths:\n{self.our_strengths}"
+        )
+        return SystemMessage(
+            content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+        )
+
+    def card(self, competitor: str, fields: dict) -> Battlecard:
+        return Battlecard(
+            competitor=competitor,
+            our_positioning=self.our_positioning,
+            their_positioning=fields["their_positioning"],
+            our_strengths=self.our_strengths,
+            their_strengths=fields["their_strengths"],
+        )
+
+    def status(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "total": len(self.competitors),
+            "completed": len(self.cards),
+            "failed": {n: e for n, e in self.errors.items() if n not in self.cards},
+            "remaining": [c["name"] for c in self.remaining],
+            "created": self.created,
+        }
+
+    def to_dict(self) -> dict:
+        return {**vars(self)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BattlecardJob":
+        job = cls.__new__(cls)
+        vars(job).update(data)
+        return job
+
+
+class JobStore:
+    """Bulk jobs by id, written to `<directory>/<job_id>.json` after each card when set."""
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory
+        self.jobs: dict[str, BattlecardJob] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def get(self, job_id: str) -> BattlecardJob | None:
+        job = self.jobs.get(job_id)
+        if job is None and self.directory and job_id.isalnum():
+            try:
+                with open(self._path(job_id), encoding="utf-8") as f:
+                    job = self.jobs[job_id] = BattlecardJob.from_dict(json.load(f))
+            except FileNotFoundError:
+                return None
+        return job
+
+    def save(self, job: BattlecardJob) -> None:
+        self.jobs[job.job_id] = job
+        if self.directory:
+            path = self._path(job.job_id)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+
+
+def parse_card_fields(text: str) -> dict:
+    """Pull the competitor fields out of a model reply, tolerating prose around the JSON."""
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1])
+            if isinstance(data, dict) and data.get("their_positioning"):
+                return {
+                    "their_positioning": str(data["their_positioning"]),
+                    "their_strengths": str(data.get("their_strengths", "")),
+                }
+        except json.JSONDecodeError:
+            pass
+    return {"their_positioning": text.strip(), "their_strengths": ""}
+
+
+async def run_battlecards(
+    job: BattlecardJob,
+    store: JobStore,
+    research: Callable[[dict], Awaitable[str]],
+    complete: Callable[[list], Awaitable[str]],
+    concurrency: int = 8,
+) -> AsyncIterator[dict]:
+    """
+    Produce the job's missing cards, yielding an event per card as it finishes.
+
+    Args:
+        job: The job; cards it already has are replayed, not regenerated
+        store: Where the job is saved after every card
+        research: Gathers notes on one competitor ({"name", "url"}); "" if none
+        complete: Runs one model call on a message list and returns its text
+        concurrency: Competitors worked on at once
+    """
+    started = time.perf_counter()
+    yield {"type": "job", **job.status()}
+    for name, markdown in job.cards.items():
+        yield {"type": "card", "competitor": name, "markdown": markdown, "resumed": True}
+
+    shared = job.shared_context()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(competitor: dict) -> tuple[dict, Battlecard | None, str | None, float]:
+        async with semaphore:
+            card_started = time.perf_counter()
+            try:
+                notes = await research(competitor)
+                request = f"Competitor: {competitor['name']}"
+                if notes:
+                    request += f"\n\nResearch notes:\n{notes}"
+                text = await complete([shared, HumanMessage(content=request)])
+                card = job.card(competitor["name"], parse_card_fields(text))
+                return competitor, card, None, time.perf_counter() - card_started
+            except Exception as e:
+                return competitor, None, str(e), time.perf_counter() - card_started
+
+    tasks = [asyncio.create_task(one(c)) for c in job.remaining]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            competitor, card, error, seconds = await finished
+            name = competitor["name"]
+            if card is None:
+                job.errors[name] = error
+                store.save(job)
+                yield {"type": "card_error", "competitor": name, "error": error}
+                continue
+            sections = []
+            for section in card.markdown_sections():
+                sections.append(section)
+                yield {"type": "card_section", "competitor": name, "markdown": section}
+            job.cards[name] = "".join(sections)
+            job.errors.pop(name, None)
+            store.save(job)
+            # The sections already carried the text; this marks the card complete
+            yield {
+                "type": "card",
+                "competitor": name,
+                "sections": len(sections),
+                "seconds": round(seconds, 3),
+            }
+    finally:
+        # Runs when the job's stream is abandoned too; finished cards are already saved
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "type": "done",
+        **job.status(),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,60 @@
+"""
+Exact-Prefix Response Cache.
+
+Caches complete model responses (text and tool calls) under the same
+canonical request hash the single-flight layer uses. Sessions that open
+with a quick-action prompt and an empty history get the stored answer
+back instantly instead of paying for another model call.
+"""
+
+import operator
+import time
+from collections import OrderedDict
+from functools import reduce
+from typing import Any
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL.
+
+    Each entry is the list of chunks a model call produced. A non-streamed
+    response is stored as a single-element list, so either kind of entry
+    can serve both `/chat` and `/chat/stream`.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_chunks(self, key: str) -> list | None:
+        """Return the cached chunks for `key`, or None on a miss."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def get_message(self, key: str) -> Any | None:
+        """Return the cached response as one message, or None on a miss."""
+        chunks = self.get_chunks(key)
+        if chunks is None:
+            return None
+        return chunks[0] if len(chunks) == 1 else reduce(operator.add, chunks)
+
+    def put(self, key: str, chunks: list) -> None:
+        """Store a complete response, evicting the least recently used entry."""
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, chunks)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
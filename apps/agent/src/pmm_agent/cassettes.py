@@ -0,0 +1,247 @@
+"""
+Model Interaction Cassettes.
+
+Record every model call the server makes — the request and each response
+chunk with its arrival time — then replay them offline through a
+`ChatAnthropic`-compatible stand-in. Replays are deterministic and need no
+network, so server, tool-loop and streaming changes can be measured on
+real traffic shapes.
+
+A cassette is JSON lines, gzipped when the path ends in `.gz`. One line
+per model call:
+
+    {"key": "<request hash>", "kind": "stream", "model": "...",
+     "chunks": [[ms_since_call_start, {"content": ..., ...}], ...]}
+
+    CASSETTE_MODE=record CASSETTE_PATH=cassettes/pmm.jsonl.gz
+    CASSETTE_MODE=replay CASSETTE_PATH=cassettes/pmm.jsonl.gz CASSETTE_SPEED=0
+"""
+
+import asyncio
+import collections
+import gzip
+import json
+import threading
+import time
+from typing import IO, Any, AsyncIterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from .singleflight import request_key
+
+# Chunk fields worth keeping; everything else is provider bookkeeping
+_CHUNK_FIELDS = ("content", "tool_call_chunks", "usage_metadata", "id")
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _key(messages: list) -> str:
+    # Model and tools are fixed for a cassette, so only the messages matter
+    return request_key("", "", [], messages)
+
+
+def _dump_chunk(message) -> dict:
+    data = {}
+    for field in _CHUNK_FIELDS:
+        value = getattr(message, field, None)
+        if value:
+            data[field] = value
+    if not isinstance(message, AIMessageChunk) and message.tool_calls:
+        # Whole responses are stored in chunk form too, so both replay alike
+        data["tool_call_chunks"] = [
+            {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+            for i, tc in enumerate(message.tool_calls)
+        ]
+    return data
+
+
+def _load_chunk(data: dict) -> AIMessageChunk:
+    return AIMessageChunk(**{"content": "", **data})
+
+
+class Cassette:
+    """Append-only cassette writer; each call is flushed as soon as it ends."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open(path, "a")
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def write(self, key: str, kind: str, model: str, chunks: list[tuple[float, dict]]) -> None:
+        line = json.dumps(
+            {
+                "key": key,
+                "kind": kind,
+                "model": model,
+                "chunks": [[round(t * 1000, 2), c] for t, c in chunks],
+            },
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.calls += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_cassette(path: str) -> list[dict]:
+    with _open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Passes calls through to `inner` and writes each one to a cassette.
+
+    `inner` is anything with `ainvoke`/`astream` returning AI messages,
+    typically `ChatAnthropic(...).bind_tools(tools)`.
+    """
+
+    inner: Any
+    cassette: Any
+    model: str = "recorded"
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "RecordingChatModel":
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.perf_counter()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        self.cassette.write(
+            _key(messages), "invoke", self.model,
+            [(time.perf_counter() - started, _dump_chunk(message))],
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.perf_counter()
+        message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self.cassette.write(
+            _key(messages), "invoke", self.model,
+            [(time.perf_counter() - started, _dump_chunk(message))],
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        recorded = []
+        async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+            recorded.append((time.perf_counter() - started, _dump_chunk(chunk)))
+            yield ChatGenerationChunk(message=chunk)
+        # Abandoned streams are not written, so replays never end early
+        self.cassette.write(_key(messages), "stream", self.model, recorded)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Plays a cassette back in place of `ChatAnthropic`.
+
+    Calls are matched to recordings by request hash; identical requests
+    get their recordings in order. A request that was never recorded gets
+    the next unused recording, so small prompt changes still replay.
+
+    Attributes:
+        recordings: Entries from `load_cassette()`
+        speed: 1.0 replays at recorded timing, 2.0 twice as fast,
+            0 as fast as possible
+        cycle: Start over once every recording has been used, instead of
+            raising LookupError
+    """
+
+    recordings: list[dict]
+    speed: float = 1.0
+    cycle: bool = False
+    model: str = "replay"
+
+    _by_key: dict = PrivateAttr(default=None)
+    _unused: collections.OrderedDict = PrivateAttr(default=None)
+    misses: int = 0
+
+    @classmethod
+    def load(cls, path: str, speed: float = 1.0, cycle: bool = False) -> "ReplayChatModel":
+        recordings = load_cassette(path)
+        model = recordings[0]["model"] if recordings else "replay"
+        return cls(recordings=recordings, speed=speed, cycle=cycle, model=model)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        return self
+
+    def _next(self, messages: list) -> dict:
+        if self._by_key is None or (self.cycle and not self._unused):
+            self._by_key = collections.defaultdict(collections.deque)
+            self._unused = collections.OrderedDict()
+            for i, recording in enumerate(self.recordings):
+                self._by_key[recording["key"]].append(i)
+                self._unused[i] = None
+        if not self._unused:
+            raise LookupError("Cassette exhausted: no recordings left to replay")
+        queue = self._by_key.get(_key(messages))
+        while queue and queue[0] not in self._unused:
+            queue.popleft()
+        if queue:
+            index = queue.popleft()
+        else:
+            self.misses += 1
+            index = next(iter(self._unused))
+        del self._unused[index]
+        return self.recordings[index]
+
+    def _delay(self, ms: float) -> float:
+        return ms / 1000 / self.speed if self.speed > 0 else 0.0
+
+    @staticmethod
+    def _message(recording: dict) -> AIMessage:
+        merged = None
+        for _, data in recording["chunks"]:
+            chunk = _load_chunk(data)
+            merged = chunk if merged is None else merged + chunk
+        merged = merged or AIMessageChunk(content="")
+        return AIMessage(
+            content=merged.content,
+            tool_calls=merged.tool_calls,
+            usage_metadata=merged.usage_metadata,
+            id=merged.id,
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        recording = self._next(messages)
+        time.sleep(self._delay(recording["chunks"][-1][0] if recording["chunks"] else 0))
+        return ChatResult(generations=[ChatGeneration(message=self._message(recording))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        recording = self._next(messages)
+        await asyncio.sleep(self._delay(recording["chunks"][-1][0] if recording["chunks"] else 0))
+        return ChatResult(generations=[ChatGeneration(message=self._message(recording))])
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        recording = self._next(messages)
+        elapsed = 0.0
+        for offset, data in recording["chunks"]:
+            wait = self._delay(offset) - elapsed
+            if wait > 0:
+                await asyncio.sleep(wait)
+                elapsed += wait
+            yield ChatGenerationChunk(message=_load_chunk(data))
+
@@ -0,0 +1,194 @@
+"""
+Multiplexed WebSocket Channels.
+
+One WebSocket connection carries any number of streams, each a turn the
+client started or resumed on it, so a browser pays connection setup once
+instead of once per turn. Every message in either direction is a single
+JSON text frame.
+
+Client to server:
+
+    {"type": "turn", "stream": "s1", "message": "...", "session_id": "..."}
+    {"type": "resume", "stream": "s1", "session_id": "...", "last_event_id": "<turn>:<seq>"}
+    {"type": "cancel", "stream": "s1"}
+    {"type": "credit", "stream": "s1", "n": 32}
+    {"type": "ping"}
+
+Server to client:
+
+    {"stream": "s1", "type": "started", "session_id": "...", "turn_id": "..."}
+    {"stream": "s1", "id": "<turn>:<seq>", "event": {...}}  # as on /chat/stream
+    {"stream": "s1", "type": "gap", "missed": 3}  # events evicted or skipped while out of credit
+    {"stream": "s1", "type": "end"}
+    {"stream": "s1", "type": "error", "status": 404, "detail": "..."}
+    {"type": "push", "session_id": "...", "event": {...}}  # unsolicited, e.g. approval results
+    {"type": "pong"}
+
+Flow control is per stream and credit based: a stream starts with
+`window` credits, each event sent spends one, and the client grants more
+as it processes them. A stream out of credit stops sending while its turn
+keeps running into the replay buffer, so a slow consumer holds up neither
+the turn nor the connection's other streams. Once the turn has ended, a
+stream out of credit skips ahead (with a `gap`) to the turn's final
+event (`done`, `cancelled` or `error`), which is sent without credit like
+`end`, so a Stop always finishes on the client. All frames go out through
+one bounded queue drained by a single writer, which is where the socket's
+own backpressure applies.
+"""
+
+import asyncio
+import json
+from typing import Awaitable, Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .streams import TurnStream
+
+
+class _Stream:
+    def __init__(self, turn: TurnStream, credit: int):
+        self.turn = turn
+        self.credit = credit
+        self.granted = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+class Channel:
+    """
+    One client connection and the streams multiplexed over it.
+
+    Args:
+        websocket: The accepted connection
+        window: Events a stream may send before the client grants more credit
+        max_streams: Streams open at once on this connection
+        queue_size: Frames waiting for the socket before senders block
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        window: int = 64,
+        max_streams: int = 16,
+        queue_size: int = 256,
+    ):
+        self.websocket = websocket
+        self.window = window
+        self.max_streams = max_streams
+        self.streams: dict[str, _Stream] = {}
+        self.sessions: set[str] = set()  # sessions this connection gets pushes for
+        self._outgoing: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+
+    @property
+    def full(self) -> bool:
+        return len(self.streams) >= self.max_streams
+
+    async def send(self, message: dict) -> None:
+        await self._outgoing.put(json.dumps(message))
+
+    def push(self, session_id: str, event: dict) -> bool:
+        """Queue an unsolicited event; dropped (returns False) rather than waited on when full."""
+        try:
+            self._outgoing.put_nowait(
+                json.dumps({"type": "push", "session_id": session_id, "event": event})
+            )
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def attach(self, stream_id: str, turn: TurnStream, after: int = -1) -> None:
+        """Send `turn`'s events after `after` as `stream_id`, replacing any stream of that id."""
+        previous = self.streams.pop(stream_id, None)
+        if previous is not None:
+            previous.task.cancel()
+        stream = self.streams[stream_id] = _Stream(turn, self.window)
+        self.sessions.add(turn.session_id)
+        stream.task = asyncio.create_task(self._pump(stream_id, stream, after))
+        # Wakes a pump waiting for credit when the turn ends, e.g. on a cancel
+        turn.task.add_done_callback(lambda _: stream.granted.set())
+
+    def credit(self, stream_id: str, n: int) -> None:
+        stream = self.streams.get(stream_id)
+        if stream is not None and n > 0:
+            stream.credit += n
+            stream.granted.set()
+
+    def cancel(self, stream_id: str) -> bool:
+        """Cancel the stream's turn; the client still gets its `cancelled` event and `end`."""
+        stream = self.streams.get(stream_id)
+        return stream is not None and stream.turn.cancel()
+
+    async def _pump(self, stream_id: str, stream: _Stream, after: int) -> None:
+        turn = stream.turn
+        # Events are already JSON, so frames are assembled rather than re-encoded
+        prefix = f'{{"stream": {json.dumps(stream_id)}, "id": "{turn.turn_id}:'
+        cursor = after
+        try:
+            async for seq, data in turn.events_after(after):
+                while stream.credit <= 0 and not turn.done:
+                    stream.granted.clear()
+                    await stream.granted.wait()
+                if stream.credit <= 0 and seq < turn.next_seq - 1:
+                    continue  # ended while out of credit: only its final event is owed
+                if seq > cursor + 1:
+                    missed = seq - cursor - 1
+                    await self.send({"stream": stream_id, "type": "gap", "missed": missed})
+                cursor = seq
+                stream.credit -= 1
+                await self._outgoing.put(f'{prefix}{seq}", "event": {data}}}')
+            await self.send({"stream": stream_id, "type": "end"})
+        finally:
+            if self.streams.get(stream_id) is stream:
+                del self.streams[stream_id]
+
+    async def _write(self) -> None:
+        while True:
+            await self.websocket.send_text(await self._outgoing.get())
+
+    async def run(self, handle: Callable[["Channel", dict], Awaitable[None]]) -> None:
+        """
+        Serve the connection until the client goes away.
+
+        Flow control, cancels and pings are handled here; every other
+        message is passed to `handle`. Turns outlive the connection: a
+        stream dropped with it can be resumed on another one.
+        """
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                frame = await self.websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                if frame.get("text") is None:
+                    await self.send({"type": "error", "status": 400, "detail": "Expected text"})
+                    continue
+                try:
+                    message = json.loads(frame["text"])
+                except json.JSONDecodeError:
+                    await self.send({"type": "error", "status": 400, "detail": "Invalid JSON"})
+                    continue
+                if not isinstance(message, dict):
+                    await self.send({"type": "error", "status": 400, "detail": "Expected object"})
+                    continue
+                kind = message.get("type")
+                stream_id = str(message.get("stream", ""))
+                if kind == "credit":
+                    if isinstance(message.get("n"), int):
+                        self.credit(stream_id, message["n"])
+                elif kind == "cancel":
+                    if not self.cancel(stream_id):
+                        await self.send({
+                            "stream": stream_id,
+                            "type": "error",
+                            "status": 404,
+                            "detail": "No running turn on this stream",
+                        })
+                elif kind == "ping":
+                    await self.send({"type": "pong"})
+                else:
+                    await handle(self, message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            writer.cancel()
+            for stream in list(self.streams.values()):
+                stream.task.cancel()
@@ -0,0 +1,252 @@
+"""
+Background History Compaction.
+
+Long sessions are compacted off the request path. After a turn finishes
+the server asks `Compactor.due()` whether the history it would send next
+is large, or has gained many turns since it was last compacted, and if
+so queues it. A single worker then summarizes everything but the most
+recent turns and swaps that prefix of the history for one summary entry,
+so the next request is already sending the short version. Both triggers
+measure the history as it is now, so a compacted session isn't due again
+until it has grown back.
+
+The summary entry carries pinned facts that must survive any number of
+compactions word for word: the ICP, the competitors discussed, and the
+current (or reviewer-approved) positioning. Facts that tool calls pinned
+down exactly are taken from their arguments; the rest come from the
+model's summary, and each compaction merges the previous entry's facts.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = """You compact the earlier part of a product marketing conversation.
+
+Reply with JSON only, no prose:
+{"summary": "<what was asked, decided and produced, in under 250 words>",
+ "facts": {"icp": "<the ideal customer profile agreed so far, or empty>",
+           "competitors": ["<competitor names discussed>"],
+           "positioning": "<the positioning agreed so far, or empty>",
+           "other": ["<other facts later turns will need: product name, pricing, dates>"]}}
+
+Keep names, numbers and decisions exact. Leave out pleasantries and tool mechanics."""
+
+# Rough characters per token, for deciding when a history is large
+CHARS_PER_TOKEN = 4
+
+# Results that mean a tool call didn't take effect
+_NOT_APPLIED = ("Error", "Not approved", "Cancelled")
+
+# Tools taking a comma-separated list of competitors, and the argument holding it
+_COMPETITOR_LISTS = {
+    "search_competitors": "known_competitors",
+    "analyze_pricing": "competitors",
+}
+
+
+def estimate_tokens(entries: list[dict]) -> int:
+    chars = 0
+    for entry in entries:
+        chars += len(entry.get("content") or "")
+        for tc in entry.get("tool_calls", []):
+            chars += len(json.dumps(tc["args"]))
+    return chars // CHARS_PER_TOKEN
+
+
+def split_point(entries: list[dict], keep: int) -> int:
+    """
+    Index of the first entry to keep verbatim: a user turn at least `keep` from the end.
+
+    Returns 0 when there is nothing worth compacting before it.
+    """
+    start = len(entries) - keep
+    for i in range(start, 0, -1):
+        if entries[i]["role"] == "user":
+            return i
+    return 0
+
+
+def pinned_facts(entries: list[dict]) -> dict:
+    """Facts stated exactly by the arguments of tool calls that went through."""
+    results = {e["tool_call_id"]: e for e in entries if e["role"] == "tool"}
+    facts: dict = {}
+    competitors: dict[str, None] = {}
+    for entry in entries:
+        for tc in entry.get("tool_calls", []):
+            result = results.get(tc["id"])
+            if result is None or result["content"].startswith(_NOT_APPLIED):
+                continue
+            args = tc["args"]
+            if tc["name"] == "create_positioning_statement":
+                facts["positioning"] = (
+                    f"For {args.get('target_customer')} who {args.get('problem')}, "
+                    f"{args.get('product_name')} is a {args.get('category')} that "
+                    f"{args.get('key_benefit')}. Unlike {args.get('competitive_alternative')}, "
+                    f"it {args.get('differentiator')}."
+                )
+                facts["positioning_approved"] = bool(result.get("approved"))
+                facts.setdefault("icp", args.get("target_customer", ""))
+            elif tc["name"] == "create_battlecard" and args.get("competitor"):
+                competitors[args["competitor"]] = None
+            elif tc["name"] in _COMPETITOR_LISTS:
+                for name in str(args.get(_COMPETITOR_LISTS[tc["name"]]) or "").split(","):
+                    if name.strip():
+                        competitors[name.strip()] = None
+    if competitors:
+        facts["competitors"] = list(competitors)
+    return facts
+
+
+def merge_facts(*layers: dict) -> dict:
+    """Later layers win for single facts; lists are unioned in order."""
+    merged: dict = {}
+    for layer in layers:
+        for key, value in layer.items():
+            if isinstance(value, list):
+                merged[key] = list(dict.fromkeys([*merged.get(key, []), *value]))
+            elif value not in ("", None):
+                merged[key] = value
+    return merged
+
+
+def parse_summary(text: str) -> tuple[str, dict]:
+    """(summary, facts) from the model's reply, tolerating prose around the JSON."""
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1])
+            if isinstance(data, dict) and "summary" in data:
+                facts = data.get("facts") if isinstance(data.get("facts"), dict) else {}
+                return str(data["summary"]), facts
+        except json.JSONDecodeError:
+            pass
+    return text.strip(), {}
+
+
+def render_summary(summary: str, facts: dict) -> str:
+    """The text that stands in for the compacted turns in the history sent to the model."""
+    lines = ["[Earlier in this conversation, compacted]", "", "Pinned facts:"]
+    if facts.get("icp"):
+        lines.append(f"- ICP: {facts['icp']}")
+    if facts.get("competitors"):
+        lines.append(f"- Competitors: {', '.join(facts['competitors'])}")
+    if facts.get("positioning"):
+        label = "Approved positioning" if facts.get("positioning_approved") else "Positioning"
+        lines.append(f"- {label}: {facts['positioning']}")
+    lines += [f"- {fact}" for fact in facts.get("other", [])]
+    if len(lines) == 3:
+        lines.append("- none yet")
+    lines += ["", "Summary:", summary]
+    return "\n".join(lines)
+
+
+class Compactor:
+    """
+    Queue and worker that compact session histories in the background.
+
+    Args:
+        summarize: Given a session id and a transcript, returns the model's reply
+            to SUMMARY_INSTRUCTIONS
+        keep_messages: Recent messages always kept verbatim
+        context_tokens: Compact once a history is estimated to be this large (0 = never)
+        max_turns: Compact once this many user turns follow the last summary (0 = never)
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, str], Awaitable[str]],
+        keep_messages: int = 8,
+        context_tokens: int = 30000,
+        max_turns: int = 20,
+    ):
+        self.summarize = summarize
+        self.keep_messages = keep_messages
+        self.context_tokens = context_tokens
+        self.max_turns = max_turns
+        self.compacted = 0
+        self.failed = 0
+        self._queue: asyncio.Queue[tuple[str, dict]] = asyncio.Queue()
+        self._pending: set[str] = set()
+
+    def due(self, session: dict) -> bool:
+        """Whether a session's current history is large or long enough to compact."""
+        entries = session["messages"]
+        if session.get("approval") or split_point(entries, self.keep_messages) < 3:
+            return False
+        if self.context_tokens and estimate_tokens(entries) >= self.context_tokens:
+            return True
+        turns = sum(entry["role"] == "user" for entry in entries)
+        return bool(self.max_turns) and turns >= self.max_turns
+
+    def schedule(self, session_id: str, session: dict) -> bool:
+        """Queue a session unless it already is; returns whether it was queued."""
+        if session_id in self._pending:
+            return False
+        self._pending.add(session_id)
+        self._queue.put_nowait((session_id, session))
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def run(self) -> None:
+        """Compact queued sessions one at a time until cancelled."""
+        while True:
+            session_id, session = await self._queue.get()
+            try:
+                await self.compact(session_id, session)
+            except Exception:
+                self.failed += 1
+                logger.exception("Compacting session %s failed", session_id)
+            finally:
+                self._pending.discard(session_id)
+
+    async def compact(self, session_id: str, session: dict) -> bool:
+        """
+        Replace the session's older turns with a summary entry.
+
+        The model call sees a snapshot; turns that land meanwhile are
+        appended after the cut and kept. Returns False if the history
+        changed under the cut, e.g. the session was cleared.
+        """
+        entries = session["messages"]
+        cut = split_point(entries, self.keep_messages)
+        if cut < 3:
+            return False
+        boundary = entries[cut]
+        older = entries[1:cut]  # entries[0] is the system prompt
+        previous = older[0] if older[0]["role"] == "summary" else None
+
+        transcript = "\n\n".join(
+            f"{e['role']}: {e.get('content') or ''}"
+            + "".join(f"\n[called {tc['name']} with {json.dumps(tc['args'])}]"
+                      for tc in e.get("tool_calls", []))
+            for e in older
+        )
+        text = await self.summarize(session_id, transcript)
+        summary, model_facts = parse_summary(text)
+        # The model only fills gaps: facts pinned by earlier compactions or tool calls win
+        facts = merge_facts(
+            model_facts, previous["facts"] if previous else {}, pinned_facts(older)
+        )
+
+        # Nothing awaited since the snapshot was taken except the model call
+        if session["messages"] is not entries or entries[cut] is not boundary:
+            return False
+        entries[1:cut] = [{
+            "role": "summary",
+            "content": render_summary(summary, facts),
+            "facts": facts,
+            "messages": (previous["messages"] if previous else 0) + len(older) - bool(previous),
+            "artifacts": list(dict.fromkeys(
+                [*(previous["artifacts"] if previous else []),
+                 *(e["artifact"] for e in older if "artifact" in e)]
+            )),
+        }]
+        self.compacted += 1
+        return True
@@ -0,0 +1,63 @@
+"""
+Line Deltas Between Document Revisions.
+
+A delta is the list of line ranges of the old text that were replaced,
+with their replacement text: `[[start, end, "new lines"], ...]`, in
+order. Equal lines are not stored, so a delta is about as large as the
+edit that produced it. Deltas are plain JSON.
+"""
+
+import difflib
+
+Delta = list[list]
+
+
+def make_delta(old: str, new: str) -> Delta:
+    """Delta that turns `old` into `new`."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, "".join(new_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(old: str, delta: Delta) -> str:
+    """Rebuild the newer text from `old` and a delta made against it."""
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    position = 0
+    for start, end, replacement in delta:
+        parts.extend(old_lines[position:start])
+        parts.append(replacement)
+        position = end
+    parts.extend(old_lines[position:])
+    return "".join(parts)
+
+
+def delta_size(delta: Delta) -> int:
+    """Characters of replacement text a delta carries."""
+    return sum(len(replacement) for _, _, replacement in delta)
+
+
+def line_changes(delta: Delta) -> tuple[int, int]:
+    """(lines added, lines removed) by a delta."""
+    added = sum(len(replacement.splitlines()) for _, _, replacement in delta)
+    removed = sum(end - start for start, end, _ in delta)
+    return added, removed
+
+
+def unified_diff(
+    old: str, new: str, old_name: str = "a", new_name: str = "b", context: int = 2
+) -> str:
+    """A unified diff for showing a change to the model or a reviewer."""
+    return "\n".join(difflib.unified_diff(
+        old.splitlines(),
+        new.splitlines(),
+        fromfile=old_name,
+        tofile=new_name,
+        n=context,
+        lineterm="",
+    ))
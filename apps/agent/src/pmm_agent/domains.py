@@ -0,0 +1,393 @@
+"""
+Domain Config Registry.
+
+Loads `config/domains/*.json` and compiles each file once into a
+`Domain`: tool names resolved to the real tool objects, one tool set and
+prompt bundle per expertise area and subagent, and the approval list.
+Every tool a config names must exist, so a typo fails at load time
+instead of silently giving the model fewer tools.
+
+Lookups are plain dict reads. `reload()` recompiles only files whose
+mtime changed and swaps in a new mapping in one assignment, so requests
+already holding a `Domain` finish on it and new ones see the update. A
+file that stops validating keeps serving its last good version and the
+error is reported in `errors`.
+
+`DomainBindings` turns a domain (or one of its areas) into what a model
+call needs: its system prompt and the one shared chat model with the
+domain's tools bound. Bindings are built on first use and kept in a
+small LRU, so the model client and its connection pool are shared by
+every domain and each extra domain costs one cached binding at most.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from langchain_core.tools import BaseTool
+
+from . import prompts
+
+logger = logging.getLogger(__name__)
+
+
+class DomainConfigError(ValueError):
+    """A domain config file is malformed or names tools that don't exist."""
+
+
+@dataclass(frozen=True)
+class Area:
+    """An expertise area (or subagent): its tools and the system prompt to use with them."""
+
+    name: str
+    description: str
+    tools: tuple[BaseTool, ...]
+    prompt: str
+    outputs: tuple[str, ...] = ()
+
+    @property
+    def tool_names(self) -> list[str]:
+        return [t.name for t in self.tools]
+
+
+@dataclass(frozen=True)
+class Domain:
+    code: str
+    name: str
+    tagline: str
+    system_prompt: str
+    tools: tuple[BaseTool, ...]
+    areas: dict[str, Area]
+    subagents: dict[str, Area]
+    quick_actions: tuple[dict, ...]
+    approval_tools: frozenset[str]
+    path: str = ""
+    mtime: float = 0.0
+    tools_by_name: dict[str, BaseTool] = field(default_factory=dict, repr=False)
+
+    def summary(self) -> dict:
+        return {
+            "code": self.code,
+            "name": self.name,
+            "tagline": self.tagline,
+            "tools": [t.name for t in self.tools],
+            "areas": {
+                name: {
+                    "description": a.description,
+                    "tools": a.tool_names,
+                    "outputs": list(a.outputs),
+                }
+                for name, a in self.areas.items()
+            },
+            "subagents": {
+                name: {"description": a.description, "tools": a.tool_names}
+                for name, a in self.subagents.items()
+            },
+            "quick_actions": list(self.quick_actions),
+            "approval_tools": sorted(self.approval_tools),
+        }
+
+
+def _require(data: dict, key: str, kind: type, where: str) -> Any:
+    value = data.get(key)
+    if not isinstance(value, kind):
+        raise DomainConfigError(f"{where}: '{key}' must be a {kind.__name__}")
+    return value
+
+
+def _named_prompt(name: str) -> str | None:
+    value = getattr(prompts, name, None)
+    return value if isinstance(value, str) else None
+
+
+def _area_prompt(system_prompt: str, title: str, description: str, outputs: list[str]) -> str:
+    focus = f"\n\n## Current Focus: {title}\n\n{description}"
+    if outputs:
+        focus += "\n\nDeliverables for this focus: " + ", ".join(outputs) + "."
+    return system_prompt + focus
+
+
+def compile_domain(data: dict, tools: dict[str, BaseTool], path: str = "") -> Domain:
+    """
+    Validate one parsed config against the available tools and precompute its bundles.
+
+    Raises:
+        DomainConfigError: On missing fields, unknown tools or unknown prompts.
+    """
+    where = os.path.basename(path) or "domain config"
+    code = _require(data, "domain_code", str, where)
+    name = _require(data, "domain_name", str, where)
+    unknown: set[str] = set()
+
+    def resolve(names: Any, context: str) -> tuple[BaseTool, ...]:
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise DomainConfigError(f"{where}: {context} tools must be a list of names")
+        unknown.update(n for n in names if n not in tools)
+        return tuple(tools[n] for n in names if n in tools)
+
+    if "system_prompt" in data:
+        prompt_name = data["system_prompt"]
+        system_prompt = _named_prompt(prompt_name)
+        if system_prompt is None:
+            raise DomainConfigError(f"{where}: no prompt named {prompt_name} in prompts.py")
+    else:
+        system_prompt = (
+            f"# {name}\n\n{data.get('tagline', '')}\n\n"
+            f"You help: {', '.join(data.get('target_audience', []))}."
+        )
+
+    areas = {}
+    for area_name, area in _require(data, "expertise_areas", dict, where).items():
+        outputs = area.get("outputs", [])
+        description = area.get("description", "")
+        title = area_name.replace("_", " ")
+        areas[area_name] = Area(
+            name=area_name,
+            description=description,
+            tools=resolve(area.get("tools"), f"expertise area '{area_name}'"),
+            prompt=_area_prompt(system_prompt, title, description, outputs),
+            outputs=tuple(outputs),
+        )
+
+    subagents = {}
+    for agent in data.get("subagents", []):
+        agent_name = _require(agent, "name", str, where)
+        # Use the hand-written specialist prompt when prompts.py has one
+        description = agent.get("description", "")
+        default_prompt = agent_name.replace("-", "_").upper() + "_PROMPT"
+        prompt = _named_prompt(agent.get("prompt", default_prompt))
+        if prompt is None:
+            prompt = f"You are the {agent_name}: {description}\n\n{agent.get('personality', '')}"
+        subagents[agent_name] = Area(
+            name=agent_name,
+            description=description,
+            tools=resolve(agent.get("tools"), f"subagent '{agent_name}'"),
+            prompt=prompt,
+        )
+
+    approval = resolve(data.get("human_in_the_loop_tools", []), "human_in_the_loop")
+    if unknown:
+        raise DomainConfigError(f"{where}: unknown tools {sorted(unknown)}")
+
+    # The domain's tool set: everything any area or subagent uses, in first-seen order
+    all_tools: dict[str, BaseTool] = {}
+    for area in [*areas.values(), *subagents.values()]:
+        for tool in area.tools:
+            all_tools.setdefault(tool.name, tool)
+    for tool in approval:
+        all_tools.setdefault(tool.name, tool)
+
+    return Domain(
+        code=code,
+        name=name,
+        tagline=data.get("tagline", ""),
+        system_prompt=system_prompt,
+        tools=tuple(all_tools.values()),
+        areas=areas,
+        subagents=subagents,
+        quick_actions=tuple(data.get("quick_actions", [])),
+        approval_tools=frozenset(t.name for t in approval),
+        path=path,
+        mtime=os.path.getmtime(path) if path else 0.0,
+        tools_by_name=all_tools,
+    )
+
+
+class DomainRegistry:
+    """
+    Compiled domains from a directory of JSON configs.
+
+    Args:
+        directory: Where the `*.json` configs live
+        tools: Every tool a config may name
+    """
+
+    def __init__(self, directory: str, tools: list[BaseTool]):
+        self.directory = directory
+        self.tools = {t.name: t for t in tools}
+        self.domains: dict[str, Domain] = {}
+        self.errors: dict[str, str] = {}
+        self.reloads = 0
+        self._failed: dict[str, float] = {}  # path -> mtime of the version that failed
+
+    def _files(self) -> dict[str, float]:
+        if not os.path.isdir(self.directory):
+            return {}
+        return {
+            entry.path: entry.stat().st_mtime
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".json") and entry.is_file()
+        }
+
+    def _compile_file(self, path: str) -> Domain:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise DomainConfigError(f"{os.path.basename(path)}: invalid JSON: {e}") from e
+        return compile_domain(data, self.tools, path)
+
+    def load(self) -> None:
+        """Compile every config; raises DomainConfigError if any is invalid."""
+        domains = {}
+        for path in sorted(self._files()):
+            domain = self._compile_file(path)
+            if domain.code in domains:
+                raise DomainConfigError(
+                    f"{os.path.basename(path)}: duplicate domain_code {domain.code}"
+                )
+            domains[domain.code] = domain
+        self.domains = domains
+        self.errors = {}
+        self._failed = {}
+
+    def reload(self) -> bool:
+        """Recompile changed configs; returns whether anything changed. Never raises."""
+        files = self._files()
+        by_path = {d.path: d for d in self.domains.values()}
+        seen = {path: d.mtime for path, d in by_path.items()} | self._failed
+        if files == seen:
+            return False
+
+        domains = {}
+        errors = {}
+        failed = {}
+        for path, mtime in sorted(files.items()):
+            current = by_path.get(path)
+            if self._failed.get(path) == mtime:
+                # Still the version that failed; don't recompile or log it again
+                errors[path], failed[path] = self.errors[path], mtime
+                if current is not None:
+                    domains[current.code] = current
+                continue
+            if current is not None and current.mtime == mtime:
+                domains[current.code] = current
+                continue
+            try:
+                domain = self._compile_file(path)
+            except (OSError, DomainConfigError) as e:
+                errors[path], failed[path] = str(e), mtime
+                logger.error("Keeping last good domain config for %s: %s", path, e)
+                if current is not None:
+                    domains[current.code] = current
+                continue
+            if domain.code in domains:
+                errors[path], failed[path] = f"duplicate domain_code {domain.code}", mtime
+                continue
+            domains[domain.code] = domain
+        self.domains = domains
+        self.errors = errors
+        self._failed = failed
+        self.reloads += 1
+        return True
+
+    async def watch(self, interval: float) -> None:
+        """Poll for config changes every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            if await asyncio.to_thread(self.reload):
+                logger.info("Reloaded domain configs: %s", sorted(self.domains))
+
+    def get(self, code: str) -> Domain | None:
+        return self.domains.get(code)
+
+    def area(self, code: str, area: str) -> Area | None:
+        domain = self.domains.get(code)
+        if domain is None:
+            return None
+        return domain.areas.get(area) or domain.subagents.get(area)
+
+
+@dataclass(frozen=True)
+class Binding:
+    """What a turn in one domain (or area) calls the model with."""
+
+    key: str
+    system_prompt: str
+    tools: tuple[BaseTool, ...]
+    model: Any  # the shared chat model with `tools` bound
+    approval_tools: frozenset[str] = frozenset()
+    tools_by_name: dict[str, BaseTool] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def create(
+        cls,
+        key: str,
+        system_prompt: str,
+        tools: list[BaseTool],
+        model,
+        approval_tools=frozenset(),
+    ) -> "Binding":
+        return cls(
+            key=key,
+            system_prompt=system_prompt,
+            tools=tuple(tools),
+            model=model.bind_tools(tools),
+            approval_tools=frozenset(approval_tools),
+            tools_by_name={t.name: t for t in tools},
+        )
+
+
+class DomainBindings:
+    """
+    Cached per-domain bindings of one shared chat model.
+
+    Args:
+        registry: Where domains are looked up; a reloaded domain gets a new binding
+        model: The chat model every binding wraps (and whose client they share)
+        extra_tools: Tools bound in every domain on top of its own, e.g. artifact tools
+        max_entries: Bindings kept; the least recently used is dropped past this
+    """
+
+    def __init__(
+        self,
+        registry: DomainRegistry,
+        model,
+        extra_tools: list[BaseTool] | None = None,
+        max_entries: int = 32,
+    ):
+        self.registry = registry
+        self.model = model
+        self.extra_tools = list(extra_tools or [])
+        self.max_entries = max_entries
+        self._bindings: OrderedDict[tuple[str, str | None], tuple[Domain, Binding]] = OrderedDict()
+
+    def get(self, code: str, area: str | None = None) -> Binding | None:
+        """Binding for a domain, or for one of its areas or subagents; None if unknown."""
+        domain = self.registry.get(code)
+        if domain is None:
+            return None
+        key = (code, area)
+        cached = self._bindings.get(key)
+        if cached is not None and cached[0] is domain:
+            self._bindings.move_to_end(key)
+            return cached[1]
+
+        scope = domain.areas.get(area) or domain.subagents.get(area) if area else None
+        if area and scope is None:
+            return None
+        tools = {t.name: t for t in (scope or domain).tools}
+        for tool in self.extra_tools:
+            tools.setdefault(tool.name, tool)
+        binding = Binding.create(
+            key=f"{code}/{area}" if area else code,
+            system_prompt=scope.prompt if scope else domain.system_prompt,
+            tools=list(tools.values()),
+            model=self.model,
+            approval_tools=domain.approval_tools,
+        )
+        self._bindings[key] = (domain, binding)
+        self._bindings.move_to_end(key)
+        while len(self._bindings) > self.max_entries:
+            self._bindings.popitem(last=False)
+        return binding
+
+    def clear(self) -> None:
+        self._bindings.clear()
+
+    def __len__(self) -> int:
+        return len(self._bindings)
@@ -0,0 +1,176 @@
+"""
+Local Fake Chat Model.
+
+A drop-in stand-in for `ChatAnthropic` that needs no network or API key.
+It streams scripted responses with configurable latency and can throttle
+like a rate-limited provider, so the server's model-call layers can be
+exercised and benchmarked locally.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> Callable[[], float]:
+    """Latency sampler with a lognormal distribution around `median` seconds."""
+    mu = math.log(median)
+    return lambda: random.lognormvariate(mu, sigma)
+
+
+def tail_latency(fast: float, slow: float, slow_fraction: float = 0.05) -> Callable[[], float]:
+    """Latency sampler that is usually `fast` but `slow` for a fraction of calls."""
+    return lambda: slow if random.random() < slow_fraction else fast
+
+
+def _usage(messages: list[BaseMessage], reply: AIMessage) -> dict:
+    """Rough token counts (~4 characters per token) for a scripted reply."""
+    input_tokens = sum(len(str(m.content)) for m in messages) // 4 + 1
+    output_tokens = len(str(reply.content)) // 4 + 1
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeChatModel when it is over capacity, like a provider 429."""
+
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Scripted chat model.
+
+    Each call takes the next entry from `responses` (cycling). Entries are
+    plain text or an AIMessage carrying tool calls. If `tool_calls` is set,
+    a turn that ends with a user message gets those tool calls first, and
+    the reply after the tool results is the next entry from `responses`,
+    which keeps tool loops deterministic under concurrency.
+
+    Attributes:
+        responses: Scripted replies, used in order
+        tool_calls: Tool calls ({"name", "args"}) to make on each user turn
+        latency: Seconds before the first token, or a callable returning them
+        token_delay: Seconds between streamed tokens
+        max_concurrency: Calls beyond this many in flight raise FakeRateLimitError
+        model: Reported model name
+    """
+
+    responses: list[str | AIMessage] = ["OK"]
+    tool_calls: list[dict] | None = None
+    latency: float | Callable[[], float] = 0.0
+    token_delay: float = 0.0
+    max_concurrency: int | None = None
+    model: str = "fake-chat"
+
+    _script: Iterator = PrivateAttr(default=None)
+    _in_flight: int = PrivateAttr(default=0)
+    calls: int = 0
+    throttled: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def _next_message(self, messages: list[BaseMessage]) -> AIMessage:
+        if self.tool_calls and messages and messages[-1].type == "human":
+            message = AIMessage(content="", tool_calls=[
+                {**tc, "id": f"toolu_{uuid.uuid4().hex[:12]}"} for tc in self.tool_calls
+            ])
+        else:
+            if self._script is None:
+                self._script = itertools.cycle(self.responses)
+            reply = next(self._script)
+            message = reply if isinstance(reply, AIMessage) else AIMessage(content=reply)
+        return message.model_copy(update={"usage_metadata": _usage(messages, message)})
+
+    def _first_token_delay(self) -> float:
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _enter(self) -> None:
+        if self.max_concurrency is not None and self._in_flight >= self.max_concurrency:
+            self.throttled += 1
+            raise FakeRateLimitError("rate_limit_error: too many concurrent requests")
+        self._in_flight += 1
+        self.calls += 1
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._enter()
+        try:
+            time.sleep(self._first_token_delay())
+            return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+        finally:
+            self._in_flight -= 1
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._enter()
+        try:
+            await asyncio.sleep(self._first_token_delay())
+            return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+        finally:
+            self._in_flight -= 1
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._enter()
+        try:
+            await asyncio.sleep(self._first_token_delay())
+            message = self._next_message(messages)
+            text = message.content if isinstance(message.content, str) else ""
+            for i, token in enumerate(text.split(" ")):
+                if i and self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(content=token if i == 0 else " " + token)
+                )
+            # Usage arrives on the last chunk, as with the Anthropic stream
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    usage_metadata=message.usage_metadata,
+                    tool_call_chunks=[
+                        {
+                            "name": tc["name"],
+                            "args": json.dumps(tc["args"]),
+                            "id": tc.get("id") or f"toolu_{uuid.uuid4().hex[:12]}",
+                            "index": i,
+                        }
+                        for i, tc in enumerate(message.tool_calls)
+                    ],
+                )
+            )
+        finally:
+            self._in_flight -= 1
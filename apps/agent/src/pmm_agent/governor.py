@@ -0,0 +1,183 @@
+"""
+Adaptive Concurrency Governor.
+
+Every outbound model call waits for a slot here. The number of slots
+adapts AIMD-style: it grows by roughly one per window of successful
+calls, and halves when the provider returns 429 or latency climbs well
+above the best we've seen. Waiters are served by priority, so interactive
+streams get ahead of batch work when capacity is short.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BATCH = 2
+
+
+def is_throttle(error: BaseException) -> bool:
+    """Whether an exception is the provider telling us to slow down."""
+    return (
+        getattr(error, "status_code", None) == 429
+        or type(error).__name__ == "RateLimitError"
+    )
+
+
+class Permit:
+    """Held for the duration of one governed call."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_at: float | None = None
+
+    def first_token(self) -> None:
+        """Mark the first streamed token; latency then means time-to-first-token."""
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    @property
+    def latency(self) -> float:
+        return (self.first_token_at or time.monotonic()) - self.started
+
+
+class AdaptiveGovernor:
+    """
+    Priority queue plus an AIMD concurrency limit.
+
+    Args:
+        initial_limit: Starting number of concurrent calls
+        min_limit: Floor the limit never drops below
+        max_limit: Ceiling the limit never grows past
+        backoff: Multiplier applied on a throttle or latency spike
+        latency_tolerance: A stream whose first token is slower than this
+            multiple of the best observed one counts as congestion
+        cooldown_seconds: Minimum time between two decreases, so one burst
+            of 429s only halves the limit once
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 3.0,
+        cooldown_seconds: float = 1.0,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.cooldown_seconds = cooldown_seconds
+
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._last_decrease = 0.0
+        self._min_latency: float | None = None
+
+        self.throttled = 0
+        self.completed = 0
+        self.avg_wait = 0.0
+        self.max_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.DEFAULT) -> AsyncIterator[Permit]:
+        """Wait for a slot, then hold it for the body of the `async with`."""
+        queued = time.monotonic()
+        await self._acquire(priority)
+        self._record_wait(time.monotonic() - queued)
+
+        permit = Permit()
+        try:
+            yield permit
+        except BaseException as e:
+            if is_throttle(e):
+                self.throttled += 1
+                self._decrease()
+            raise
+        else:
+            self.completed += 1
+            self._on_success(permit)
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        """Current limit, queue depth and wait times."""
+        by_priority = {p.name.lower(): 0 for p in Priority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                by_priority[Priority(priority).name.lower()] += 1
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": sum(by_priority.values()),
+            "queue_depth_by_priority": by_priority,
+            "avg_wait_ms": round(self.avg_wait * 1000, 1),
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "completed": self.completed,
+            "throttled": self.throttled,
+        }
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._order), future))
+        # Abandoned waiters may be all that's queued; grant in order now
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted and cancelled in the same tick: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _on_success(self, permit: Permit) -> None:
+        # Only time-to-first-token is comparable across calls; total time
+        # mostly tracks how long the answer was
+        if permit.first_token_at is not None:
+            latency = permit.latency
+            if self._min_latency is None or latency < self._min_latency:
+                self._min_latency = latency
+            if latency > self._min_latency * self.latency_tolerance:
+                self._decrease()
+                return
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_seconds:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def _record_wait(self, wait: float) -> None:
+        self.avg_wait = 0.9 * self.avg_wait + 0.1 * wait
+        self.max_wait = max(self.max_wait, wait)
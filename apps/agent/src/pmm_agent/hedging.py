@@ -0,0 +1,141 @@
+"""
+Hedged Model Streams.
+
+If a stream's first token hasn't arrived by the time most streams have
+produced theirs, start a second identical request and keep whichever
+answers first. The threshold follows a percentile of recent
+time-to-first-token, and a budget caps hedges to a fraction of requests
+so a slow provider doesn't get double the load.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Callable
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of `samples` (0 < q <= 1)."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index]
+
+
+class HedgePolicy:
+    """
+    When to hedge, and how often we're allowed to.
+
+    Args:
+        quantile: Hedge once the wait passes this quantile of recent TTFT
+        budget: Max hedges as a fraction of all requests
+        default_delay: Threshold used until enough samples exist
+        min_delay: Never hedge sooner than this
+        window: Number of recent TTFT samples kept
+        min_samples: Samples needed before the quantile is trusted
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget: float = 0.1,
+        default_delay: float = 2.0,
+        min_delay: float = 0.1,
+        window: int = 500,
+        min_samples: int = 20,
+    ):
+        self.quantile = quantile
+        self.budget = budget
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.samples: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> float:
+        """Seconds to wait for a first token before hedging."""
+        if len(self.samples) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, percentile(self.samples, self.quantile))
+
+    def observe(self, ttft: float) -> None:
+        self.samples.append(ttft)
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget, if any is left."""
+        if self.hedges >= self.budget * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": round(self.delay() * 1000, 1),
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+async def _close(stream: AsyncIterator, task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+    await stream.aclose()
+
+
+async def hedged_stream(
+    policy: HedgePolicy,
+    start: Callable[[], AsyncIterator],
+) -> AsyncIterator:
+    """
+    Stream from `start()`, hedging with a second call if it's slow to begin.
+
+    Whichever stream yields (or finishes) first wins; the other is
+    cancelled and closed. Errors only surface if every attempt fails.
+    """
+    policy.requests += 1
+    began = time.monotonic()
+
+    primary = start()
+    racers = {asyncio.ensure_future(anext(primary)): primary}
+    winner = first = None
+    try:
+        # Inside the try, so a caller cancelled during the delay still closes the primary
+        done, _ = await asyncio.wait(racers, timeout=policy.delay())
+        if not done and policy.try_spend():
+            backup = start()
+            racers[asyncio.ensure_future(anext(backup))] = backup
+
+        while racers:
+            done, _ = await asyncio.wait(racers, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stream = racers.pop(task)
+                error = asyncio.CancelledError() if task.cancelled() else task.exception()
+                if error is None or isinstance(error, StopAsyncIteration):
+                    winner, first = stream, task
+                    break
+                if not racers:
+                    raise error
+                await stream.aclose()
+            if winner is not None:
+                break
+    finally:
+        for task, stream in racers.items():
+            await _close(stream, task)
+
+    policy.observe(time.monotonic() - began)
+    if winner is not primary:
+        policy.hedge_wins += 1
+
+    try:
+        if isinstance(first.exception(), StopAsyncIteration):
+            return
+        yield first.result()
+        async for chunk in winner:
+            yield chunk
+    finally:
+        await winner.aclose()
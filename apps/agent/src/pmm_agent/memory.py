@@ -0,0 +1,146 @@
+"""
+Session Memory Accounting and Heap Diagnostics.
+
+`session_footprint()` measures what a session's history keeps alive,
+broken down by message role and by tool, so a large session can be
+traced to long tool outputs, pasted documents or repeated prompts.
+Objects shared across sessions (like the system prompt) are reported
+separately instead of being charged to every session.
+
+`HeapSnapshots` wraps tracemalloc: take numbered snapshots while the
+server runs and diff any two to see which lines kept allocating.
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+_CONTAINERS = (dict, list, tuple, set, frozenset)
+
+
+def deep_size(obj: Any, seen: set[int] | None = None) -> int:
+    """Bytes retained by `obj` and everything it contains, counting each object once."""
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, _CONTAINERS):
+            stack.extend(current)
+    return size
+
+
+def session_footprint(session: dict, shared: tuple = ()) -> dict:
+    """
+    Retained size of one session, by role and by tool.
+
+    Args:
+        session: Session dict holding a "messages" list
+        shared: Objects referenced by every session; counted under
+            "shared_bytes" rather than in the breakdown
+
+    Returns:
+        Totals plus `by_role` and `by_tool` byte counts. A tool's bytes are
+        its results plus the arguments the model passed when calling it.
+    """
+    shared_ids = {id(o) for o in shared}
+    seen: set[int] = set()
+    by_role: dict[str, int] = {}
+    by_tool: dict[str, int] = {}
+    shared_bytes = 0
+    largest = 0
+
+    for message in session["messages"]:
+        content = message.get("content")
+        if id(content) in shared_ids and id(content) not in seen:
+            shared_bytes += deep_size(content, seen)
+        size = deep_size(message, seen)
+        role = message.get("role", "unknown")
+        by_role[role] = by_role.get(role, 0) + size
+        largest = max(largest, size)
+        if role == "tool":
+            by_tool[message["name"]] = by_tool.get(message["name"], 0) + size
+        for tc in message.get("tool_calls", ()):
+            by_tool[tc["name"]] = by_tool.get(tc["name"], 0) + deep_size(tc["args"], set())
+
+    return {
+        "bytes": sum(by_role.values()) + deep_size(session, seen),
+        "shared_bytes": shared_bytes,
+        "messages": len(session["messages"]),
+        "largest_message_bytes": largest,
+        "by_role": by_role,
+        "by_tool": dict(sorted(by_tool.items(), key=lambda item: -item[1])),
+    }
+
+
+class HeapSnapshots:
+    """
+    Numbered tracemalloc snapshots of this process.
+
+    Tracing starts with the first snapshot and stays on until `stop()`,
+    since it slows allocation down noticeably.
+
+    Args:
+        frames: Stack depth recorded per allocation
+        keep: Snapshots kept (oldest dropped first)
+    """
+
+    def __init__(self, frames: int = 10, keep: int = 10):
+        self.frames = frames
+        self.keep = keep
+        self.snapshots: dict[int, tuple[float, tracemalloc.Snapshot]] = {}
+        self._next_id = 1
+
+    def take(self) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self.snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(self.snapshots) > self.keep:
+            del self.snapshots[min(self.snapshots)]
+        current, peak = tracemalloc.get_traced_memory()
+        return {"id": snapshot_id, "traced_bytes": current, "peak_bytes": peak}
+
+    def diff(self, before: int, after: int, limit: int = 20, group_by: str = "lineno") -> dict:
+        """Top allocation changes between two snapshots. Raises KeyError for unknown ids."""
+        taken_before, old = self.snapshots[before]
+        taken_after, new = self.snapshots[after]
+        stats = new.compare_to(old, group_by)
+        return {
+            "seconds_between": round(taken_after - taken_before, 3),
+            "total_size_diff": sum(s.size_diff for s in stats),
+            "top": [
+                {
+                    "size_diff": s.size_diff,
+                    "count_diff": s.count_diff,
+                    "size": s.size,
+                    "traceback": [f"{f.filename}:{f.lineno}" for f in s.traceback],
+                }
+                for s in stats[:limit]
+            ],
+        }
+
+    def list(self) -> list[dict]:
+        return [
+            {"id": snapshot_id, "at": taken, "traces": len(snapshot.traces)}
+            for snapshot_id, (taken, snapshot) in self.snapshots.items()
+        ]
+
+    def stop(self) -> None:
+        self.snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,220 @@
+"""
+Token Metering and Budgets.
+
+Every model response's usage metadata is charged to the session whose
+request made the upstream call, its tenant and the request mode.
+Responses served from the cache, or shared from an identical in-flight
+call, cost the requests that receive them nothing. Input tokens are further
+split across what filled the context (system prompt, user and assistant
+turns, and each tool's results) in proportion to their size, so a session
+whose context is mostly `fetch_url` output shows up as such.
+
+Budgets are in total tokens, per session and per tenant (the tenant
+budget resets every window). As a session approaches either limit it is
+degraded rather than cut off:
+
+    < 75%   full       whole history, normal tool rounds
+    >= 75%  trimmed    only the most recent messages are sent
+    >= 90%  limited    trimmed, and at most one round of tool calls
+    >= 100% refuse     new turns are rejected with 429
+"""
+
+import time
+
+FULL = "full"
+TRIMMED = "trimmed"
+LIMITED = "limited"
+REFUSE = "refuse"
+
+# Fraction of the tightest budget at which each level starts
+LEVELS = ((1.0, REFUSE), (0.9, LIMITED), (0.75, TRIMMED))
+
+
+def _context_source(message) -> str:
+    if message.type == "tool":
+        return f"tool:{message.name}"
+    return {"human": "user", "ai": "assistant"}.get(message.type, message.type)
+
+
+def _size(message) -> int:
+    size = len(str(message.content))
+    for tc in getattr(message, "tool_calls", None) or []:
+        size += len(str(tc.get("args", "")))
+    return size
+
+
+def attribute_input(messages: list, input_tokens: int, system_prompt: str = "") -> dict[str, int]:
+    """Split `input_tokens` across context sources by their share of characters."""
+    sizes = {"system": len(system_prompt)} if system_prompt else {}
+    for message in messages:
+        source = _context_source(message)
+        sizes[source] = sizes.get(source, 0) + _size(message)
+    total = sum(sizes.values())
+    if not total:
+        return {}
+    return {source: round(input_tokens * size / total) for source, size in sizes.items()}
+
+
+def trim_history(messages: list, keep: int) -> list:
+    """
+    The last `keep` messages, starting at a user turn.
+
+    A tool result must follow the assistant message that called it, so the
+    cut moves forward to the next user message; if that would drop the
+    current turn, it moves back to the start of it instead.
+    """
+    if len(messages) <= keep:
+        return messages
+    start = len(messages) - keep
+    human = [i for i, m in enumerate(messages) if m.type == "human"]
+    cut = next((i for i in human if i >= start), human[-1] if human else 0)
+    return messages[cut:]
+
+
+class Usage:
+    """Token totals for one session, tenant or mode."""
+
+    __slots__ = ("input_tokens", "output_tokens", "calls", "context_tokens")
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+        self.context_tokens: dict[str, int] = {}
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, input_tokens: int, output_tokens: int, context: dict[str, int]) -> None:
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.calls += 1
+        for source, tokens in context.items():
+            self.context_tokens[source] = self.context_tokens.get(source, 0) + tokens
+
+    def cost(self, input_price: float, output_price: float) -> float:
+        """USD, given prices per million tokens."""
+        return (self.input_tokens * input_price + self.output_tokens * output_price) / 1e6
+
+    def to_dict(self, input_price: float, output_price: float) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "model_calls": self.calls,
+            "cost_usd": round(self.cost(input_price, output_price), 6),
+            "context_tokens": dict(
+                sorted(self.context_tokens.items(), key=lambda item: -item[1])
+            ),
+        }
+
+
+class UsageMeter:
+    """
+    Usage per session, tenant and mode, and the budget level that follows.
+
+    Args:
+        session_budget: Max tokens per session (0 = unlimited)
+        tenant_budget: Max tokens per tenant per window (0 = unlimited)
+        tenant_window_seconds: How often tenant usage resets
+        input_price: USD per million input tokens
+        output_price: USD per million output tokens
+    """
+
+    def __init__(
+        self,
+        session_budget: int = 0,
+        tenant_budget: int = 0,
+        tenant_window_seconds: float = 86400.0,
+        input_price: float = 3.0,
+        output_price: float = 15.0,
+    ):
+        self.session_budget = session_budget
+        self.tenant_budget = tenant_budget
+        self.tenant_window_seconds = tenant_window_seconds
+        self.input_price = input_price
+        self.output_price = output_price
+        self.sessions: dict[str, Usage] = {}
+        self.tenants: dict[str, Usage] = {}
+        self.modes: dict[str, Usage] = {}
+        self._window_started = time.monotonic()
+
+    def _roll_window(self) -> None:
+        if time.monotonic() - self._window_started >= self.tenant_window_seconds:
+            self.tenants.clear()
+            self._window_started = time.monotonic()
+
+    def record(
+        self,
+        session_id: str | None,
+        tenant: str,
+        mode: str,
+        messages: list,
+        response,
+        system_prompt: str = "",
+    ) -> dict[str, int]:
+        """
+        Charge one model response.
+
+        Args:
+            session_id: None for the server's own calls, which no session pays for
+            messages: The history that was sent (without the system prompt)
+            response: The model message carrying `usage_metadata`
+
+        Returns:
+            Input tokens by context source
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return {}
+        self._roll_window()
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        context = attribute_input(messages, input_tokens, system_prompt)
+        for key, table in ((session_id, self.sessions), (tenant, self.tenants), (mode, self.modes)):
+            if key is None:
+                continue
+            if key not in table:
+                table[key] = Usage()
+            table[key].add(input_tokens, output_tokens, context)
+        return context
+
+    def fraction(self, session_id: str | None, tenant: str) -> float:
+        """How much of the tighter of its session and tenant budgets a session has used."""
+        self._roll_window()
+        fraction = 0.0
+        if self.session_budget and session_id in self.sessions:
+            fraction = self.sessions[session_id].total_tokens / self.session_budget
+        if self.tenant_budget and tenant in self.tenants:
+            fraction = max(fraction, self.tenants[tenant].total_tokens / self.tenant_budget)
+        return fraction
+
+    def level(self, session_id: str | None, tenant: str) -> str:
+        """Degradation level for the next model call of a session."""
+        fraction = self.fraction(session_id, tenant)
+        for threshold, name in LEVELS:
+            if fraction >= threshold:
+                return name
+        return FULL
+
+    def forget(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+
+    def session_report(self, session_id: str) -> dict | None:
+        usage = self.sessions.get(session_id)
+        if usage is None:
+            return None
+        report = usage.to_dict(self.input_price, self.output_price)
+        report["budget"] = self.session_budget or None
+        return report
+
+    def report(self) -> dict:
+        prices = (self.input_price, self.output_price)
+        return {
+            "tenants": {t: u.to_dict(*prices) for t, u in self.tenants.items()},
+            "modes": {m: u.to_dict(*prices) for m, u in self.modes.items()},
+            "sessions": len(self.sessions),
+            "session_budget": self.session_budget or None,
+            "tenant_budget": self.tenant_budget or None,
+        }
@@ -0,0 +1,197 @@
+"""
+Prometheus Metrics.
+
+A small dependency-free registry of counters, histograms and gauges,
+rendered in the Prometheus text format for `/metrics`. Recording is a
+dict lookup plus a bisect, so it's cheap enough for the streaming hot path.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable
+
+# Seconds; covers sub-millisecond serialization up to multi-minute turns
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+def _label_str(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, *label_values) -> None:
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in self.values.items():
+            lines.append(f"{self.name}{_label_str(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self.series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _label_str(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, values)} {series[-1]}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from a callback returning {label values: value}."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], dict[tuple, float]],
+        labels: Iterable[str] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.read = read
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for values, value in self.read().items():
+            lines.append(f"{self.name}{_label_str(self.labels, values)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "pmm_requests_total", "Chat requests handled", ["mode"]))
+REQUEST_SECONDS = registry.register(Histogram(
+    "pmm_request_seconds", "Wall time per chat request", ["mode"]))
+QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "pmm_queue_wait_seconds", "Time spent waiting for a model-call slot per request", ["mode"]))
+TTFT_SECONDS = registry.register(Histogram(
+    "pmm_time_to_first_token_seconds", "Request start to first model output", ["mode"]))
+MODEL_SECONDS = registry.register(Histogram(
+    "pmm_model_seconds", "Total time in model calls per request", ["mode"]))
+TOOL_SECONDS = registry.register(Histogram(
+    "pmm_tool_seconds", "Time per tool execution", ["tool"]))
+SSE_SERIALIZE_SECONDS = registry.register(Histogram(
+    "pmm_sse_serialize_seconds", "Time spent serializing SSE events per request", ["mode"]))
+STREAM_BYTES = registry.register(Counter(
+    "pmm_stream_bytes_total", "SSE bytes produced", ["mode"]))
+TOKENS = registry.register(Counter(
+    "pmm_tokens_total", "Model tokens by direction", ["mode", "direction"]))
+TOOL_CONTEXT_TOKENS = registry.register(Counter(
+    "pmm_tool_context_tokens_total", "Input tokens spent re-sending each tool's results", ["tool"]))
+MODEL_COST_USD = registry.register(Counter(
+    "pmm_model_cost_usd_total", "Estimated model spend", ["mode"]))
+BUDGET_DEGRADED = registry.register(Counter(
+    "pmm_budget_degraded_total", "Turns run below full service because of a token budget", ["level"]))
+
+
+class RequestTimings:
+    """
+    Per-request latency breakdown, flushed to the histograms on `finish()`.
+
+    The active request is kept in a context variable so the model-call
+    layers can add to it without threading it through every signature.
+    """
+
+    __slots__ = (
+        "mode", "started", "queue_wait", "first_token", "model_time",
+        "serialize_time", "bytes", "input_tokens", "output_tokens",
+    )
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.queue_wait = 0.0
+        self.first_token: float | None = None
+        self.model_time = 0.0
+        self.serialize_time = 0.0
+        self.bytes = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+
+    def add_usage(self, message) -> None:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def finish(self) -> None:
+        mode = self.mode
+        REQUESTS.inc(1, mode)
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started, mode)
+        QUEUE_WAIT_SECONDS.observe(self.queue_wait, mode)
+        MODEL_SECONDS.observe(self.model_time, mode)
+        if self.first_token is not None:
+            TTFT_SECONDS.observe(self.first_token, mode)
+        if self.bytes:
+            SSE_SERIALIZE_SECONDS.observe(self.serialize_time, mode)
+            STREAM_BYTES.inc(self.bytes, mode)
+        if self.input_tokens:
+            TOKENS.inc(self.input_tokens, mode, "input")
+        if self.output_tokens:
+            TOKENS.inc(self.output_tokens, mode, "output")
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
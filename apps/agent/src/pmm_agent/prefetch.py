@@ -0,0 +1,128 @@
+"""
+Speculative Tool Prefetch.
+
+Users paste competitor URLs (or name competitors the session already has
+battlecards for) and the model then spends a round deciding to call
+`fetch_url` or `get_artifact` on them. When a turn starts, the server
+scans the user message and starts those calls right away, concurrently
+with the first model call. If the model then asks for one of them, the
+round takes the speculative result, or joins the call still in flight,
+instead of running the tool again.
+
+Speculation is bounded per turn: at most `max_per_request` calls, each
+cancelled after `timeout` seconds. Whatever the model didn't ask for is
+cancelled when the turn ends and counted as wasted.
+"""
+
+import asyncio
+import json
+import re
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+
+# Scheme required, so bare words with dots ("Node.js") aren't fetched
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'`\[\]{}|\\^]+", re.IGNORECASE)
+
+# Punctuation that ends a sentence rather than the URL it follows
+_TRAILING = ".,;:!?)'\""
+
+
+def find_urls(text: str) -> list[str]:
+    """URLs in a message, in order and without duplicates."""
+    urls = [m.group().rstrip(_TRAILING) for m in URL_PATTERN.finditer(text)]
+    return list(dict.fromkeys(url for url in urls if "." in url.split("://", 1)[1]))
+
+
+def find_names(text: str, names: list[str]) -> list[str]:
+    """Which of `names` the message mentions as whole words, ignoring case."""
+    return [
+        name for name in names
+        if name and re.search(rf"(?<!\w){re.escape(name)}(?!\w)", text, re.IGNORECASE)
+    ]
+
+
+def call_key(name: str, args: dict) -> str:
+    """
+    Identity of a tool call.
+
+    Arguments must match exactly: results echo them (`fetch_url`'s heading
+    names its URL), so even a trailing slash makes it a different call.
+    """
+    return f"{name}:{json.dumps(args, sort_keys=True)}"
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    """Mark a failure as seen; unclaimed calls fail (or time out) with nobody awaiting them."""
+    if not future.cancelled():
+        future.exception()
+
+
+class Speculation:
+    """The speculative calls of one turn."""
+
+    def __init__(self, prefetcher: "Prefetcher"):
+        self.prefetcher = prefetcher
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    def start(self, name: str, args: dict, run: Callable[[], Awaitable[str]]) -> bool:
+        """Start a call unless it already was or the turn is at its cap."""
+        key = call_key(name, args)
+        if key in self.tasks:
+            return False
+        if len(self.tasks) >= self.prefetcher.max_per_request:
+            self.prefetcher.dropped += 1
+            return False
+        call = asyncio.ensure_future(run())
+        task = asyncio.create_task(asyncio.wait_for(call, self.prefetcher.timeout))
+        # wait_for drops the call's exception when it is cancelled or times out
+        for future in (call, task):
+            future.add_done_callback(_retrieve)
+        self.tasks[key] = task
+        self.prefetcher.started += 1
+        return True
+
+    async def claim(self, call: dict) -> str | None:
+        """The speculative result for a tool call, or None if it must run normally."""
+        task = self.tasks.pop(call_key(call["name"], call["args"]), None)
+        if task is None:
+            return None
+        try:
+            result = await task
+        except Exception:  # including the timeout; the call just runs for real
+            return None
+        self.prefetcher.used += 1
+        return result
+
+    def close(self) -> None:
+        """Cancel whatever the model didn't ask for."""
+        for task in self.tasks.values():
+            task.cancel()
+        self.prefetcher.wasted += len(self.tasks)
+        self.tasks.clear()
+
+
+class Prefetcher:
+    """
+    Limits and counters shared by every turn's speculation.
+
+    Args:
+        max_per_request: Speculative calls started per turn at most
+        timeout: Seconds a speculative call may run before it is cancelled
+    """
+
+    def __init__(self, max_per_request: int = 4, timeout: float = 10.0):
+        self.max_per_request = max_per_request
+        self.timeout = timeout
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.dropped = 0  # detected but over the per-turn cap
+
+    def begin(self) -> Speculation:
+        return Speculation(self)
+
+
+# The running turn's speculation, consulted before a tool call is executed
+current_speculation: ContextVar[Speculation | None] = ContextVar(
+    "current_speculation", default=None
+)
@@ -0,0 +1,152 @@
+"""
+Sampling Profiler and Event-Loop Lag Monitor.
+
+Both work from `sys._current_frames()` on a helper thread, so they can be
+switched on in a live worker without restarting it or slowing the event
+loop down measurably.
+
+- `sample_stacks()` records every thread's stack at a fixed interval and
+  returns folded stacks ("root;caller;callee count" per line), the input
+  format of flamegraph.pl, speedscope and inferno.
+- `LoopMonitor` keeps a heartbeat on the event loop and a watchdog thread.
+  When the heartbeat is late by more than the threshold, the watchdog
+  captures the loop thread's stack while it is still blocked, which names
+  the callback responsible (e.g. a synchronous HTTP call in a tool).
+"""
+
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the folded format
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _fold(frame, root: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(
+    seconds: float,
+    interval: float = 0.005,
+    thread_ids: set[int] | None = None,
+) -> collections.Counter:
+    """
+    Sample stacks for `seconds`. Blocks the calling thread, so run it in
+    a worker thread (`asyncio.to_thread`).
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        thread_ids: Only sample these threads (default: all but the sampler)
+
+    Returns:
+        Folded stack -> number of samples
+    """
+    me = threading.get_ident()
+    counts: collections.Counter = collections.Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            counts[_fold(frame, names.get(thread_id, f"thread-{thread_id}"))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def render_folded(counts: collections.Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+class LoopMonitor:
+    """
+    Detects callbacks that block the event loop and records their stacks.
+
+    Args:
+        threshold: Seconds the loop may be unresponsive before it is recorded
+        interval: Heartbeat period
+        max_events: Blocking events kept (oldest dropped first)
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02, max_events: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.events: collections.deque[dict] = collections.deque(maxlen=max_events)
+        self.blocked = 0
+        self.max_lag = 0.0
+        self._due = 0.0
+        self._open: dict | None = None
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running loop. Call from inside it."""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._due = time.monotonic() + self.interval
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._due
+            self.max_lag = max(self.max_lag, lag)
+            if self._open is not None:
+                # The watchdog saw this stall; now we know how long it lasted
+                self._open["blocked_ms"] = round(lag * 1000, 1)
+                self._open = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._due
+            if stalled < self.threshold or self._open is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            event = {
+                "at": time.time(),
+                "blocked_ms": round(stalled * 1000, 1),  # updated when the loop resumes
+                "stack": traceback.format_stack(frame)[-30:],
+            }
+            self.blocked += 1
+            self._open = event
+            self.events.append(event)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocked_callbacks": self.blocked,
+            "recent": list(self.events),
+        }
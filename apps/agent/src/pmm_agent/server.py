@@ -3,23 +3,80 @@ Simple FastAPI server for PMM Deep Agent.
 Runs without Docker or LangSmith.
 """
 
+import asyncio
+import hmac
 import os
-import json
+import threading
+import time
 import uuid
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 
+from .artifacts import ArtifactStore, artifact_tools
+from .bulk import BattlecardJob, JobStore, run_battlecards
+from .cache import ResponseCache
+from .cassettes import Cassette, RecordingChatModel, ReplayChatModel
+from .channels import Channel
+from .compaction import SUMMARY_INSTRUCTIONS, Compactor
+from .domains import Binding, DomainBindings, DomainRegistry
+from .governor import AdaptiveGovernor, Priority
+from .hedging import HedgePolicy, hedged_stream
+from .memory import HeapSnapshots, session_footprint
+from .metering import FULL, LIMITED, REFUSE, UsageMeter, trim_history
+from .metrics import (
+    BUDGET_DEGRADED,
+    MODEL_COST_USD,
+    TOOL_CONTEXT_TOKENS,
+    TOOL_SECONDS,
+    Gauge,
+    RequestTimings,
+    current_timings,
+    registry,
+)
+from .prefetch import Prefetcher, Speculation, current_speculation, find_names, find_urls
+from .profiling import LoopMonitor, render_folded, sample_stacks
 from .prompts import MAIN_SYSTEM_PROMPT
-from .tools import ALL_TOOLS
+from .singleflight import SingleFlight, request_key
+from .streams import StreamRegistry, TurnStream
+from .tools import ALL_TOOLS, HUMAN_APPROVAL_TOOLS, OUTPUT_TYPES, render_markdown
+from .tracing import configure_tracing, request_span, span
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global loop_thread_id
+    loop_thread_id = threading.get_ident()
+    if loop_monitor is not None:
+        loop_monitor.start()
+    watcher = None
+    if DOMAIN_RELOAD_SECONDS > 0:
+        watcher = asyncio.create_task(domains.watch(DOMAIN_RELOAD_SECONDS))
+    compacting = asyncio.create_task(compactor.run()) if compactor is not None else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    if compacting is not None:
+        compacting.cancel()
+    if loop_monitor is not None:
+        loop_monitor.stop()
+
+
+app = FastAPI(title="PMM Deep Agent", version="0.1.0", lifespan=lifespan)
+configure_tracing()
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes")
 
-app = FastAPI(title="PMM Deep Agent", version="0.1.0")
 
 # CORS - Remove "*" when using allow_credentials=True
 ALLOWED_ORIGINS = [
@@ -38,26 +95,669 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Initialize model with tools
-llm = ChatAnthropic(
-    model_name=os.getenv("MODEL", "claude-sonnet-4-20250514"),
-    max_tokens=8192,
+# Deliverables kept once by content hash; history holds a reference to them
+ARTIFACTS = _env_flag("ARTIFACTS")
+artifacts = ArtifactStore(
+    directory=os.getenv("ARTIFACT_DIR") or None,
+    cache_size=int(os.getenv("ARTIFACT_CACHE_SIZE", "256")),
+    keyframe_interval=int(os.getenv("ARTIFACT_KEYFRAME_INTERVAL", "8")),
+)
+ARTIFACT_TOOLS = artifact_tools(artifacts) if ARTIFACTS else []
+SERVER_TOOLS = ALL_TOOLS + ARTIFACT_TOOLS
+
+# Revision diffs up to this size go into history with the revision's reference
+INLINE_DIFF_CHARS = int(os.getenv("ARTIFACT_INLINE_DIFF_CHARS", "1500"))
+
+# Domain configs are validated against the server's tools at startup (an invalid
+# one stops the server) and reloaded in the background when their files change
+DOMAINS_DIR = os.getenv("DOMAINS_DIR") or os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "config", "domains")
+)
+DOMAIN_RELOAD_SECONDS = float(os.getenv("DOMAIN_RELOAD_SECONDS", "5"))
+domains = DomainRegistry(DOMAINS_DIR, SERVER_TOOLS)
+domains.load()
+
+# Initialize model with tools; CASSETTE_MODE records or replays model calls
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "").lower()
+if CASSETTE_MODE == "replay":
+    llm = ReplayChatModel.load(
+        os.environ["CASSETTE_PATH"],
+        speed=float(os.getenv("CASSETTE_SPEED", "1")),
+        cycle=_env_flag("CASSETTE_CYCLE"),
+    )
+else:
+    llm = ChatAnthropic(
+        model_name=os.getenv("MODEL", "claude-sonnet-4-20250514"),
+        max_tokens=8192,
+    )
+    if CASSETTE_MODE == "record":
+        llm = RecordingChatModel(
+            inner=llm, cassette=Cassette(os.environ["CASSETTE_PATH"]), model=llm.model
+        )
+# Requests without a domain get the built-in PMM agent, unless DEFAULT_DOMAIN
+# names a config to route them to instead
+default_binding = Binding.create(
+    "default", MAIN_SYSTEM_PROMPT, SERVER_TOOLS, llm, HUMAN_APPROVAL_TOOLS
+)
+DEFAULT_DOMAIN = os.getenv("DEFAULT_DOMAIN", "")
+
+# Every domain's binding wraps the same `llm`, so all domains share its client
+# and connection pool; only the bound tools and system prompt differ
+bindings = DomainBindings(
+    domains,
+    llm,
+    extra_tools=ARTIFACT_TOOLS,
+    max_entries=int(os.getenv("DOMAIN_BINDING_CACHE", "32")),
 )
-llm_with_tools = llm.bind_tools(ALL_TOOLS)
+
+
+def set_model(model) -> None:
+    """Serve every domain with another chat model, e.g. a fake for benchmarks."""
+    global llm, default_binding
+    llm = model
+    default_binding = Binding.create(
+        "default", MAIN_SYSTEM_PROMPT, SERVER_TOOLS, model, HUMAN_APPROVAL_TOOLS
+    )
+    bindings.model = model
+    bindings.clear()
+
+# Model/tool round trips allowed per turn before we stop executing tools
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "5"))
 
 # Simple in-memory session storage
 sessions: dict = {}
 
+# In-progress /chat/stream turns, kept resumable via Last-Event-ID
+streams = StreamRegistry(
+    max_events=int(os.getenv("STREAM_REPLAY_EVENTS", "1024")),
+    grace_seconds=float(os.getenv("STREAM_GRACE_SECONDS", "30")),
+)
+
+# Running /battlecards/bulk jobs, by job id; kept apart from `streams` so a
+# chat session id can never name (and resume) a job's stream
+job_streams = StreamRegistry(
+    max_events=int(os.getenv("STREAM_REPLAY_EVENTS", "1024")),
+    grace_seconds=float(os.getenv("STREAM_GRACE_SECONDS", "30")),
+)
+
+# Sessions with a /chat turn running; streamed turns (and approval continuations) are in `streams`
+chat_turns: set[str] = set()
+
+# Identical in-flight model requests share one upstream call
+flights = SingleFlight()
+
+# Optional cache of complete responses, keyed like single-flight
+response_cache = (
+    ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    )
+    if _env_flag("RESPONSE_CACHE")
+    else None
+)
+
+
+# Shared limit on concurrent upstream model calls, adapted to 429s and latency
+governor = AdaptiveGovernor(
+    initial_limit=int(os.getenv("MODEL_CONCURRENCY", "8")),
+    min_limit=int(os.getenv("MODEL_CONCURRENCY_MIN", "1")),
+    max_limit=int(os.getenv("MODEL_CONCURRENCY_MAX", "64")),
+)
+
+# Optional second request for streams whose first token is unusually slow
+hedge = (
+    HedgePolicy(
+        quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+        budget=float(os.getenv("HEDGE_BUDGET", "0.1")),
+    )
+    if _env_flag("HEDGE_STREAMS")
+    else None
+)
+
+# Admin endpoints (/admin/*) are disabled unless this is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Optional watchdog that records callbacks blocking the event loop
+loop_monitor = (
+    LoopMonitor(threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000)
+    if _env_flag("LOOP_MONITOR")
+    else None
+)
+loop_thread_id: int | None = None
+profile_lock = asyncio.Lock()
+
+# tracemalloc snapshots taken through /admin/heap
+heap = HeapSnapshots(frames=int(os.getenv("HEAP_TRACE_FRAMES", "10")))
+
+# Token usage per session/tenant/mode, and budgets that degrade service
+meter = UsageMeter(
+    session_budget=int(os.getenv("SESSION_TOKEN_BUDGET", "0")),
+    tenant_budget=int(os.getenv("TENANT_TOKEN_BUDGET", "0")),
+    tenant_window_seconds=float(os.getenv("TENANT_BUDGET_WINDOW_SECONDS", "86400")),
+    input_price=float(os.getenv("MODEL_INPUT_PRICE", "3.0")),
+    output_price=float(os.getenv("MODEL_OUTPUT_PRICE", "15.0")),
+)
+
+# Messages sent per model call once a session is over its soft budget
+BUDGET_CONTEXT_MESSAGES = int(os.getenv("BUDGET_CONTEXT_MESSAGES", "12"))
+
+# With REQUIRE_APPROVAL, HUMAN_APPROVAL_TOOLS calls pause the turn until a
+# reviewer decides. Nothing waits: the turn's state is just stored here and
+# in the session until POST /approvals/{id} picks it up again.
+REQUIRE_APPROVAL = _env_flag("REQUIRE_APPROVAL")
+approvals: dict[str, dict] = {}
+
+# Open /ws connections; each gets pushes for the sessions it has streamed
+channels: set[Channel] = set()
+WS_STREAM_WINDOW = int(os.getenv("WS_STREAM_WINDOW", "64"))
+WS_MAX_STREAMS = int(os.getenv("WS_MAX_STREAMS", "16"))
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", "256"))
+
+# With COMPACTION, sessions whose history is large (or has many turns) get their
+# older turns summarized in the background after a turn, with key facts pinned
+compactor = (
+    Compactor(
+        summarize=lambda session_id, transcript: _summarize(session_id, transcript),
+        keep_messages=int(os.getenv("COMPACT_KEEP_MESSAGES", "8")),
+        context_tokens=int(os.getenv("COMPACT_CONTEXT_TOKENS", "30000")),
+        max_turns=int(os.getenv("COMPACT_TURNS", "20")),
+    )
+    if _env_flag("COMPACTION")
+    else None
+)
+
+# With PREFETCH, URLs and known competitors in a user message are fetched and
+# looked up alongside the turn's first model call, ready for when it asks
+prefetcher = (
+    Prefetcher(
+        max_per_request=int(os.getenv("PREFETCH_MAX_CALLS", "4")),
+        timeout=float(os.getenv("PREFETCH_TIMEOUT_SECONDS", "10")),
+    )
+    if _env_flag("PREFETCH")
+    else None
+)
+
+# Bulk battlecard jobs; with JOB_DIR set, finished cards survive restarts
+jobs = JobStore(os.getenv("JOB_DIR") or None)
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "8"))
+
+
+def _model_key(messages: list, binding: Binding) -> str:
+    return request_key(llm.model, binding.system_prompt, binding.tools, messages)
+
+
+async def _governed_invoke(model_input: list, priority: Priority, model=None):
+    timings = current_timings.get()
+    with span("model.invoke", **{"llm.model": llm.model}) as model_span:
+        queued = time.perf_counter()
+        async with governor.slot(priority):
+            model_span.set_attribute("queue_wait_ms", (time.perf_counter() - queued) * 1000)
+            if timings:
+                timings.queue_wait += time.perf_counter() - queued
+            response = await (model or default_binding.model).ainvoke(model_input)
+        _record_usage(model_span, response)
+    if timings:
+        timings.add_usage(response)
+    return response
+
+
+async def _governed_stream(model_input: list, priority: Priority, model=None):
+    timings = current_timings.get()
+    with span("model.stream", **{"llm.model": llm.model}) as model_span:
+        queued = time.perf_counter()
+        async with governor.slot(priority) as permit:
+            model_span.set_attribute("queue_wait_ms", (time.perf_counter() - queued) * 1000)
+            if timings:
+                timings.queue_wait += time.perf_counter() - queued
+            response = None
+            async for chunk in (model or default_binding.model).astream(model_input):
+                if response is None:
+                    permit.first_token()
+                    model_span.set_attribute("ttft_ms", (time.perf_counter() - queued) * 1000)
+                response = chunk if response is None else response + chunk
+                if timings:
+                    timings.add_usage(chunk)
+                yield chunk
+        _record_usage(model_span, response)
+
+
+def _record_usage(model_span, message) -> None:
+    usage = getattr(message, "usage_metadata", None) or {}
+    model_span.set_attribute("llm.input_tokens", usage.get("input_tokens", 0))
+    model_span.set_attribute("llm.output_tokens", usage.get("output_tokens", 0))
+
+
+async def _invoke_model(
+    messages: list,
+    binding: Binding | None = None,
+    use_cache: bool = True,
+    priority: Priority = Priority.DEFAULT,
+) -> tuple:
+    """
+    Call the model, sharing the call with identical in-flight requests.
+
+    Returns:
+        The response, and whether this request made the upstream call for it
+        (False when it came from the cache or from joining another request's)
+    """
+    timings = current_timings.get()
+    binding = binding or default_binding
+    key = _model_key(messages, binding)
+    use_cache = use_cache and response_cache is not None
+    if use_cache and (cached := response_cache.get_message(key)) is not None:
+        if timings:
+            timings.mark_first_token()
+        return cached, False
+
+    upstream = not flights.running(key)
+    started = time.perf_counter()
+    response = await flights.do(
+        key,
+        lambda: _governed_invoke(
+            [{"role": "system", "content": binding.system_prompt}] + messages,
+            priority,
+            binding.model,
+        ),
+    )
+    if timings:
+        timings.model_time += time.perf_counter() - started
+        timings.mark_first_token()
+    if use_cache:
+        response_cache.put(key, [response])
+    return response, upstream
+
+
+def _stream_model(
+    messages: list,
+    binding: Binding | None = None,
+    use_cache: bool = True,
+    priority: Priority = Priority.INTERACTIVE,
+) -> tuple[AsyncIterator, bool]:
+    """
+    Stream the model, attaching to an identical in-flight stream if any.
+
+    Returns:
+        The chunks, and whether this request makes the upstream call for them
+        (False when they come from the cache or from another request's stream)
+    """
+    binding = binding or default_binding
+    key = _model_key(messages, binding)
+    use_cache = use_cache and response_cache is not None
+    if use_cache and (cached := response_cache.get_chunks(key)) is not None:
+        return _replay_chunks(cached), False
+    upstream = not flights.running(key)
+    return _shared_stream(key, messages, binding, use_cache, priority), upstream
+
+
+async def _replay_chunks(chunks: list) -> AsyncGenerator:
+    timings = current_timings.get()
+    if timings:
+        timings.mark_first_token()
+    for chunk in chunks:
+        yield chunk
+
+
+async def _shared_stream(
+    key: str, messages: list, binding: Binding, use_cache: bool, priority: Priority
+) -> AsyncGenerator:
+    timings = current_timings.get()
+    model_input = [{"role": "system", "content": binding.system_prompt}] + messages
+
+    def start():
+        return _governed_stream(model_input, priority, binding.model)
+
+    chunks = []
+    started = time.perf_counter()
+    try:
+        async for chunk in flights.stream(
+            key,
+            (lambda: hedged_stream(hedge, start)) if hedge else start,
+        ):
+            if timings:
+                timings.mark_first_token()
+            chunks.append(chunk)
+            yield chunk
+    finally:
+        if timings:
+            timings.model_time += time.perf_counter() - started
+    if use_cache:
+        response_cache.put(key, chunks)
+
+
+def _history(session: dict) -> list:
+    """Convert stored session messages to LangChain messages."""
+    messages = []
+    for m in session["messages"]:
+        # A compacted summary is sent as user content ahead of the turns it replaced
+        if m["role"] in ("user", "summary"):
+            messages.append(HumanMessage(content=m["content"]))
+        elif m["role"] == "assistant":
+            messages.append(AIMessage(content=m["content"], tool_calls=m.get("tool_calls", [])))
+        elif m["role"] == "tool":
+            messages.append(ToolMessage(
+                content=m["content"], tool_call_id=m["tool_call_id"], name=m["name"]
+            ))
+    return messages
+
+
+def _budget_level(session_id: str | None, tenant: str) -> str:
+    """Degradation level for a new turn; refuses outright once over budget."""
+    level = meter.level(session_id, tenant)
+    if level == REFUSE:
+        BUDGET_DEGRADED.inc(1, level)
+        raise HTTPException(status_code=429, detail="Token budget exhausted for this session or tenant")
+    if level != FULL:
+        BUDGET_DEGRADED.inc(1, level)
+    return level
+
+
+def _budgeted_history(session: dict, level: str) -> list:
+    history = _history(session)
+    if level == FULL:
+        return history
+    trimmed = trim_history(history, BUDGET_CONTEXT_MESSAGES)
+    if trimmed is not history and session["messages"][1]["role"] == "summary":
+        # Trimming never drops the pinned facts
+        trimmed = history[:1] + trimmed
+    return trimmed
+
+
+def _tool_rounds(level: str) -> int:
+    """Tool rounds allowed per turn at a budget level."""
+    if level == LIMITED:
+        return min(1, MAX_TOOL_ROUNDS)
+    return 0 if level == REFUSE else MAX_TOOL_ROUNDS
+
+
+def _charge(
+    session_id: str,
+    session: dict,
+    mode: str,
+    history: list,
+    response,
+    binding: Binding,
+    upstream: bool = True,
+) -> str:
+    """
+    Meter one model response; returns the session's budget level afterwards.
+
+    Only the request that made the upstream call pays for it: a response
+    from the cache or from joining an identical in-flight call is free.
+    """
+    if upstream:
+        _record_charge(
+            session_id, session["tenant"], mode, history, response, binding.system_prompt
+        )
+    return meter.level(session_id, session["tenant"])
+
+
+def _record_charge(
+    session_id: str | None, tenant: str, mode: str, history: list, response, system_prompt: str = ""
+) -> None:
+    context = meter.record(session_id, tenant, mode, history, response, system_prompt)
+    for source, tokens in context.items():
+        if source.startswith("tool:"):
+            TOOL_CONTEXT_TOKENS.inc(tokens, source[len("tool:"):])
+    usage = getattr(response, "usage_metadata", None) or {}
+    MODEL_COST_USD.inc(
+        (usage.get("input_tokens", 0) * meter.input_price
+         + usage.get("output_tokens", 0) * meter.output_price) / 1e6,
+        mode,
+    )
+
+
+def _text_of(message) -> str:
+    """Text portion of a model message whose content may be a block list."""
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        item.get("text", "") for item in message.content
+        if isinstance(item, dict) and item.get("type") == "text"
+    )
+
+
+async def _summarize(session_id: str, transcript: str) -> str:
+    """
+    Compaction's model call: a background request, metered to the tenant.
+
+    It isn't charged to the session, whose budget is for its own turns; a
+    session shouldn't be degraded for the server shortening its history.
+    """
+    history = [HumanMessage(content=transcript)]
+    response = await _governed_invoke(
+        [SystemMessage(content=SUMMARY_INSTRUCTIONS)] + history, Priority.BATCH, llm
+    )
+    tenant = sessions.get(session_id, {}).get("tenant", "default")
+    _record_charge(None, tenant, "compaction", history, response, SUMMARY_INSTRUCTIONS)
+    return _text_of(response)
+
+
+def _maybe_compact(session_id: str, session: dict) -> None:
+    """Queue the session for compaction if it's due; the next turn sends the result."""
+    if compactor is not None and compactor.due(session):
+        compactor.schedule(session_id, session)
+
+
+async def _run_tool(call: dict, binding: Binding | None = None) -> str:
+    """Execute one tool call, timing it. Errors are returned to the model as text."""
+    started = time.perf_counter()
+    with span(f"tool {call['name']}", **{"tool.name": call["name"]}) as tool_span:
+        try:
+            tool = (binding or default_binding).tools_by_name.get(call["name"])
+            if tool is None:
+                return f"Error: unknown tool {call['name']}"
+            return str(await tool.ainvoke(call["args"]))
+        except Exception as e:
+            tool_span.set_attribute("error", str(e))
+            return f"Error running {call['name']}: {e}"
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - started, call["name"])
+
+
+def _tool_entry(session: dict, call: dict, result: str) -> dict:
+    """
+    History entry for a tool result, storing deliverables as artifacts.
+
+    A deliverable for a document the session already has (same kind and
+    subject) is stored as its next revision, and small diffs are inlined.
+    """
+    entry = {"role": "tool", "tool_call_id": call["id"], "name": call["name"], "content": result}
+    output_type = OUTPUT_TYPES.get(call["name"])
+    if ARTIFACTS and output_type is not None and not result.startswith("Error"):
+        output = output_type(**call["args"])
+        markdown = output.to_markdown()
+        documents = session.setdefault("documents", {})
+        artifact = artifacts.put(output.kind, markdown, parent=documents.get(output.document()))
+        documents[output.document()] = artifact.id
+        reference = artifact.reference()
+        if artifact.parent:
+            diff = artifacts.diff(artifact.id)
+            if diff and len(diff) <= INLINE_DIFF_CHARS:
+                reference += f"\nChanges:\n```diff\n{diff}\n```"
+        # Compact results carry derived values the reference doesn't, so keep them
+        entry["content"] = reference if result == markdown else f"{reference}\n{result}"
+        entry["artifact"] = artifact.id
+    return entry
+
+
+async def _run_tool_calls(session: dict, tool_calls: list, binding: Binding) -> None:
+    """Run a round of tool calls concurrently and record their results."""
+    speculation = current_speculation.get()
+
+    async def run(call: dict) -> str:
+        if speculation is not None:
+            result = await speculation.claim(call)
+            if result is not None:
+                return result
+        return await _run_tool(call, binding)
+
+    results = await asyncio.gather(*[run(tc) for tc in tool_calls])
+    for tc, result in zip(tool_calls, results):
+        session["messages"].append(_tool_entry(session, tc, result))
+
+
+def _speculate(session: dict, binding: Binding, message: str) -> Speculation | None:
+    """Start the tool calls a user message suggests the model will make."""
+    if prefetcher is None:
+        return None
+    calls = []
+    if "fetch_url" in binding.tools_by_name:
+        calls += [{"name": "fetch_url", "args": {"url": url}} for url in find_urls(message)]
+    if "get_artifact" in binding.tools_by_name:
+        # Competitors this session has battlecards for; their references are in history
+        battlecards = {
+            document.partition(":")[2]: artifact_id
+            for document, artifact_id in session.get("documents", {}).items()
+            if document.startswith("battlecard:")
+        }
+        calls += [
+            {"name": "get_artifact", "args": {"artifact_id": battlecards[name]}}
+            for name in find_names(message, list(battlecards))
+        ]
+    speculation = prefetcher.begin()
+    for call in calls:
+        speculation.start(call["name"], call["args"], lambda call=call: _run_tool(call, binding))
+    return speculation
+
+
+def _needs_approval(tool_calls: list, binding: Binding) -> bool:
+    return REQUIRE_APPROVAL and any(tc["name"] in binding.approval_tools for tc in tool_calls)
+
+
+def _hold_for_approval(session_id: str, session: dict, tool_calls: list) -> dict:
+    """
+    Park a round of tool calls until a reviewer decides, ending the turn.
+
+    The whole round is held, since every call in it needs its result
+    before the model can be called again.
+    """
+    approval = {
+        "approval_id": uuid.uuid4().hex[:12],
+        "session_id": session_id,
+        "tenant": session["tenant"],
+        "tool_calls": [
+            {"id": tc["id"], "name": tc["name"], "args": tc["args"]} for tc in tool_calls
+        ],
+        "created": time.time(),
+    }
+    approvals[approval["approval_id"]] = approval
+    session["approval"] = approval["approval_id"]
+    return approval
+
+
+def _check_no_turn_running(session_id: str) -> None:
+    # Two turns at once would interleave their messages in one history
+    running = streams.turns.get(session_id)
+    if session_id in chat_turns or (running is not None and not running.done):
+        raise HTTPException(
+            status_code=409,
+            detail="A turn is already running for this session; resume it or wait for it",
+        )
+
+
+def _check_not_awaiting_approval(session: dict) -> None:
+    # The history ends in tool calls without results, which the model would reject
+    if session.get("approval"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Session is waiting for approval {session['approval']}",
+        )
+
+
+def _route(code: str | None, area: str | None) -> Binding:
+    """Binding for a domain and area; 404 if either isn't configured."""
+    if not code:
+        if area:
+            raise HTTPException(status_code=404, detail="Areas need a configured domain")
+        return default_binding
+    if domains.get(code) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown domain {code}")
+    binding = bindings.get(code, area)
+    if binding is None:
+        raise HTTPException(status_code=404, detail=f"Unknown area {area} in domain {code}")
+    return binding
+
+
+def _binding(session: dict) -> Binding:
+    return _route(session.get("domain"), session.get("area"))
+
+
+def _open_session(session_id: str, tenant: str, request: "ChatRequest") -> dict:
+    """
+    The request's session, created in the requested domain on its first turn.
+
+    A session stays in the domain it started in; `area` may change per turn.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        code = request.domain or DEFAULT_DOMAIN
+        binding = _route(code, request.area)
+        session = sessions[session_id] = {
+            "tenant": tenant,
+            "messages": [
+                {"role": "system", "content": binding.system_prompt}
+            ]
+        }
+        if code:
+            session["domain"] = code
+    elif request.domain and request.domain != session.get("domain"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Session belongs to domain {session.get('domain') or 'default'}",
+        )
+    elif request.area:
+        _route(session.get("domain"), request.area)
+    if request.area:
+        session["area"] = request.area
+    return session
+
+
+def _system_prompt(session: dict) -> tuple:
+    # The prompt string is shared with the binding, so it isn't the session's to count
+    return tuple(m["content"] for m in session["messages"][:1] if m["role"] == "system")
+
+
+def _assistant_entry(text: str, tool_calls: list) -> dict:
+    entry = {"role": "assistant", "content": text}
+    if tool_calls:
+        entry["tool_calls"] = [
+            {"id": tc["id"], "name": tc["name"], "args": tc["args"]} for tc in tool_calls
+        ]
+    return entry
+
 
 class ChatRequest(BaseModel):
     message: str
     session_id: str | None = None
+    cache: bool = True  # False bypasses the response cache for this turn
+    domain: str | None = None  # domain_code of a config; fixed by a session's first turn
+    area: str | None = None  # narrow the turn to one of the domain's areas or subagents
+
+
+class Competitor(BaseModel):
+    name: str = Field(min_length=1)
+    url: str | None = None  # fetched as research notes for the card
+
+
+class BulkBattlecardRequest(BaseModel):
+    our_product: str = ""
+    our_positioning: str = ""
+    our_strengths: str = ""
+    competitors: list[Competitor] = Field(default_factory=list, max_length=100)
+    job_id: str | None = None  # resume this job instead of starting one
 
 
 class ChatResponse(BaseModel):
     session_id: str
     response: str
     tool_calls: list | None = None
+    budget: str | None = None  # set when a token budget degraded this turn
+    approval: dict | None = None  # set when the turn is waiting on POST /approvals/{id}
+
+
+class ApprovalDecision(BaseModel):
+    approved: bool
+    note: str | None = None  # passed to the model, e.g. why it was rejected
 
 
 @app.get("/health")
@@ -65,116 +765,760 @@ def health():
     return {"status": "ok", "agent": "pmm-deep-agent"}
 
 
-@app.post("/chat")
-async def chat(request: ChatRequest) -> ChatResponse:
-    """Simple chat endpoint."""
-    session_id = request.session_id or str(uuid.uuid4())
+@app.get("/governor")
+def governor_stats():
+    """Model-call concurrency limit, queue depth and wait times."""
+    return governor.stats()
+
+
+registry.register(Gauge(
+    "pmm_governor_limit", "Current model-call concurrency limit",
+    lambda: {(): governor.stats()["limit"]}))
+registry.register(Gauge(
+    "pmm_governor_in_flight", "Model calls currently running",
+    lambda: {(): governor.in_flight}))
+registry.register(Gauge(
+    "pmm_governor_queue_depth", "Model calls waiting for a slot",
+    lambda: {(p,): n for p, n in governor.stats()["queue_depth_by_priority"].items()},
+    ["priority"]))
+registry.register(Gauge(
+    "pmm_governor_throttled", "Model calls rejected with 429 since start",
+    lambda: {(): governor.throttled}))
+registry.register(Gauge(
+    "pmm_sessions", "Sessions held in memory",
+    lambda: {(): len(sessions)}))
+registry.register(Gauge(
+    "pmm_pending_approvals", "Tool-call rounds waiting for a reviewer",
+    lambda: {(): len(approvals)}))
+registry.register(Gauge(
+    "pmm_websocket_connections", "Open /ws connections",
+    lambda: {(): len(channels)}))
+registry.register(Gauge(
+    "pmm_domain_bindings", "Domain/area model bindings cached",
+    lambda: {(): len(bindings)}))
+if ARTIFACTS:
+    registry.register(Gauge(
+        "pmm_artifacts", "Deliverables held in the artifact store",
+        lambda: {(): len(artifacts.artifacts)}))
+if loop_monitor is not None:
+    registry.register(Gauge(
+        "pmm_event_loop_max_lag_seconds", "Worst event-loop lag since start",
+        lambda: {(): loop_monitor.max_lag}))
+    registry.register(Gauge(
+        "pmm_event_loop_blocked_callbacks", "Callbacks that blocked the loop past the threshold",
+        lambda: {(): loop_monitor.blocked}))
+if response_cache is not None:
+    registry.register(Gauge(
+        "pmm_response_cache_lookups", "Response cache lookups since start",
+        lambda: {("hit",): response_cache.hits, ("miss",): response_cache.misses},
+        ["result"]))
+if hedge is not None:
+    registry.register(Gauge(
+        "pmm_hedged_streams", "Hedged streams since start",
+        lambda: {("started",): hedge.hedges, ("won",): hedge.hedge_wins},
+        ["outcome"]))
+if prefetcher is not None:
+    registry.register(Gauge(
+        "pmm_prefetch_calls", "Speculative tool calls since start",
+        lambda: {
+            ("started",): prefetcher.started,
+            ("used",): prefetcher.used,
+            ("wasted",): prefetcher.wasted,
+            ("dropped",): prefetcher.dropped,
+        },
+        ["outcome"]))
+if compactor is not None:
+    registry.register(Gauge(
+        "pmm_compactions", "Session history compactions since start",
+        lambda: {
+            ("done",): compactor.compacted,
+            ("failed",): compactor.failed,
+            ("queued",): compactor.pending,
+        },
+        ["outcome"]))
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(default=10.0, gt=0, le=120),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+    loop_only: bool = False,
+):
+    """
+    Sample stacks of this worker for `seconds` and return them folded.
+
+    Pipe the output to flamegraph.pl or load it into speedscope. With
+    `loop_only` only the event-loop thread is sampled.
+    """
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        counts = await asyncio.to_thread(
+            sample_stacks,
+            seconds,
+            interval_ms / 1000,
+            {loop_thread_id} if loop_only and loop_thread_id else None,
+        )
+    return PlainTextResponse(render_folded(counts))
+
+
+@app.get("/admin/loop-lag", dependencies=[Depends(require_admin)])
+def loop_lag():
+    """Worst event-loop lag and recent blocking callbacks with their stacks."""
+    if loop_monitor is None:
+        raise HTTPException(status_code=404, detail="Loop monitor is off (set LOOP_MONITOR=true)")
+    return loop_monitor.stats()
+
+
+@app.get("/admin/sessions", dependencies=[Depends(require_admin)])
+def largest_sessions(limit: int = Query(default=10, ge=1, le=1000)):
+    """Sessions by retained history size, with a breakdown by role and tool."""
+    footprints = [
+        {"session_id": session_id, **session_footprint(session, shared=_system_prompt(session))}
+        for session_id, session in list(sessions.items())
+    ]
+    footprints.sort(key=lambda f: -f["bytes"])
+    return {
+        "sessions": len(footprints),
+        "total_bytes": sum(f["bytes"] for f in footprints),
+        "largest": footprints[:limit],
+    }
+
 
-    # Get or create session
+@app.post("/admin/heap/snapshots", dependencies=[Depends(require_admin)])
+def take_heap_snapshot():
+    """Take a tracemalloc snapshot (starts tracing on first use)."""
+    return heap.take()
+
+
+@app.get("/admin/heap/snapshots", dependencies=[Depends(require_admin)])
+def list_heap_snapshots():
+    return heap.list()
+
+
+@app.get("/admin/heap/diff", dependencies=[Depends(require_admin)])
+def heap_diff(
+    before: int,
+    after: int,
+    limit: int = Query(default=20, ge=1, le=500),
+    group_by: str = Query(default="lineno", pattern="^(lineno|filename|traceback)$"),
+):
+    """Allocation growth between two snapshots, largest first."""
+    try:
+        return heap.diff(before, after, limit, group_by)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot {e}")
+
+
+@app.delete("/admin/heap", dependencies=[Depends(require_admin)])
+def stop_heap_tracing():
+    """Drop snapshots and stop tracemalloc."""
+    heap.stop()
+    return {"status": "stopped"}
+
+
+@app.get("/usage", dependencies=[Depends(require_admin)])
+def usage():
+    """Token usage and estimated cost per tenant and mode, across every tenant."""
+    return meter.report()
+
+
+@app.get("/usage/{session_id}")
+def session_usage(session_id: str, x_tenant_id: str | None = Header(default=None)):
+    """Token usage for one of the caller's (X-Tenant-ID's) sessions, split by context source."""
+    tenant = sessions.get(session_id, {}).get("tenant", "default")
+    report = meter.session_report(session_id)
+    if report is None or (x_tenant_id or "default") != tenant:
+        raise HTTPException(status_code=404, detail="No usage recorded for this session")
+    report["level"] = meter.level(session_id, tenant)
+    return report
+
+
+@app.get("/artifacts/{artifact_id}")
+def get_artifact(artifact_id: str):
+    """A stored deliverable with its full markdown."""
+    artifact = artifacts.get(artifact_id)
+    content = artifacts.content(artifact_id)
+    if artifact is None or content is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return {**artifact.to_dict(), "content": content}
+
+
+@app.get("/artifacts/{artifact_id}/revisions")
+def artifact_revisions(artifact_id: str):
+    """Revision history up to this artifact, oldest first (contents not included)."""
+    chain = artifacts.revisions(artifact_id)
+    if not chain:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return [a.to_dict() for a in chain]
+
+
+@app.get("/artifacts/{artifact_id}/diff", response_class=PlainTextResponse)
+def artifact_diff(artifact_id: str, against: str | None = None):
+    """Unified diff from `against` (default: the previous revision) to this artifact."""
+    diff = artifacts.diff(artifact_id, against)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Artifact or earlier revision not found")
+    return PlainTextResponse(diff)
+
+
+@app.get("/sessions/{session_id}/artifacts")
+def session_artifacts(session_id: str):
+    """Artifacts a session has produced, oldest first."""
     if session_id not in sessions:
-        sessions[session_id] = {
-            "messages": [
-                {"role": "system", "content": MAIN_SYSTEM_PROMPT}
-            ]
-        }
+        raise HTTPException(status_code=404, detail="Session not found")
+    ids: dict[str, None] = {}
+    for m in sessions[session_id]["messages"]:
+        ids.update(dict.fromkeys(m.get("artifacts", [])))
+        if "artifact" in m:
+            ids[m["artifact"]] = None
+    return [artifacts.get(artifact_id).to_dict() for artifact_id in ids]
+
+
+@app.get("/domains")
+def list_domains():
+    """Loaded domain configs, plus files that failed their last reload."""
+    return {
+        "domains": [domain.summary() for domain in domains.domains.values()],
+        "errors": domains.errors,
+    }
+
 
-    session = sessions[session_id]
+@app.get("/domains/{code}")
+def get_domain(code: str):
+    domain = domains.get(code)
+    if domain is None:
+        raise HTTPException(status_code=404, detail="Domain not found")
+    return domain.summary()
+
+
+@app.post("/admin/domains/reload", dependencies=[Depends(require_admin)])
+def reload_domains():
+    """Pick up config changes now instead of at the next poll."""
+    changed = domains.reload()
+    return {"changed": changed, "domains": sorted(domains.domains), "errors": domains.errors}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request, model, tool and stream metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/chat")
+async def chat(
+    request: ChatRequest,
+    x_tenant_id: str | None = Header(default=None),
+) -> ChatResponse:
+    """Simple chat endpoint."""
+    session_id = request.session_id or str(uuid.uuid4())
+    _check_no_turn_running(session_id)
+    tenant = sessions.get(session_id, {}).get("tenant") or x_tenant_id or "default"
+    level = _budget_level(session_id, tenant)
+    session = _open_session(session_id, tenant, request)
+    _check_not_awaiting_approval(session)
     session["messages"].append({"role": "user", "content": request.message})
+    return await _chat_turn(session_id, session, level, request.cache, request.message)
 
-    # Call Claude
-    messages = [
-        HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
-        for m in session["messages"] if m["role"] != "system"
-    ]
 
-    response = await llm_with_tools.ainvoke(
-        [{"role": "system", "content": MAIN_SYSTEM_PROMPT}] + messages
-    )
+async def _chat_turn(
+    session_id: str,
+    session: dict,
+    level: str,
+    use_cache: bool,
+    prefetch_for: str | None = None,
+) -> ChatResponse:
+    """
+    Run model/tool rounds until the model answers or a tool call needs approval.
 
-    # Extract response
-    response_text = response.content if isinstance(response.content, str) else ""
-    tool_calls = None
+    `prefetch_for` is the user message whose likely tool calls to start early.
+    """
+    binding = _binding(session)
+    timings = RequestTimings("chat")
+    current_timings.set(timings)
+    chat_turns.add(session_id)
+    speculation = None
+    with request_span("chat", session_id, mode="chat", domain=binding.key):
+        try:
+            # Started inside the span so the speculative tool spans join the turn's trace
+            if prefetch_for:
+                speculation = _speculate(session, binding, prefetch_for)
+            current_speculation.set(speculation)
+            # Call Claude, executing any tools it asks for, until it answers
+            tool_calls = []
+            turn_level = level
+            approval = None
+            for round_number in range(MAX_TOOL_ROUNDS + 1):
+                history = _budgeted_history(session, level)
+                response, upstream = await _invoke_model(history, binding, use_cache=use_cache)
+                level = _charge(
+                    session_id, session, "chat", history, response, binding, upstream
+                )
+                response_text = _text_of(response)
+                tool_calls += [{"name": tc["name"], "args": tc["args"]} for tc in response.tool_calls]
 
-    if hasattr(response, 'tool_calls') and response.tool_calls:
-        tool_calls = [
-            {"name": tc["name"], "args": tc["args"]}
-            for tc in response.tool_calls
-        ]
-        # For tool calls, format as text
-        if not response_text:
-            response_text = f"Using tools: {', '.join(tc['name'] for tc in tool_calls)}"
+                pending = response.tool_calls if round_number < _tool_rounds(level) else []
+                session["messages"].append(_assistant_entry(response_text, pending))
+                if not pending:
+                    break
+                if _needs_approval(pending, binding):
+                    approval = _hold_for_approval(session_id, session, pending)
+                    break
+                await _run_tool_calls(session, pending, binding)
 
-    session["messages"].append({"role": "assistant", "content": response_text})
+            # For tool calls, format as text
+            if not response_text and tool_calls:
+                response_text = f"Using tools: {', '.join(tc['name'] for tc in tool_calls)}"
+        finally:
+            chat_turns.discard(session_id)
+            if speculation is not None:
+                speculation.close()
+            timings.finish()
+    _maybe_compact(session_id, session)
 
     return ChatResponse(
         session_id=session_id,
         response=response_text,
-        tool_calls=tool_calls
+        tool_calls=tool_calls or None,
+        budget=turn_level if turn_level != FULL else None,
+        approval=approval,
     )
 
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """Streaming chat endpoint."""
+async def chat_stream(
+    request: ChatRequest,
+    last_event_id: str | None = Header(default=None),
+    x_tenant_id: str | None = Header(default=None),
+):
+    """
+    Streaming chat endpoint.
+
+    Every event carries an `id:`. A client that loses the connection can
+    re-POST with the same session_id and a `Last-Event-ID` header to resume
+    the turn from the replay buffer instead of starting a new one.
+    """
     session_id = request.session_id or str(uuid.uuid4())
 
-    if session_id not in sessions:
-        sessions[session_id] = {
-            "messages": [
-                {"role": "system", "content": MAIN_SYSTEM_PROMPT}
-            ]
+    try:
+        resumed = streams.find(session_id, last_event_id)
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if resumed:
+        turn, after = resumed
+    elif last_event_id:
+        # Starting over would repeat the user message and the model call
+        raise HTTPException(
+            status_code=410,
+            detail="That turn is no longer available; send the message without Last-Event-ID",
+        )
+    else:
+        turn, after = _start_stream_turn(session_id, request, x_tenant_id), -1
+
+    return StreamingResponse(
+        turn.subscribe(after),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Session-Id": session_id,
         }
+    )
+
 
-    session = sessions[session_id]
+def _start_stream_turn(session_id: str, request: ChatRequest, tenant: str | None) -> TurnStream:
+    """Start a streamed turn in the background; raises HTTPException if it can't run."""
+    _check_no_turn_running(session_id)
+    tenant = sessions.get(session_id, {}).get("tenant") or tenant or "default"
+    level = _budget_level(session_id, tenant)
+    session = _open_session(session_id, tenant, request)
+    binding = _binding(session)
+    _check_not_awaiting_approval(session)
     session["messages"].append({"role": "user", "content": request.message})
+    return streams.start(
+        session_id,
+        lambda turn: _stream_turn(
+            turn, session_id, session, binding, level, request.cache, request.message
+        ),
+    )
 
-    async def generate() -> AsyncGenerator[str, None]:
-        messages = [
-            HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
-            for m in session["messages"] if m["role"] != "system"
-        ]
 
-        full_response = ""
+async def _stream_turn(
+    turn: TurnStream,
+    session_id: str,
+    session: dict,
+    binding: Binding,
+    level: str,
+    use_cache: bool,
+    prefetch_for: str | None = None,
+    before: AsyncIterator[dict] | None = None,
+) -> AsyncGenerator[dict, None]:
+    """A streamed turn's model/tool rounds as events; `before`'s events come first."""
+    timings = RequestTimings("stream")
+    current_timings.set(timings)
+    round_text = ""
+    speculation = None
+    with request_span(
+        "chat.stream", session_id, mode="stream", turn_id=turn.turn_id, domain=binding.key
+    ):
+        try:
+            if prefetch_for:
+                speculation = _speculate(session, binding, prefetch_for)
+            current_speculation.set(speculation)
+            if level != FULL:
+                yield {'type': 'budget', 'level': level}
+            if before is not None:
+                async for event in before:
+                    yield event
+            for round_number in range(MAX_TOOL_ROUNDS + 1):
+                response = None
+                round_text = ""
+                history = _budgeted_history(session, level)
 
-        async for chunk in llm_with_tools.astream(
-            [{"role": "system", "content": MAIN_SYSTEM_PROMPT}] + messages
-        ):
-            if hasattr(chunk, 'content') and chunk.content:
-                content = chunk.content
-                if isinstance(content, str):
-                    full_response += content
-                    yield f"data: {json.dumps({'type': 'text', 'content': content})}\n\n"
-                elif isinstance(content, list):
-                    for item in content:
-                        if isinstance(item, dict):
-                            if item.get('type') == 'text':
-                                full_response += item.get('text', '')
-                                yield f"data: {json.dumps({'type': 'text', 'content': item.get('text', '')})}\n\n"
-                            elif item.get('type') == 'tool_use':
-                                yield f"data: {json.dumps({'type': 'tool_call', 'name': item.get('name'), 'args': item.get('input', {})})}\n\n"
-
-            if hasattr(chunk, 'tool_calls') and chunk.tool_calls:
-                for tc in chunk.tool_calls:
-                    yield f"data: {json.dumps({'type': 'tool_call', 'name': tc.get('name'), 'args': tc.get('args', {})})}\n\n"
-
-        session["messages"].append({"role": "assistant", "content": full_response})
-        yield f"data: {json.dumps({'type': 'done', 'session_id': session_id})}\n\n"
+                chunks, upstream = _stream_model(history, binding, use_cache=use_cache)
+                async for chunk in chunks:
+                    response = chunk if response is None else response + chunk
+                    if hasattr(chunk, 'content') and chunk.content:
+                        content = chunk.content
+                        if isinstance(content, str):
+                            round_text += content
+                            yield {'type': 'text', 'content': content}
+                        elif isinstance(content, list):
+                            for item in content:
+                                if isinstance(item, dict) and item.get('type') == 'text':
+                                    round_text += item.get('text', '')
+                                    yield {'type': 'text', 'content': item.get('text', '')}
+
+                tool_calls = response.tool_calls if response is not None else []
+                for tc in tool_calls:
+                    yield {'type': 'tool_call', 'name': tc['name'], 'args': tc['args']}
+
+                if response is not None:
+                    level = _charge(
+                        session_id, session, "stream", history, response, binding, upstream
+                    )
+                pending = tool_calls if round_number < _tool_rounds(level) else []
+                session["messages"].append(_assistant_entry(round_text, pending))
+                round_text = ""
+                if not pending:
+                    break
+                if _needs_approval(pending, binding):
+                    approval = _hold_for_approval(session_id, session, pending)
+                    yield {'type': 'approval_required', **approval}
+                    break
+                await _run_tool_calls(session, pending, binding)
+                for tc in pending:
+                    yield {
+                        'type': 'tool_result',
+                        'name': tc['name'],
+                        'markdown': render_markdown(tc['name'], tc['args']),
+                    }
+
+            yield {'type': 'done', 'session_id': session_id}
+            _maybe_compact(session_id, session)
+        except asyncio.CancelledError:
+            _settle_cancelled(session, round_text)
+            raise
+        finally:
+            if speculation is not None:
+                speculation.close()
+            timings.serialize_time = turn.serialize_seconds
+            timings.bytes = turn.bytes_published
+            timings.finish()
+
+
+def _settle_cancelled(session: dict, partial_text: str) -> None:
+    """
+    Leave a valid history behind a turn cancelled mid-way.
+
+    Text streamed before the cancel is kept as the answer, and tool calls
+    that never ran get a result saying so, since the model rejects calls
+    without results.
+    """
+    last = session["messages"][-1]
+    if last["role"] == "assistant" and last.get("tool_calls"):
+        for tc in last["tool_calls"]:
+            session["messages"].append({
+                "role": "tool",
+                "tool_call_id": tc["id"],
+                "name": tc["name"],
+                "content": "Cancelled by the user before this ran.",
+            })
+    elif partial_text:
+        session["messages"].append({"role": "assistant", "content": partial_text})
+
+
+@app.websocket("/ws")
+async def websocket_chat(websocket: WebSocket, x_tenant_id: str | None = Header(default=None)):
+    """
+    Chat turns for any number of sessions multiplexed over one connection.
+
+    Turns are the same as on /chat/stream and resumable from either; see
+    `channels` for the message protocol and flow control.
+    """
+    # Browsers don't apply CORS to WebSockets, so check the origin here
+    origin = websocket.headers.get("origin")
+    if origin and origin not in ALLOWED_ORIGINS:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    channel = Channel(
+        websocket, window=WS_STREAM_WINDOW, max_streams=WS_MAX_STREAMS, queue_size=WS_SEND_QUEUE
+    )
+    channels.add(channel)
+    try:
+        await channel.run(lambda channel, message: _channel_message(channel, message, x_tenant_id))
+    finally:
+        channels.discard(channel)
+
+
+async def _channel_message(channel: Channel, message: dict, tenant: str | None) -> None:
+    """Start or resume a turn on one of the channel's streams."""
+    stream_id = str(message.get("stream", ""))
+    try:
+        if not stream_id:
+            raise HTTPException(status_code=400, detail="stream is required")
+        if channel.full and stream_id not in channel.streams:
+            raise HTTPException(status_code=429, detail="Too many open streams")
+        if message.get("type") == "turn":
+            fields = {k: v for k, v in message.items() if k not in ("type", "stream")}
+            request = ChatRequest(**fields)
+            session_id = request.session_id or str(uuid.uuid4())
+            turn, after = _start_stream_turn(session_id, request, tenant), -1
+        elif message.get("type") == "resume":
+            session_id = str(message.get("session_id"))
+            resumed = streams.find(session_id, message.get("last_event_id"))
+            if resumed is None:
+                raise HTTPException(status_code=404, detail="No turn to resume")
+            turn, after = resumed
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown type {message.get('type')}")
+    except HTTPException as e:
+        status, detail = e.status_code, e.detail
+    except ValidationError as e:
+        status, detail = 422, e.errors(include_url=False, include_context=False)
+    except LookupError as e:
+        status, detail = 409, str(e)
+    else:
+        await channel.send({
+            "stream": stream_id,
+            "type": "started",
+            "session_id": session_id,
+            "turn_id": turn.turn_id,
+        })
+        channel.attach(stream_id, turn, after)
+        return
+    await channel.send({"stream": stream_id, "type": "error", "status": status, "detail": detail})
+
+
+def _push(session_id: str, event: dict) -> None:
+    """Send an event to every /ws connection following the session."""
+    for channel in list(channels):
+        if session_id in channel.sessions:
+            channel.push(session_id, event)
+
+
+async def _research_competitor(competitor: dict) -> str:
+    """Research notes for a bulk card: the competitor's page, when a URL was given."""
+    if not competitor.get("url"):
+        return ""
+    notes = await _run_tool({"name": "fetch_url", "args": {"url": competitor["url"]}})
+    return "" if notes.startswith("Error") else notes
+
+
+async def _bulk_events(job: BattlecardJob) -> AsyncGenerator[dict, None]:
+    async def complete(messages: list) -> str:
+        # No tools bound: the job only needs text, and tool schemas cost input tokens
+        response = await _governed_invoke(messages, Priority.BATCH, model=llm)
+        # Jobs aren't sessions: their usage counts toward the tenant (and mode) only
+        _record_charge(None, job.tenant, "bulk", messages, response)
+        return _text_of(response)
+
+    timings = RequestTimings("bulk")
+    current_timings.set(timings)
+    with request_span("battlecards.bulk", f"job:{job.job_id}", mode="bulk", job_id=job.job_id):
+        try:
+            async for event in run_battlecards(
+                job, jobs, _research_competitor, complete, BULK_CONCURRENCY
+            ):
+                yield event
+        finally:
+            timings.finish()
+
+
+@app.post("/battlecards/bulk")
+async def bulk_battlecards(
+    request: BulkBattlecardRequest,
+    last_event_id: str | None = Header(default=None),
+    x_tenant_id: str | None = Header(default=None),
+):
+    """
+    Generate battlecards for many competitors as one streamed job.
+
+    The first event carries the `job_id`. As each card finishes it streams
+    as one `card_section` event per `###` section, then a `card` event
+    marking it complete. POST again with just the `job_id` to restart a
+    job: finished cards are replayed whole, as `card` events with their
+    `markdown`, and only the rest are generated. A
+    `Last-Event-ID` header reattaches to a run still in progress, as for
+    /chat/stream. Restarting or reattaching needs the job's X-Tenant-ID.
+    """
+    if request.job_id:
+        job = _tenant_job(request.job_id, x_tenant_id)
+    else:
+        if not request.competitors:
+            raise HTTPException(status_code=422, detail="competitors must not be empty")
+        unique = {c.name.strip(): c.url for c in request.competitors}
+        job = BattlecardJob(
+            our_product=request.our_product,
+            our_positioning=request.our_positioning,
+            our_strengths=request.our_strengths,
+            competitors=[{"name": name, "url": url} for name, url in unique.items()],
+            tenant=x_tenant_id or "default",
+        )
+        jobs.save(job)
+
+    try:
+        resumed = job_streams.find(job.job_id, last_event_id)
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    running = job_streams.turns.get(job.job_id)
+    if resumed:
+        turn, after = resumed
+    elif running is not None and not running.done:
+        # Already generating: follow that run from the start rather than start another
+        turn, after = running, -1
+    else:
+        _budget_level(None, job.tenant)
+        turn, after = job_streams.start(job.job_id, lambda turn: _bulk_events(job)), -1
 
     return StreamingResponse(
-        generate(),
+        turn.subscribe(after),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
+        headers={"Cache-Control": "no-cache", "X-Job-Id": job.job_id},
     )
 
 
+@app.get("/battlecards/jobs/{job_id}")
+def bulk_job_status(job_id: str, x_tenant_id: str | None = Header(default=None)):
+    """Progress of a bulk battlecard job."""
+    return _tenant_job(job_id, x_tenant_id).status()
+
+
+def _tenant_job(job_id: str, tenant: str | None) -> BattlecardJob:
+    """A job of the caller's tenant; other tenants' jobs are reported as not found."""
+    job = jobs.get(job_id)
+    if job is None or job.tenant != (tenant or "default"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/approvals", dependencies=[Depends(require_admin)])
+def pending_approvals(
+    limit: int = Query(default=100, ge=1, le=1000),
+    x_tenant_id: str | None = Header(default=None),
+):
+    """Tool calls waiting for a reviewer, oldest first; only X-Tenant-ID's when it is set."""
+    pending = [a for a in approvals.values() if x_tenant_id in (None, a["tenant"])]
+    return {"pending": len(pending), "approvals": pending[:limit]}
+
+
+@app.post("/approvals/{approval_id}", dependencies=[Depends(require_admin)])
+async def decide_approval(
+    approval_id: str,
+    decision: ApprovalDecision,
+    x_tenant_id: str | None = Header(default=None),
+):
+    """
+    Approve or reject a held round of tool calls and continue the turn.
+
+    Approved calls run as normal. Rejected approval-gated calls get the
+    reviewer's note as their result instead, and the model carries on
+    from there; the rest of the round runs either way. The continuation
+    is a new streamed turn of the session: /ws connections following the
+    session are told its `turn_id`, and any client can follow it with
+    Last-Event-ID `<turn_id>:-1` on /chat/stream or a `resume` on /ws.
+    """
+    approval = approvals.get(approval_id)
+    if approval is None or x_tenant_id not in (None, approval["tenant"]):
+        raise HTTPException(status_code=404, detail="No pending approval with this id")
+    session_id = approval["session_id"]
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    _check_no_turn_running(session_id)
+    level = _budget_level(session_id, session["tenant"])
+    binding = _binding(session)
+    del approvals[approval_id]
+    del session["approval"]
+
+    turn = streams.start(
+        session_id,
+        lambda turn: _stream_turn(
+            turn, session_id, session, binding, level, use_cache=True,
+            before=_apply_decision(session, binding, approval, decision),
+        ),
+    )
+    _push(session_id, {
+        "type": "approval_decided",
+        "approval_id": approval_id,
+        "approved": decision.approved,
+        "turn_id": turn.turn_id,
+    })
+    return {"session_id": session_id, "turn_id": turn.turn_id, "approved": decision.approved}
+
+
+async def _apply_decision(
+    session: dict, binding: Binding, approval: dict, decision: "ApprovalDecision"
+) -> AsyncGenerator[dict, None]:
+    """Run or reject a held round of tool calls, yielding the results of those that ran."""
+    yield {
+        'type': 'approval_decided',
+        'approval_id': approval['approval_id'],
+        'approved': decision.approved,
+    }
+    calls = approval["tool_calls"]
+    run = [tc for tc in calls if decision.approved or tc["name"] not in binding.approval_tools]
+    await _run_tool_calls(session, run, binding)
+    if decision.approved:
+        # Lets compaction pin what the reviewer signed off on, e.g. the positioning
+        gated = {tc["id"] for tc in run if tc["name"] in binding.approval_tools}
+        for entry in session["messages"][len(session["messages"]) - len(run):]:
+            if entry["tool_call_id"] in gated:
+                entry["approved"] = True
+    for tc in calls:
+        if tc not in run:
+            session["messages"].append({
+                "role": "tool",
+                "tool_call_id": tc["id"],
+                "name": tc["name"],
+                "content": f"Not approved by the reviewer. Note: {decision.note or 'none'}. "
+                           f"Do not call {tc['name']} again unless the user asks.",
+            })
+    for tc in run:
+        yield {
+            'type': 'tool_result',
+            'name': tc['name'],
+            'markdown': render_markdown(tc['name'], tc['args']),
+        }
+
+
 @app.delete("/sessions/{session_id}")
 def delete_session(session_id: str):
     """Clear a session."""
     if session_id in sessions:
+        approvals.pop(sessions[session_id].get("approval"), None)
         del sessions[session_id]
+        streams.discard(session_id)
+        meter.forget(session_id)
         return {"status": "deleted"}
     raise HTTPException(status_code=404, detail="Session not found")
 
@@ -0,0 +1,144 @@
+"""
+Single-Flight Model Requests.
+
+Identical model requests that are already in flight are shared: later
+callers attach to the first call instead of starting their own. Retries
+from the web client and bursts of the same quick action then cost one
+upstream call.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
+
+
+def _canonical_message(message: Any) -> dict:
+    """Reduce a message to the fields that affect the model's answer."""
+    if isinstance(message, dict):
+        return {"type": message.get("role"), "content": message.get("content")}
+
+    canonical = {"type": message.type, "content": message.content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        canonical["tool_calls"] = [
+            {"name": tc["name"], "args": tc["args"]} for tc in tool_calls
+        ]
+    tool_call_id = getattr(message, "tool_call_id", None)
+    if tool_call_id:
+        canonical["tool_call_id"] = tool_call_id
+    return canonical
+
+
+def request_key(
+    model_name: str,
+    system_prompt: str,
+    tools: Sequence,
+    messages: Sequence,
+) -> str:
+    """
+    Hash everything that determines a model response.
+
+    Args:
+        model_name: Model the request goes to
+        system_prompt: System prompt text
+        tools: Bound tools (only their names are hashed)
+        messages: Conversation history, oldest first
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = {
+        "model": model_name,
+        "system": system_prompt,
+        "tools": sorted(t.name for t in tools),
+        "messages": [_canonical_message(m) for m in messages],
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class _SharedStream:
+    """Pumps one upstream stream and replays it to every subscriber."""
+
+    def __init__(self, source: AsyncIterator):
+        self.chunks: list = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._changed.set()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def subscribe(self) -> AsyncIterator:
+        self.subscribers += 1
+        try:
+            i = 0
+            while True:
+                self._changed.clear()
+                while i < len(self.chunks):
+                    yield self.chunks[i]
+                    i += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self):
+        self.calls: dict[str, asyncio.Future] = {}
+        self.streams: dict[str, _SharedStream] = {}
+
+    def running(self, key: str) -> bool:
+        """Whether a call or stream for `key` is in flight, i.e. a new caller would join it."""
+        return key in self.calls or key in self.streams
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Any:
+        """Await `fn()`, or the result of an identical call already running."""
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self.calls[key] = future
+            future.add_done_callback(lambda _: self._forget(self.calls, key, future))
+        # Shield so one caller giving up doesn't cancel it for the others
+        return await asyncio.shield(future)
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """
+        Iterate `fn()`, or attach to an identical stream already running.
+
+        Late subscribers first receive every chunk produced so far, so each
+        caller sees the complete stream.
+        """
+        shared = self.streams.get(key)
+        if shared is None:
+            shared = _SharedStream(fn())
+            self.streams[key] = shared
+            shared.task.add_done_callback(
+                lambda _: self._forget(self.streams, key, shared)
+            )
+        async for chunk in shared.subscribe():
+            yield chunk
+
+    @staticmethod
+    def _forget(table: dict, key: str, value: Any) -> None:
+        if table.get(key) is value:
+            del table[key]
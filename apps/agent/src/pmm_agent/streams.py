@@ -0,0 +1,199 @@
+"""
+Resumable SSE Streams.
+
+Each `/chat/stream` turn runs in its own task and publishes events into a
+bounded replay buffer. The HTTP response is just a subscriber, so a client
+that drops can reconnect with `Last-Event-ID` and pick up where it left off
+without a second model call. WebSocket channels (see `channels`) subscribe
+to the same buffer through `events_after`.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Callable
+
+
+def parse_event_id(event_id: str | None) -> tuple[str, int] | None:
+    """Split a `<turn_id>:<seq>` event ID. Returns None if malformed."""
+    if not event_id or ":" not in event_id:
+        return None
+    turn_id, _, seq = event_id.rpartition(":")
+    try:
+        return turn_id, int(seq)
+    except ValueError:
+        return None
+
+
+class TurnInProgress(RuntimeError):
+    """The session already has a turn running; it must finish before another starts."""
+
+
+class TurnStream:
+    """
+    One in-progress turn: a producer task plus a bounded replay buffer.
+
+    The producer keeps running while clients come and go. Once the last
+    subscriber leaves, it gets `grace_seconds` for someone to reconnect
+    before it is cancelled.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        max_events: int = 1024,
+        grace_seconds: float = 30.0,
+    ):
+        self.session_id = session_id
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.grace_seconds = grace_seconds
+        self.events: deque[tuple[int, str]] = deque(maxlen=max_events)  # (seq, JSON payload)
+        self.next_seq = 0
+        self.serialize_seconds = 0.0
+        self.bytes_published = 0
+        self.done = False
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+        self._grace_timer: asyncio.TimerHandle | None = None
+
+    def can_replay_after(self, seq: int) -> bool:
+        """Whether every event after `seq` is still in the buffer."""
+        return not self.events or seq + 1 >= self.events[0][0]
+
+    def start(self, producer: Callable[["TurnStream"], AsyncIterator[dict]]) -> None:
+        """Run `producer` in the background, publishing everything it yields."""
+
+        async def run():
+            try:
+                async for payload in producer(self):
+                    self.publish(payload)
+            except asyncio.CancelledError:
+                self.publish({"type": "cancelled"})
+            except Exception as e:
+                self.publish({"type": "error", "error": str(e)})
+            finally:
+                self.done = True
+                self._changed.set()
+
+        self.task = asyncio.create_task(run())
+
+    def publish(self, payload: dict) -> None:
+        """Append an event to the replay buffer and wake subscribers."""
+        started = time.perf_counter()
+        data = json.dumps(payload)
+        self.serialize_seconds += time.perf_counter() - started
+        self.bytes_published += len(data)
+        self.events.append((self.next_seq, data))
+        self.next_seq += 1
+        self._changed.set()
+
+    def cancel(self) -> bool:
+        """Stop the producer; subscribers get a final `cancelled` event. False if finished."""
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+    async def subscribe(self, after: int = -1) -> AsyncGenerator[str, None]:
+        """Yield SSE frames with sequence numbers greater than `after`."""
+        async for seq, data in self.events_after(after):
+            yield f"id: {self.turn_id}:{seq}\ndata: {data}\n\n"
+
+    async def events_after(self, after: int = -1) -> AsyncGenerator[tuple[int, str], None]:
+        """Yield (seq, JSON payload) for events after `after`, following the turn to its end."""
+        self.subscribers += 1
+        self._cancel_grace_timer()
+        try:
+            cursor = after
+            while True:
+                self._changed.clear()
+                pending = [(seq, data) for seq, data in self.events if seq > cursor]
+                for seq, data in pending:
+                    cursor = seq
+                    yield seq, data
+                if pending:
+                    # More may have arrived while we were yielding
+                    continue
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self._start_grace_timer()
+
+    def _start_grace_timer(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._grace_timer = loop.call_later(self.grace_seconds, self._abandon)
+
+    def _cancel_grace_timer(self) -> None:
+        if self._grace_timer is not None:
+            self._grace_timer.cancel()
+            self._grace_timer = None
+
+    def _abandon(self) -> None:
+        if self.subscribers == 0 and self.task and not self.task.done():
+            self.task.cancel()
+
+
+class StreamRegistry:
+    """Tracks the latest turn per session so reconnects can find it."""
+
+    def __init__(self, max_events: int = 1024, grace_seconds: float = 30.0):
+        self.max_events = max_events
+        self.grace_seconds = grace_seconds
+        self.turns: dict[str, TurnStream] = {}
+
+    def start(
+        self,
+        session_id: str,
+        producer: Callable[[TurnStream], AsyncIterator[dict]],
+    ) -> TurnStream:
+        """
+        Start a new turn for `session_id`, replacing a finished previous one.
+
+        Raises:
+            TurnInProgress: If the session's previous turn is still running.
+        """
+        running = self.turns.get(session_id)
+        if running is not None and not running.done:
+            raise TurnInProgress(f"turn {running.turn_id} is still running")
+        turn = TurnStream(session_id, self.max_events, self.grace_seconds)
+        self.turns[session_id] = turn
+        turn.start(producer)
+        turn.task.add_done_callback(lambda _: self._expire_later(turn))
+        return turn
+
+    def find(self, session_id: str, last_event_id: str | None) -> tuple[TurnStream, int] | None:
+        """
+        Return (turn, seq) if `last_event_id` points into a known turn.
+
+        Raises LookupError if the turn is known but the events after `seq`
+        have already been evicted from its replay buffer.
+        """
+        parsed = parse_event_id(last_event_id)
+        if parsed is None:
+            return None
+        turn = self.turns.get(session_id)
+        if turn is None or turn.turn_id != parsed[0]:
+            return None
+        if not turn.can_replay_after(parsed[1]):
+            raise LookupError(f"event {parsed[1] + 1} is no longer buffered")
+        return turn, parsed[1]
+
+    def _expire_later(self, turn: TurnStream) -> None:
+        # Keep finished turns around briefly so a late reconnect gets the tail
+        def expire():
+            if self.turns.get(turn.session_id) is turn:
+                del self.turns[turn.session_id]
+
+        asyncio.get_running_loop().call_later(self.grace_seconds, expire)
+
+    def discard(self, session_id: str) -> None:
+        """Cancel and forget the session's turn, if any."""
+        turn = self.turns.pop(session_id, None)
+        if turn and turn.task and not turn.task.done():
+            turn.task.cancel()
@@ -8,10 +8,15 @@ Tools are organized by workflow phase:
 - RISK: Market risk assessment and validation
 """
 
+from pydantic import ValidationError
+
 from .intake import (
     analyze_product,
     extract_value_props,
     identify_icp,
+    ProductAnalysis,
+    ValuePropositions,
+    IdealCustomerProfile,
 )
 
 from .research import (
@@ -27,12 +32,20 @@ from .planning import (
     create_battlecard,
     create_launch_plan,
     create_checklist,
+    PositioningStatement,
+    MessagingMatrix,
+    Battlecard,
+    LaunchPlan,
+    Checklist,
 )
 
 from .risk import (
     assess_market_risks,
     validate_positioning,
     identify_gaps,
+    MarketRiskAssessment,
+    PositioningValidation,
+    GapAnalysis,
 )
 
 # Tool categories for mode-based selection
@@ -65,6 +78,33 @@ RISK_TOOLS = [
 
 ALL_TOOLS = INTAKE_TOOLS + RESEARCH_TOOLS + PLANNING_TOOLS + RISK_TOOLS
 
+# Typed outputs of the template tools, for rendering results at the edge
+OUTPUT_TYPES = {
+    "analyze_product": ProductAnalysis,
+    "extract_value_props": ValuePropositions,
+    "identify_icp": IdealCustomerProfile,
+    "create_positioning_statement": PositioningStatement,
+    "create_messaging_matrix": MessagingMatrix,
+    "create_battlecard": Battlecard,
+    "create_launch_plan": LaunchPlan,
+    "create_checklist": Checklist,
+    "assess_market_risks": MarketRiskAssessment,
+    "validate_positioning": PositioningValidation,
+    "identify_gaps": GapAnalysis,
+}
+
+
+def render_markdown(name: str, args: dict) -> str | None:
+    """Markdown for a tool call, rebuilt from its arguments; None for other tools."""
+    output_type = OUTPUT_TYPES.get(name)
+    if output_type is None:
+        return None
+    try:
+        return output_type(**args).to_markdown()
+    except ValidationError:
+        return None
+
+
 # Tools that require human approval before execution
 HUMAN_APPROVAL_TOOLS = [
     "create_positioning_statement",
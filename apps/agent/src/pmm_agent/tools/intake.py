@@ -6,47 +6,17 @@ before diving into positioning and messaging work.
 """
 
 from langchain_core.tools import tool
-from pydantic import BaseModel, Field
-from typing import Optional
+from typing import ClassVar, Optional
 
+from .outputs import ToolOutput, emit
+from .templates import Template
 
-class ProductAnalysis(BaseModel):
-    """Structured product analysis output."""
-    product_name: str
-    category: str
-    target_audience: str
-    core_problem: str
-    key_features: list[str]
-    differentiators: list[str]
-    proof_points: list[str]
-    unknowns: list[str]
-
-
-@tool
-def analyze_product(
-    product_description: str,
-    existing_materials: Optional[str] = None,
-) -> str:
-    """
-    Analyze a product to extract structured information for positioning work.
-
-    Use this tool when starting any PMM project to structure the inputs
-    and identify gaps in the available information.
 
-    Args:
-        product_description: Description of the product, features, and context
-        existing_materials: Any existing positioning, messaging, or marketing materials
-
-    Returns:
-        Structured analysis of the product with identified gaps
-    """
-    materials_section = f"Reviewed: {existing_materials[:200]}..." if existing_materials else "No existing materials provided - starting fresh."
-    
-    analysis = f"""
+_PRODUCT_ANALYSIS = Template("""
 ## Product Analysis
 
 ### Input Summary
-{product_description[:500]}...
+{description_excerpt}...
 
 ### Structured Extraction
 
@@ -70,31 +40,73 @@ def analyze_product(
 
 ### Existing Materials Analysis
 {materials_section}
-"""
-    return analysis
+""")
+
+
+class ProductAnalysis(ToolOutput):
+    """
+    Structured product analysis output.
+
+    The extracted fields start empty; `unknowns` lists what still has to
+    be clarified before positioning work can start.
+    """
+    kind: ClassVar[str] = "product_analysis"
+    template: ClassVar[Template] = _PRODUCT_ANALYSIS
+
+    product_description: str
+    existing_materials: Optional[str] = None
+    product_name: str = ""
+    category: str = ""
+    target_audience: str = ""
+    core_problem: str = ""
+    key_features: list[str] = []
+    differentiators: list[str] = []
+    proof_points: list[str] = []
+    unknowns: list[str] = [
+        "Specific ICP definition (company size, role, industry)",
+        "Quantified proof points (benchmarks, case studies)",
+        "Competitive set and differentiation claims",
+        "Current positioning (if any exists)",
+        "Success metrics and goals",
+    ]
+
+    def slot_values(self) -> dict:
+        materials = self.existing_materials
+        return {
+            "description_excerpt": self.product_description[:500],
+            "materials_section": f"Reviewed: {materials[:200]}..." if materials else "No existing materials provided - starting fresh.",
+        }
+
+    def derived(self) -> dict:
+        extracted = self.model_dump(exclude={"product_description", "existing_materials"})
+        return {name: value for name, value in extracted.items() if value}
 
 
 @tool
-def extract_value_props(
-    features: str,
-    target_audience: str,
-    competitive_context: Optional[str] = None,
+def analyze_product(
+    product_description: str,
+    existing_materials: Optional[str] = None,
 ) -> str:
     """
-    Extract value propositions by translating features into customer benefits.
+    Analyze a product to extract structured information for positioning work.
 
-    Use this tool to convert a list of product features into compelling
-    value propositions that resonate with the target audience.
+    Use this tool when starting any PMM project to structure the inputs
+    and identify gaps in the available information.
 
     Args:
-        features: List of product features to analyze
-        target_audience: Who the product is for
-        competitive_context: How competitors position similar features
+        product_description: Description of the product, features, and context
+        existing_materials: Any existing positioning, messaging, or marketing materials
 
     Returns:
-        Feature-to-benefit mapping with value propositions
+        Structured analysis of the product with identified gaps
     """
-    return f"""
+    return emit(ProductAnalysis(
+        product_description=product_description,
+        existing_materials=existing_materials,
+    ))
+
+
+_VALUE_PROPS = Template("""
 ## Value Proposition Extraction
 
 ### Target Audience
@@ -114,7 +126,7 @@ def extract_value_props(
 - **Social Value**: What does it signal? (innovation, professionalism, leadership)
 
 ### Competitive Differentiation
-{competitive_context if competitive_context else "No competitive context provided. Recommend using `search_competitors` to understand differentiation opportunities."}
+{competitive_context}
 
 ### Strongest Value Props (Ranked)
 1. [Highest impact, most differentiated]
@@ -125,33 +137,55 @@ def extract_value_props(
 - Missing proof points for claims
 - Unclear differentiation vs. alternatives
 - Untested assumptions about customer priorities
-"""
+""")
+
+
+class ValuePropositions(ToolOutput):
+    kind: ClassVar[str] = "value_propositions"
+    template: ClassVar[Template] = _VALUE_PROPS
+
+    features: str
+    target_audience: str
+    competitive_context: Optional[str] = None
+
+    def slot_values(self) -> dict:
+        return {
+            "target_audience": self.target_audience,
+            "competitive_context": (
+                self.competitive_context if self.competitive_context
+                else "No competitive context provided. Recommend using `search_competitors` to understand differentiation opportunities."
+            ),
+        }
 
 
 @tool
-def identify_icp(
-    product_description: str,
-    current_customers: Optional[str] = None,
-    excluded_segments: Optional[str] = None,
+def extract_value_props(
+    features: str,
+    target_audience: str,
+    competitive_context: Optional[str] = None,
 ) -> str:
     """
-    Define the Ideal Customer Profile (ICP) for positioning work.
+    Extract value propositions by translating features into customer benefits.
 
-    Use this tool to create a precise definition of who the product
-    is for (and who it's NOT for).
+    Use this tool to convert a list of product features into compelling
+    value propositions that resonate with the target audience.
 
     Args:
-        product_description: What the product does
-        current_customers: Description of existing customers if any
-        excluded_segments: Segments to explicitly exclude
+        features: List of product features to analyze
+        target_audience: Who the product is for
+        competitive_context: How competitors position similar features
 
     Returns:
-        Structured ICP definition with targeting criteria
+        Feature-to-benefit mapping with value propositions
     """
-    default_exclusions = "- Companies too small to need this\n- Teams without the pain point\n- Orgs with conflicting technology"
-    anti_icp = excluded_segments if excluded_segments else default_exclusions
-    
-    return f"""
+    return emit(ValuePropositions(
+        features=features,
+        target_audience=target_audience,
+        competitive_context=competitive_context,
+    ))
+
+
+_ICP = Template("""
 ## Ideal Customer Profile (ICP) Definition
 
 ### Primary ICP
@@ -179,7 +213,7 @@ def identify_icp(
 {anti_icp}
 
 ### Current Customer Signals
-{current_customers if current_customers else "No current customer data provided. Consider customer interviews or survey data."}
+{current_customers}
 
 ### Validation Questions
 1. Would they self-identify with this description?
@@ -191,4 +225,50 @@ def identify_icp(
 - Validate ICP with customer interviews
 - Cross-reference with closed-won deals
 - Test messaging with this segment
-"""
\ No newline at end of file
+""")
+
+
+class IdealCustomerProfile(ToolOutput):
+    kind: ClassVar[str] = "ideal_customer_profile"
+    template: ClassVar[Template] = _ICP
+
+    product_description: str
+    current_customers: Optional[str] = None
+    excluded_segments: Optional[str] = None
+
+    def slot_values(self) -> dict:
+        default_exclusions = "- Companies too small to need this\n- Teams without the pain point\n- Orgs with conflicting technology"
+        return {
+            "anti_icp": self.excluded_segments if self.excluded_segments else default_exclusions,
+            "current_customers": (
+                self.current_customers if self.current_customers
+                else "No current customer data provided. Consider customer interviews or survey data."
+            ),
+        }
+
+
+@tool
+def identify_icp(
+    product_description: str,
+    current_customers: Optional[str] = None,
+    excluded_segments: Optional[str] = None,
+) -> str:
+    """
+    Define the Ideal Customer Profile (ICP) for positioning work.
+
+    Use this tool to create a precise definition of who the product
+    is for (and who it's NOT for).
+
+    Args:
+        product_description: What the product does
+        current_customers: Description of existing customers if any
+        excluded_segments: Segments to explicitly exclude
+
+    Returns:
+        Structured ICP definition with targeting criteria
+    """
+    return emit(IdealCustomerProfile(
+        product_description=product_description,
+        current_customers=current_customers,
+        excluded_segments=excluded_segments,
+    ))
@@ -0,0 +1,87 @@
+"""
+Structured Tool Outputs.
+
+Template tools build a typed ToolOutput and hand it to `emit()`, which
+decides what goes back into the conversation:
+
+- markdown (default): the full rendered deliverable, as before.
+- compact (TOOL_OUTPUT_FORMAT=compact): a one-line JSON summary with the
+  output kind, its section outline and any values the tool derived.
+
+The model already has the tool's arguments in the history (they are the
+tool call), so the compact form leaves them out instead of echoing
+kilobytes of skeleton back on every later turn. The markdown is rebuilt
+from the call arguments at the edge, for display only
+(`pmm_agent.tools.render_markdown`).
+"""
+
+import json
+import os
+from typing import Any, ClassVar, Iterator
+
+from pydantic import BaseModel
+
+from .templates import Template
+
+TOOL_OUTPUT_FORMAT = os.getenv("TOOL_OUTPUT_FORMAT", "markdown").lower()
+
+
+def headings(markdown: str) -> list[str]:
+    """Titles of the `###` sections in rendered markdown."""
+    return [
+        line[4:].strip().rstrip(":")
+        for line in markdown.splitlines()
+        if line.startswith("### ")
+    ]
+
+
+class ToolOutput(BaseModel):
+    """
+    Typed result of a template tool.
+
+    Subclasses declare the tool's inputs as fields and set `kind` and
+    `template`; override `slot_values()` when the template needs derived
+    values, and `derived()` for values worth telling the model about.
+    `subject` names the field that tells documents of one kind apart
+    (which competitor a battlecard is for); without it a session has one
+    document per kind, and each new output is a revision of it.
+    """
+
+    kind: ClassVar[str]
+    template: ClassVar[Template]
+    subject: ClassVar[str | None] = None
+
+    def slot_values(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.template.slots}
+
+    def derived(self) -> dict[str, Any]:
+        """Values computed by the tool rather than passed in."""
+        return {}
+
+    def document(self) -> str:
+        """Key of the document this output is a revision of, within a session."""
+        if self.subject is None:
+            return self.kind
+        return f"{self.kind}:{str(getattr(self, self.subject) or '').strip().lower()}"
+
+    def sections(self) -> list[str]:
+        return self.template.headings
+
+    def to_markdown(self) -> str:
+        return self.template.render(**self.slot_values())
+
+    def markdown_sections(self) -> Iterator[str]:
+        """The markdown one `###` section at a time, for outputs streamed as they render."""
+        return self.template.render_sections(**self.slot_values())
+
+    def compact(self) -> str:
+        data = {"kind": self.kind, "sections": self.sections(), **self.derived()}
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def emit(output: ToolOutput) -> str:
+    """The tool result to return, in the configured format."""
+    if TOOL_OUTPUT_FORMAT == "compact":
+        return output.compact()
+    return output.to_markdown()
+
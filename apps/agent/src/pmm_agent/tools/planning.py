@@ -5,38 +5,13 @@ These tools create strategic deliverables for PMM work.
 """
 
 from langchain_core.tools import tool
-from typing import Optional
+from typing import ClassVar, Iterator, Optional
 
+from .outputs import ToolOutput, emit, headings
+from .templates import Template
 
-@tool
-def create_positioning_statement(
-    target_customer: str,
-    problem: str,
-    product_name: str,
-    category: str,
-    key_benefit: str,
-    competitive_alternative: str,
-    differentiator: str,
-) -> str:
-    """
-    Create a positioning statement using the classic framework.
-
-    This is a HUMAN-APPROVAL-REQUIRED tool. The positioning statement
-    will be presented for review before being finalized.
-
-    Args:
-        target_customer: Who the product is for
-        problem: The problem or need they have
-        product_name: Name of the product
-        category: Product category
-        key_benefit: Primary reason to buy
-        competitive_alternative: What they'd use instead
-        differentiator: What makes this unique
 
-    Returns:
-        Formatted positioning statement with variations
-    """
-    return f"""
+_POSITIONING_STATEMENT = Template("""
 ## Positioning Statement
 
 ### Classic Format
@@ -76,29 +51,63 @@ Our product **{differentiator}**
 
 ---
 **REQUIRES HUMAN APPROVAL BEFORE FINALIZING**
-"""
+""")
+
+
+class PositioningStatement(ToolOutput):
+    kind: ClassVar[str] = "positioning_statement"
+    template: ClassVar[Template] = _POSITIONING_STATEMENT
+    subject: ClassVar[str] = "product_name"
+
+    target_customer: str
+    problem: str
+    product_name: str
+    category: str
+    key_benefit: str
+    competitive_alternative: str
+    differentiator: str
 
 
 @tool
-def create_messaging_matrix(
-    positioning: str,
-    audience_segments: str,
-    value_propositions: str,
+def create_positioning_statement(
+    target_customer: str,
+    problem: str,
+    product_name: str,
+    category: str,
+    key_benefit: str,
+    competitive_alternative: str,
+    differentiator: str,
 ) -> str:
     """
-    Create a messaging matrix mapping audiences to messages.
+    Create a positioning statement using the classic framework.
 
-    This is a HUMAN-APPROVAL-REQUIRED tool.
+    This is a HUMAN-APPROVAL-REQUIRED tool. The positioning statement
+    will be presented for review before being finalized.
 
     Args:
-        positioning: The approved positioning statement
-        audience_segments: Different audience segments to message
-        value_propositions: Key value props to include
+        target_customer: Who the product is for
+        problem: The problem or need they have
+        product_name: Name of the product
+        category: Product category
+        key_benefit: Primary reason to buy
+        competitive_alternative: What they'd use instead
+        differentiator: What makes this unique
 
     Returns:
-        Comprehensive messaging matrix
+        Formatted positioning statement with variations
     """
-    return f"""
+    return emit(PositioningStatement(
+        target_customer=target_customer,
+        problem=problem,
+        product_name=product_name,
+        category=category,
+        key_benefit=key_benefit,
+        competitive_alternative=competitive_alternative,
+        differentiator=differentiator,
+    ))
+
+
+_MESSAGING_MATRIX = Template("""
 ## Messaging Matrix
 
 ### Based on Positioning
@@ -123,7 +132,7 @@ def create_messaging_matrix(
 
 | Segment | Pain Point | Value Prop | Proof Point | CTA |
 |---------|------------|------------|-------------|-----|
-| {audience_segments.split(',')[0] if ',' in audience_segments else 'Segment 1'} | [Their pain] | [Our value] | [Evidence] | [Action] |
+| {first_segment} | [Their pain] | [Our value] | [Evidence] | [Action] |
 | Segment 2 | [Their pain] | [Our value] | [Evidence] | [Action] |
 | Segment 3 | [Their pain] | [Our value] | [Evidence] | [Action] |
 
@@ -164,31 +173,52 @@ def create_messaging_matrix(
 
 ---
 **REQUIRES HUMAN APPROVAL BEFORE FINALIZING**
-"""
+""")
+
+
+class MessagingMatrix(ToolOutput):
+    kind: ClassVar[str] = "messaging_matrix"
+    template: ClassVar[Template] = _MESSAGING_MATRIX
+
+    positioning: str
+    audience_segments: str
+    value_propositions: str
+
+    def slot_values(self) -> dict:
+        segments = self.audience_segments
+        return {
+            "positioning": self.positioning,
+            "first_segment": segments.split(',')[0] if ',' in segments else 'Segment 1',
+        }
 
 
 @tool
-def create_battlecard(
-    competitor: str,
-    our_positioning: str,
-    their_positioning: str,
-    our_strengths: str,
-    their_strengths: str,
+def create_messaging_matrix(
+    positioning: str,
+    audience_segments: str,
+    value_propositions: str,
 ) -> str:
     """
-    Create a competitive battlecard for sales enablement.
+    Create a messaging matrix mapping audiences to messages.
+
+    This is a HUMAN-APPROVAL-REQUIRED tool.
 
     Args:
-        competitor: Name of the competitor
-        our_positioning: Our positioning statement
-        their_positioning: Their positioning
-        our_strengths: Where we win
-        their_strengths: Where they're strong
+        positioning: The approved positioning statement
+        audience_segments: Different audience segments to message
+        value_propositions: Key value props to include
 
     Returns:
-        Sales-ready competitive battlecard
+        Comprehensive messaging matrix
     """
-    return f"""
+    return emit(MessagingMatrix(
+        positioning=positioning,
+        audience_segments=audience_segments,
+        value_propositions=value_propositions,
+    ))
+
+
+_BATTLECARD = Template("""
 ## Competitive Battlecard: vs {competitor}
 
 ### Quick Win (30-Second Pitch)
@@ -272,33 +302,52 @@ Questions to ask early that favor us:
 **Why They Chose Us:** [Key reason]
 **Quote:** "[Compelling quote]"
 **Result:** [Outcome/metric]
-"""
+""")
+
+
+class Battlecard(ToolOutput):
+    kind: ClassVar[str] = "battlecard"
+    template: ClassVar[Template] = _BATTLECARD
+    subject: ClassVar[str] = "competitor"
+
+    competitor: str
+    our_positioning: str
+    their_positioning: str
+    our_strengths: str
+    their_strengths: str
 
 
 @tool
-def create_launch_plan(
-    product_name: str,
-    launch_date: str,
-    launch_tier: str,
-    target_audience: str,
-    key_messages: str,
+def create_battlecard(
+    competitor: str,
+    our_positioning: str,
+    their_positioning: str,
+    our_strengths: str,
+    their_strengths: str,
 ) -> str:
     """
-    Create a go-to-market launch plan.
-
-    This is a HUMAN-APPROVAL-REQUIRED tool.
+    Create a competitive battlecard for sales enablement.
 
     Args:
-        product_name: What we're launching
-        launch_date: Target launch date
-        launch_tier: Launch tier (1=Major, 2=Medium, 3=Minor)
-        target_audience: Who this is for
-        key_messages: Core messaging for launch
+        competitor: Name of the competitor
+        our_positioning: Our positioning statement
+        their_positioning: Their positioning
+        our_strengths: Where we win
+        their_strengths: Where they're strong
 
     Returns:
-        Comprehensive launch plan with timeline
+        Sales-ready competitive battlecard
     """
-    return f"""
+    return emit(Battlecard(
+        competitor=competitor,
+        our_positioning=our_positioning,
+        their_positioning=their_positioning,
+        our_strengths=our_strengths,
+        their_strengths=their_strengths,
+    ))
+
+
+_LAUNCH_PLAN = Template("""
 ## Launch Plan: {product_name}
 
 ### Launch Overview
@@ -381,26 +430,56 @@ def create_launch_plan(
 
 ---
 **REQUIRES HUMAN APPROVAL BEFORE FINALIZING**
-"""
+""")
+
+
+class LaunchPlan(ToolOutput):
+    kind: ClassVar[str] = "launch_plan"
+    template: ClassVar[Template] = _LAUNCH_PLAN
+    subject: ClassVar[str] = "product_name"
+
+    product_name: str
+    launch_date: str
+    launch_tier: str
+    target_audience: str
+    key_messages: str
 
 
 @tool
-def create_checklist(
-    task_type: str,
-    context: str,
+def create_launch_plan(
+    product_name: str,
+    launch_date: str,
+    launch_tier: str,
+    target_audience: str,
+    key_messages: str,
 ) -> str:
     """
-    Create a PMM checklist for common workflows.
+    Create a go-to-market launch plan.
+
+    This is a HUMAN-APPROVAL-REQUIRED tool.
 
     Args:
-        task_type: Type of checklist (launch, positioning, competitive, messaging)
-        context: Specific context for the checklist
+        product_name: What we're launching
+        launch_date: Target launch date
+        launch_tier: Launch tier (1=Major, 2=Medium, 3=Minor)
+        target_audience: Who this is for
+        key_messages: Core messaging for launch
 
     Returns:
-        Detailed checklist for the task
+        Comprehensive launch plan with timeline
     """
-    checklists = {
-        "launch": """
+    return emit(LaunchPlan(
+        product_name=product_name,
+        launch_date=launch_date,
+        launch_tier=launch_tier,
+        target_audience=target_audience,
+        key_messages=key_messages,
+    ))
+
+
+# Fixed checklists by task type; anything else gets the custom template
+CHECKLISTS = {
+    "launch": """
 ## Launch Checklist
 
 ### Messaging & Positioning
@@ -435,7 +514,7 @@ def create_checklist(
 - [ ] Customer reference confirmed
 - [ ] Partner communications sent
 """,
-        "positioning": """
+    "positioning": """
 ## Positioning Checklist
 
 ### Research Complete
@@ -463,7 +542,7 @@ def create_checklist(
 - [ ] Sales trained on positioning
 - [ ] Consistent across channels
 """,
-        "competitive": """
+    "competitive": """
 ## Competitive Analysis Checklist
 
 ### Intelligence Gathered
@@ -486,7 +565,7 @@ def create_checklist(
 - [ ] Sales objection guide
 - [ ] Win story documented
 """,
-        "messaging": """
+    "messaging": """
 ## Messaging Checklist
 
 ### Foundation Set
@@ -510,10 +589,10 @@ def create_checklist(
 - [ ] Customer tested
 - [ ] A/B test planned
 - [ ] Legal reviewed (if needed)
-"""
-    }
+""",
+}
 
-    return checklists.get(task_type.lower(), f"""
+_CUSTOM_CHECKLIST = Template("""
 ## Custom Checklist: {task_type}
 
 ### Context
@@ -529,3 +608,54 @@ def create_checklist(
 ### Notes
 Add specific items based on context.
 """)
+
+
+class Checklist(ToolOutput):
+    kind: ClassVar[str] = "checklist"
+    template: ClassVar[Template] = _CUSTOM_CHECKLIST
+    subject: ClassVar[str] = "task_type"
+
+    task_type: str
+    context: str
+
+    def to_markdown(self) -> str:
+        checklist = CHECKLISTS.get(self.task_type.lower())
+        if checklist is not None:
+            return checklist
+        return super().to_markdown()
+
+    def markdown_sections(self) -> Iterator[str]:
+        checklist = CHECKLISTS.get(self.task_type.lower())
+        if checklist is not None:
+            return iter([checklist])
+        return super().markdown_sections()
+
+    def sections(self) -> list[str]:
+        checklist = CHECKLISTS.get(self.task_type.lower())
+        return headings(checklist) if checklist is not None else self.template.headings
+
+    def derived(self) -> dict:
+        if self.task_type.lower() in CHECKLISTS:
+            return {"items": CHECKLISTS[self.task_type.lower()].count("- [ ]")}
+        return {}
+
+
+@tool
+def create_checklist(
+    task_type: str,
+    context: str,
+) -> str:
+    """
+    Create a PMM checklist for common workflows.
+
+    Args:
+        task_type: Type of checklist (launch, positioning, competitive, messaging)
+        context: Specific context for the checklist
+
+    Returns:
+        Detailed checklist for the task
+    """
+    return emit(Checklist(
+        task_type=task_type,
+        context=context,
+    ))
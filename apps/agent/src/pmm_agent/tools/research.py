@@ -28,6 +28,14 @@ COMPETITIVE_INTEL_SOURCES = [
     "Wayback Machine (messaging evolution)",
 ]
 
+# One pooled client for every fetch (and every domain), so repeat fetches
+# reuse connections instead of a TCP and TLS handshake each
+_http = httpx.Client(
+    timeout=10.0,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+)
+
 
 @tool
 def search_competitors(
@@ -178,11 +186,10 @@ def fetch_url(url: str) -> str:
         Page content and analysis
     """
     try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(url, follow_redirects=True)
-            content = response.text[:5000]  # Limit for context
+        response = _http.get(url)
+        content = response.text[:5000]  # Limit for context
 
-            return f"""
+        return f"""
 ## URL Analysis: {url}
 
 ### Status: {response.status_code}
@@ -6,38 +6,19 @@ messaging, and go-to-market strategy.
 """
 
 from langchain_core.tools import tool
-from typing import Optional
+from typing import ClassVar, Optional
 
+from .outputs import ToolOutput, emit
+from .templates import Template
 
-@tool
-def assess_market_risks(
-    positioning: str,
-    target_market: str,
-    competitive_context: str,
-    launch_timeline: Optional[str] = None,
-) -> str:
-    """
-    Assess market risks for positioning and GTM strategy.
-
-    Use this tool to surface potential problems before they
-    become launch-day disasters.
-
-    Args:
-        positioning: Current positioning statement
-        target_market: Target market and ICP
-        competitive_context: Competitive landscape
-        launch_timeline: Planned launch timing if applicable
 
-    Returns:
-        Risk assessment with mitigation strategies
-    """
-    return f"""
+_MARKET_RISKS = Template("""
 ## Market Risk Assessment
 
 ### Context
-- **Positioning:** {positioning[:200]}...
+- **Positioning:** {positioning_excerpt}...
 - **Target Market:** {target_market}
-- **Timeline:** {launch_timeline if launch_timeline else "Not specified"}
+- **Timeline:** {launch_timeline}
 
 ---
 
@@ -132,36 +113,64 @@ def assess_market_risks(
 **Ongoing:**
 1. [Monitoring setup]
 2. [Response playbook]
-"""
+""")
+
+
+class MarketRiskAssessment(ToolOutput):
+    kind: ClassVar[str] = "market_risk_assessment"
+    template: ClassVar[Template] = _MARKET_RISKS
+
+    positioning: str
+    target_market: str
+    competitive_context: str
+    launch_timeline: Optional[str] = None
+
+    def slot_values(self) -> dict:
+        return {
+            "positioning_excerpt": self.positioning[:200],
+            "target_market": self.target_market,
+            "launch_timeline": self.launch_timeline if self.launch_timeline else "Not specified",
+            "competitive_context": self.competitive_context,
+        }
 
 
 @tool
-def validate_positioning(
+def assess_market_risks(
     positioning: str,
-    validation_method: str,
-    results: Optional[str] = None,
+    target_market: str,
+    competitive_context: str,
+    launch_timeline: Optional[str] = None,
 ) -> str:
     """
-    Validate positioning with customers or market data.
+    Assess market risks for positioning and GTM strategy.
 
-    Use this tool to structure positioning validation
-    and interpret results.
+    Use this tool to surface potential problems before they
+    become launch-day disasters.
 
     Args:
-        positioning: The positioning to validate
-        validation_method: How we're validating (interviews, surveys, A/B test)
-        results: Results if validation has been done
+        positioning: Current positioning statement
+        target_market: Target market and ICP
+        competitive_context: Competitive landscape
+        launch_timeline: Planned launch timing if applicable
 
     Returns:
-        Validation framework and interpretation
+        Risk assessment with mitigation strategies
     """
-    return f"""
+    return emit(MarketRiskAssessment(
+        positioning=positioning,
+        target_market=target_market,
+        competitive_context=competitive_context,
+        launch_timeline=launch_timeline,
+    ))
+
+
+_POSITIONING_VALIDATION = Template("""
 ## Positioning Validation
 
 ### Positioning Under Test
 {positioning}
 
-### Validation Method: {validation_method.upper()}
+### Validation Method: {validation_method}
 
 ---
 
@@ -200,7 +209,7 @@ def validate_positioning(
 ---
 
 ### Results Interpretation
-{results if results else "Results not yet available. Complete validation and add results."}
+{results}
 
 **Score Card:**
 
@@ -230,29 +239,53 @@ def validate_positioning(
 **If Failing on Differentiator:**
 - Find stronger proof points
 - Identify more defensible unique value
-"""
+""")
+
+
+class PositioningValidation(ToolOutput):
+    kind: ClassVar[str] = "positioning_validation"
+    template: ClassVar[Template] = _POSITIONING_VALIDATION
+
+    positioning: str
+    validation_method: str
+    results: Optional[str] = None
+
+    def slot_values(self) -> dict:
+        return {
+            "positioning": self.positioning,
+            "validation_method": self.validation_method.upper(),
+            "results": self.results if self.results else "Results not yet available. Complete validation and add results.",
+        }
 
 
 @tool
-def identify_gaps(
-    current_state: str,
-    desired_state: str,
-    resources_available: Optional[str] = None,
+def validate_positioning(
+    positioning: str,
+    validation_method: str,
+    results: Optional[str] = None,
 ) -> str:
     """
-    Identify gaps between current and desired positioning/messaging state.
+    Validate positioning with customers or market data.
 
-    Use this tool to create a clear action plan for PMM improvements.
+    Use this tool to structure positioning validation
+    and interpret results.
 
     Args:
-        current_state: Where we are now
-        desired_state: Where we want to be
-        resources_available: What we have to work with
+        positioning: The positioning to validate
+        validation_method: How we're validating (interviews, surveys, A/B test)
+        results: Results if validation has been done
 
     Returns:
-        Gap analysis with prioritized action plan
+        Validation framework and interpretation
     """
-    return f"""
+    return emit(PositioningValidation(
+        positioning=positioning,
+        validation_method=validation_method,
+        results=results,
+    ))
+
+
+_GAP_ANALYSIS = Template("""
 ## Gap Analysis
 
 ### Current State
@@ -277,7 +310,7 @@ def identify_gaps(
 ---
 
 ### Resource Assessment
-{resources_available if resources_available else "Resources not specified. Assuming standard PMM capacity."}
+{resources_available}
 
 **Available:**
 - [ ] Time: [Hours/weeks available]
@@ -334,4 +367,49 @@ Based on the gap analysis, the recommended path forward is:
 3. **Defer:** [Lower priority items]
 
 **Rationale:** [Why this prioritization makes sense]
-"""
+""")
+
+
+class GapAnalysis(ToolOutput):
+    kind: ClassVar[str] = "gap_analysis"
+    template: ClassVar[Template] = _GAP_ANALYSIS
+
+    current_state: str
+    desired_state: str
+    resources_available: Optional[str] = None
+
+    def slot_values(self) -> dict:
+        return {
+            "current_state": self.current_state,
+            "desired_state": self.desired_state,
+            "resources_available": (
+                self.resources_available if self.resources_available
+                else "Resources not specified. Assuming standard PMM capacity."
+            ),
+        }
+
+
+@tool
+def identify_gaps(
+    current_state: str,
+    desired_state: str,
+    resources_available: Optional[str] = None,
+) -> str:
+    """
+    Identify gaps between current and desired positioning/messaging state.
+
+    Use this tool to create a clear action plan for PMM improvements.
+
+    Args:
+        current_state: Where we are now
+        desired_state: Where we want to be
+        resources_available: What we have to work with
+
+    Returns:
+        Gap analysis with prioritized action plan
+    """
+    return emit(GapAnalysis(
+        current_state=current_state,
+        desired_state=desired_state,
+        resources_available=resources_available,
+    ))
@@ -0,0 +1,86 @@
+"""
+Precompiled Output Templates.
+
+Tool outputs are mostly fixed markdown with a few values dropped in.
+A Template is parsed once at import into a list of literal segments and
+named slots. Rendering fills the slots into a copy of that list and joins
+it once, so it never re-parses the template or rebuilds the literal text.
+
+The list is also split at `###` headings, so long outputs (bulk
+battlecards, launch plans) can be produced a section at a time with
+`render_sections()`.
+"""
+
+import keyword
+import re
+from string import Formatter
+from typing import Iterator
+
+_HEADING = re.compile(r"(?m)^### ([^\n\0]*)")
+_SECTION = re.compile(r"(?m)^(?=### )")
+
+
+class Template:
+    """
+    A `str.format`-style template with plain `{name}` slots.
+
+    Slots must be bare names; compute derived values (truncation,
+    defaults, upper-casing) before rendering. Literal braces are written
+    `{{` and `}}` as with str.format.
+    """
+
+    def __init__(self, source: str):
+        parts: list[str] = []
+        fields: list[tuple[int, str]] = []  # (index in parts, slot name)
+        starts = [0]  # index in parts of each section's first segment
+        line_start = True
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is not None and (
+                not field.isidentifier() or keyword.iskeyword(field) or spec or conversion
+            ):
+                raise ValueError(f"Template slots must be plain names, got {{{field}}}")
+            # Literals are cut before each heading that starts a line
+            offset = 0
+            for piece in _SECTION.split(literal):
+                if not piece:
+                    continue
+                at_line_start = bool(offset) or line_start
+                if piece.startswith("### ") and at_line_start and len(parts) > starts[-1]:
+                    starts.append(len(parts))
+                parts.append(piece)
+                offset += len(piece)
+            if literal:
+                line_start = literal.endswith("\n")
+            if field:
+                fields.append((len(parts), field))
+                parts.append("")
+                line_start = False
+        self._parts = parts
+        self._fields = fields
+        self.slots = frozenset(field for _, field in fields)
+
+        # Each section's own segments, with its slots' positions relative to them
+        ends = [*starts[1:], len(parts)]
+        self._sections = [
+            (parts[start:end], [(i - start, field) for i, field in fields if start <= i < end])
+            for start, end in zip(starts, ends)
+        ]
+
+        # Headings are the literal text of each `###` line, up to its first slot
+        slot_at = dict(fields)
+        outline = "".join("\0" if i in slot_at else part for i, part in enumerate(parts))
+        self.headings = [match.strip().rstrip(":") for match in _HEADING.findall(outline)]
+
+    def render(self, **values) -> str:
+        parts = self._parts.copy()
+        for i, field in self._fields:
+            parts[i] = format(values[field])
+        return "".join(parts)
+
+    def render_sections(self, **values) -> Iterator[str]:
+        """Yield the output one `###` section at a time; joined, they equal `render()`."""
+        for literals, fields in self._sections:
+            parts = literals.copy()
+            for i, field in fields:
+                parts[i] = format(values[field])
+            yield "".join(parts)
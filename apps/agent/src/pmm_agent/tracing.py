@@ -0,0 +1,244 @@
+"""
+In-Process Tracing.
+
+OpenTelemetry spans for each request, model call and tool execution,
+tagged with the session ID, so one slow turn can be followed down to the
+step that made it slow. Spans go to a local JSON-lines file or an OTLP
+collector; nothing is sent to LangSmith.
+
+Requires the `tracing` extra (opentelemetry-sdk). Without it, or with
+TRACE_EXPORTER unset, every helper here is a no-op.
+
+    TRACE_EXPORTER=file TRACE_FILE=traces.jsonl   # one span per line
+    TRACE_EXPORTER=otlp OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # tracing extra not installed
+    trace = None
+
+_parent: ContextVar[Any] = ContextVar("trace_parent", default=None)
+_session: ContextVar[str | None] = ContextVar("trace_session", default=None)
+_tracer = None
+
+
+class _NullSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def set_status(self, status: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def configure_tracing(exporter: str | None = None) -> bool:
+    """
+    Install a tracer provider for the configured exporter.
+
+    Args:
+        exporter: "file" or "otlp"; defaults to the TRACE_EXPORTER env var
+
+    Returns:
+        Whether tracing is active
+    """
+    global _tracer
+    if exporter is None and _tracer is not None:
+        return True  # already configured from the environment
+    exporter = (exporter if exporter is not None else os.getenv("TRACE_EXPORTER", "")).lower()
+    if not exporter or trace is None:
+        return False
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if exporter == "file":
+        span_exporter = JsonLinesSpanExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        span_exporter = OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown TRACE_EXPORTER: {exporter}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "pmm-agent"}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    _tracer = provider.get_tracer("pmm_agent")
+    return True
+
+
+if trace is not None:
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """Appends each finished span to a file as one line of JSON."""
+
+        def __init__(self, path: str):
+            self.path = path
+
+        def export(self, spans) -> "SpanExportResult":
+            with open(self.path, "a") as f:
+                for finished in spans:
+                    f.write(finished.to_json(indent=None) + "\n")
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+
+def start_span(name: str, parent: Any = None, **attributes):
+    """Start a span under `parent`, or under the current request span."""
+    if _tracer is None:
+        return NULL_SPAN
+    new_span = _tracer.start_span(name, context=parent if parent is not None else _parent.get())
+    session_id = _session.get()
+    if session_id:
+        new_span.set_attribute("session.id", session_id)
+    for key, value in attributes.items():
+        if value is not None:
+            new_span.set_attribute(key, value)
+    return new_span
+
+
+def end_span(span, error: BaseException | None = None) -> None:
+    if error is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+    span.end()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator:
+    """
+    Record a child span of the current request around a block.
+
+    Parenting goes through a context variable rather than OpenTelemetry's
+    attached context, so it is safe to hold across `yield` in a streaming
+    generator.
+    """
+    current = start_span(name, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, e)
+        raise
+    else:
+        end_span(current)
+
+
+@contextmanager
+def request_span(name: str, session_id: str, **attributes) -> Iterator:
+    """Root span for one request; spans started inside it become children."""
+    session_token = _session.set(session_id)
+    parent_token = None
+    try:
+        with span(name, **attributes) as root:
+            if _tracer is not None:
+                parent_token = _parent.set(trace.set_span_in_context(root))
+            yield root
+    finally:
+        # Otherwise the next request in this task (or tasks it starts) nests under this one
+        if parent_token is not None:
+            _parent.reset(parent_token)
+        _session.reset(session_token)
+
+
+def span_context(current) -> Any:
+    """OpenTelemetry context with `current` as the parent, for start_span()."""
+    if _tracer is None:
+        return None
+    return trace.set_span_in_context(current)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Spans for LangGraph agent runs (`create_react_agent` graphs).
+
+    Pass it in the run config: `agent.ainvoke(state, config={"callbacks":
+    [TracingCallbackHandler(session_id)]})`. The graph run becomes the
+    root span; each model call and tool execution is a child of it.
+    """
+
+    def __init__(self, session_id: str | None = None):
+        self.session_id = session_id
+        self.spans: dict[UUID, Any] = {}
+        self.root: dict[UUID, Any] = {}
+
+    def _start(self, run_id: UUID, parent_run_id: UUID | None, name: str, **attributes) -> None:
+        root = self.root.get(parent_run_id) if parent_run_id else None
+        parent = span_context(root) if root is not None else None
+        if self.session_id:
+            attributes["session.id"] = self.session_id
+        self.spans[run_id] = start_span(name, parent=parent, **attributes)
+
+    def _end(self, run_id: UUID, error: BaseException | None = None, **attributes) -> None:
+        current = self.spans.pop(run_id, None)
+        if current is None:
+            return
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, value)
+        end_span(current, error)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._start(run_id, None, "agent.run")
+            self.root[run_id] = self.spans[run_id]
+        else:
+            # Nested graph nodes share the root so models/tools nest under it
+            self.root[run_id] = self.root.get(parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self.root.pop(run_id, None)
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.root.pop(run_id, None)
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        model = (kwargs.get("metadata") or {}).get("ls_model_name")
+        self._start(run_id, parent_run_id, "model.call", **{"llm.model": model})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        self._end(
+            run_id,
+            **{
+                "llm.input_tokens": usage.get("input_tokens"),
+                "llm.output_tokens": usage.get("output_tokens"),
+            },
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, f"tool {name}", **{"tool.name": name})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
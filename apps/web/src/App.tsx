@@ -16,6 +16,7 @@ import {
   User,
   Command,
   MessageSquare,
+  Square,
   Swords,
   TrendingUp,
 } from "lucide-react";
@@ -116,8 +117,159 @@ interface ToolCall {
   name: string;
   args: Record<string, unknown>;
   status: "pending" | "running" | "completed";
+  markdown?: string;
 }
 
+// =============================================================================
+// WEBSOCKET CHANNEL
+// =============================================================================
+
+// Every turn shares one socket, multiplexed by stream id. The server sends a
+// stream at most WS_WINDOW events beyond the credit we have granted it.
+const WS_URL = API_URL.replace(/^http/, "ws") + "/ws";
+const WS_WINDOW = 64;
+
+class ChannelUnavailable extends Error {}
+
+interface ChannelStream {
+  onEvent: (data: any) => void;
+  resolve: () => void;
+  reject: (err: Error) => void;
+  received: number;
+  retries: number;
+  lastEventId: string | null;
+  sessionId: string | null;
+}
+
+class ChatChannel {
+  private socket: WebSocket | null = null;
+  private opening: Promise<WebSocket> | null = null;
+  private streams = new Map<string, ChannelStream>();
+  private unavailable = false;
+  onPush: ((message: any) => void) | null = null;
+
+  private open(): Promise<WebSocket> {
+    if (this.socket?.readyState === WebSocket.OPEN) return Promise.resolve(this.socket);
+    if (this.unavailable) return Promise.reject(new ChannelUnavailable("WebSocket unavailable"));
+    if (!this.opening) {
+      this.opening = new Promise((resolve, reject) => {
+        const socket = new WebSocket(WS_URL);
+        socket.onopen = () => {
+          this.socket = socket;
+          this.opening = null;
+          resolve(socket);
+        };
+        socket.onerror = () => {
+          // Never connected: don't keep retrying the socket before every turn
+          if (this.socket !== socket) this.unavailable = true;
+          this.opening = null;
+          reject(new ChannelUnavailable("WebSocket unavailable"));
+        };
+        socket.onmessage = (e) => this.receive(JSON.parse(e.data));
+        socket.onclose = () => this.dropped(socket);
+      });
+    }
+    return this.opening;
+  }
+
+  private send(message: object) {
+    this.socket?.send(JSON.stringify(message));
+  }
+
+  private receive(message: any) {
+    if (message.type === "push") {
+      this.onPush?.(message);
+      return;
+    }
+    const stream = this.streams.get(message.stream);
+    if (!stream) return;
+    if (message.event) {
+      stream.lastEventId = message.id;
+      stream.onEvent(message.event);
+      // Grant credit as we go so the stream never has to stall
+      if (++stream.received % (WS_WINDOW / 2) === 0) {
+        this.send({ type: "credit", stream: message.stream, n: WS_WINDOW / 2 });
+      }
+    } else if (message.type === "started") {
+      stream.sessionId = message.session_id;
+      stream.onEvent({ type: "started", session_id: message.session_id });
+    } else if (message.type === "end") {
+      this.streams.delete(message.stream);
+      stream.resolve();
+    } else if (message.type === "error") {
+      this.streams.delete(message.stream);
+      stream.reject(new Error(`Error ${message.status}: ${JSON.stringify(message.detail)}`));
+    }
+  }
+
+  // Turns keep running on the server when the socket drops; resume them on a new one
+  private async dropped(socket: WebSocket) {
+    if (this.socket !== socket) return;
+    this.socket = null;
+    for (const [id, stream] of this.streams) {
+      if (!stream.lastEventId || !stream.sessionId || stream.retries++ >= 3) {
+        this.streams.delete(id);
+        stream.reject(new Error("Connection lost"));
+      }
+    }
+    if (!this.streams.size) return;
+    await new Promise((resolve) => setTimeout(resolve, 500));
+    try {
+      await this.open();
+      for (const [id, stream] of this.streams) {
+        this.send({
+          type: "resume",
+          stream: id,
+          session_id: stream.sessionId,
+          last_event_id: stream.lastEventId,
+        });
+      }
+    } catch (err) {
+      for (const stream of this.streams.values()) stream.reject(err as Error);
+      this.streams.clear();
+    }
+  }
+
+  // Start a turn; `done` rejects with ChannelUnavailable if no socket could be opened
+  run(body: object, onEvent: (data: any) => void) {
+    return this.attach({ type: "turn", ...body }, onEvent);
+  }
+
+  // Follow a turn started elsewhere, e.g. a reviewer's approval, from its first event
+  follow(sessionId: string, turnId: string, onEvent: (data: any) => void) {
+    return this.attach(
+      { type: "resume", session_id: sessionId, last_event_id: `${turnId}:-1` },
+      onEvent
+    );
+  }
+
+  private attach(message: object, onEvent: (data: any) => void) {
+    const streamId = crypto.randomUUID();
+    const done = this.open().then(
+      (socket) =>
+        new Promise<void>((resolve, reject) => {
+          this.streams.set(streamId, {
+            onEvent,
+            resolve,
+            reject,
+            received: 0,
+            retries: 0,
+            lastEventId: null,
+            sessionId: null,
+          });
+          socket.send(JSON.stringify({ stream: streamId, ...message }));
+        })
+    );
+    return { streamId, done };
+  }
+
+  cancel(streamId: string) {
+    this.send({ type: "cancel", stream: streamId });
+  }
+}
+
+const channel = new ChatChannel();
+
 // =============================================================================
 // COMPONENTS
 // =============================================================================
@@ -151,7 +303,7 @@ function ToolCallDisplay({ toolCall }: { toolCall: ToolCall }) {
     <motion.div
       initial={{ opacity: 0, y: -10, scale: 0.95 }}
       animate={{ opacity: 1, y: 0, scale: 1 }}
-      className={`flex items-center gap-3 text-sm bg-slate-800/80 backdrop-blur rounded-lg px-4 py-2.5 border border-slate-700/50`}
+      className={`flex flex-wrap items-center gap-3 text-sm bg-slate-800/80 backdrop-blur rounded-lg px-4 py-2.5 border border-slate-700/50`}
     >
       {isRunning ? (
         <Loader2 className={`w-4 h-4 animate-spin text-${config.color}-400`} />
@@ -160,6 +312,14 @@ function ToolCallDisplay({ toolCall }: { toolCall: ToolCall }) {
       )}
       <Icon className={`w-4 h-4 text-${config.color}-400`} />
       <span className="font-medium text-slate-200">{config.label}</span>
+      {toolCall.markdown && (
+        <details className="basis-full mt-1">
+          <summary className="cursor-pointer text-xs text-slate-400">Show output</summary>
+          <div className="prose prose-invert prose-sm max-w-none mt-2">
+            <Markdown remarkPlugins={[remarkGfm]}>{toolCall.markdown}</Markdown>
+          </div>
+        </details>
+      )}
     </motion.div>
   );
 }
@@ -318,6 +478,7 @@ export default function App() {
   const [isLoading, setIsLoading] = useState(false);
   const [sessionId, setSessionId] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const [activeStream, setActiveStream] = useState<string | null>(null);
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -326,6 +487,57 @@ export default function App() {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
+  // Results of background work, e.g. a reviewer approving a held tool call
+  useEffect(() => {
+    channel.onPush = (message) => {
+      if (!sessionId || message.session_id !== sessionId) return;
+      if (message.event.type !== "approval_decided") return;
+      // The continuation is a turn of its own; stream it into a new assistant message
+      const id = crypto.randomUUID();
+      let continuation: Message = { id, role: "assistant", content: "", toolCalls: [] };
+      const update = (next: Message) => {
+        continuation = next;
+        setMessages((prev) => prev.map((m) => (m.id === id ? next : m)));
+      };
+      setMessages((prev) => [...prev, continuation]);
+      const { done } = channel.follow(sessionId, message.event.turn_id, (data) => {
+        if (data.type === "text") {
+          update({ ...continuation, content: continuation.content + data.content });
+        } else if (data.type === "tool_call") {
+          const toolCall: ToolCall = {
+            id: crypto.randomUUID(),
+            name: data.name,
+            args: data.args,
+            status: "running",
+          };
+          update({ ...continuation, toolCalls: [...(continuation.toolCalls || []), toolCall] });
+        } else if (data.type === "tool_result") {
+          // Approved calls only report their result; later rounds also announce the call
+          const toolCalls = [...(continuation.toolCalls || [])];
+          const index = toolCalls.findIndex(
+            (tc) => tc.name === data.name && tc.status === "running"
+          );
+          const completed = { status: "completed" as const, markdown: data.markdown ?? undefined };
+          if (index >= 0) {
+            toolCalls[index] = { ...toolCalls[index], ...completed };
+          } else {
+            toolCalls.push({ id: crypto.randomUUID(), name: data.name, args: {}, ...completed });
+          }
+          update({ ...continuation, toolCalls });
+        } else if (data.type === "done" || data.type === "cancelled") {
+          update({
+            ...continuation,
+            toolCalls: continuation.toolCalls?.map((tc) => ({
+              ...tc,
+              status: "completed" as const,
+            })),
+          });
+        }
+      });
+      done.catch((err) => setError(err instanceof Error ? err.message : String(err)));
+    };
+  }, [sessionId]);
+
   const sendMessage = useCallback(
     async (content: string) => {
       if (!content.trim() || isLoading) return;
@@ -351,90 +563,154 @@ export default function App() {
       };
       setMessages((prev) => [...prev, assistantMessage]);
 
-      try {
-        const response = await fetch(`${API_URL}/chat/stream`, {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            message: content.trim(),
-            session_id: sessionId,
-          }),
-        });
-
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
+      const handleEvent = (data: any) => {
+        if (data.type === "started") {
+          setSessionId(data.session_id);
+        } else if (data.type === "text") {
+          assistantMessage = {
+            ...assistantMessage,
+            content: assistantMessage.content + data.content,
+          };
+          setMessages((prev) => [
+            ...prev.slice(0, -1),
+            assistantMessage,
+          ]);
+        } else if (data.type === "tool_call") {
+          const toolCall: ToolCall = {
+            id: crypto.randomUUID(),
+            name: data.name,
+            args: data.args,
+            status: "running",
+          };
+          assistantMessage = {
+            ...assistantMessage,
+            toolCalls: [...(assistantMessage.toolCalls || []), toolCall],
+          };
+          setMessages((prev) => [
+            ...prev.slice(0, -1),
+            assistantMessage,
+          ]);
+        } else if (data.type === "tool_result") {
+          // Complete the oldest running call to this tool
+          const index = (assistantMessage.toolCalls || []).findIndex(
+            (tc) => tc.name === data.name && tc.status === "running"
+          );
+          if (index >= 0) {
+            const toolCalls = [...(assistantMessage.toolCalls || [])];
+            toolCalls[index] = {
+              ...toolCalls[index],
+              status: "completed" as const,
+              markdown: data.markdown ?? undefined,
+            };
+            assistantMessage = { ...assistantMessage, toolCalls };
+            setMessages((prev) => [
+              ...prev.slice(0, -1),
+              assistantMessage,
+            ]);
+          }
+        } else if (data.type === "done" || data.type === "cancelled") {
+          if (data.session_id) {
+            setSessionId(data.session_id);
+          }
+          // Mark all tool calls as completed
+          if (assistantMessage.toolCalls?.length) {
+            assistantMessage = {
+              ...assistantMessage,
+              toolCalls: assistantMessage.toolCalls.map((tc) => ({
+                ...tc,
+                status: "completed" as const,
+              })),
+            };
+            setMessages((prev) => [
+              ...prev.slice(0, -1),
+              assistantMessage,
+            ]);
+          }
         }
+      };
 
-        const reader = response.body?.getReader();
-        const decoder = new TextDecoder();
+      const body = { message: content.trim(), session_id: sessionId };
+
+      const streamOverSse = async () => {
+        // The server keeps the turn running if we drop; reconnect with
+        // Last-Event-ID to resume it instead of re-sending the message.
+        let streamSessionId = sessionId;
+        let lastEventId: string | null = null;
+        let finished = false;
+
+        for (let attempt = 0; !finished; attempt++) {
+          try {
+            const response = await fetch(`${API_URL}/chat/stream`, {
+              method: "POST",
+              headers: {
+                "Content-Type": "application/json",
+                ...(lastEventId ? { "Last-Event-ID": lastEventId } : {}),
+              },
+              body: JSON.stringify({ ...body, session_id: streamSessionId }),
+            });
+
+            if (!response.ok) {
+              throw new Error(`HTTP error! status: ${response.status}`);
+            }
 
-        if (!reader) {
-          throw new Error("No response body");
-        }
+            streamSessionId = response.headers.get("X-Session-Id") || streamSessionId;
+
+            const reader = response.body?.getReader();
+            const decoder = new TextDecoder();
+
+            if (!reader) {
+              throw new Error("No response body");
+            }
 
-        while (true) {
-          const { done, value } = await reader.read();
-          if (done) break;
-
-          const chunk = decoder.decode(value);
-          const lines = chunk.split("\n\n");
-
-          for (const line of lines) {
-            if (line.startsWith("data: ")) {
-              try {
-                const data = JSON.parse(line.slice(6));
-
-                if (data.type === "text") {
-                  assistantMessage = {
-                    ...assistantMessage,
-                    content: assistantMessage.content + data.content,
-                  };
-                  setMessages((prev) => [
-                    ...prev.slice(0, -1),
-                    assistantMessage,
-                  ]);
-                } else if (data.type === "tool_call") {
-                  const toolCall: ToolCall = {
-                    id: crypto.randomUUID(),
-                    name: data.name,
-                    args: data.args,
-                    status: "running",
-                  };
-                  assistantMessage = {
-                    ...assistantMessage,
-                    toolCalls: [...(assistantMessage.toolCalls || []), toolCall],
-                  };
-                  setMessages((prev) => [
-                    ...prev.slice(0, -1),
-                    assistantMessage,
-                  ]);
-                } else if (data.type === "done") {
-                  if (data.session_id) {
-                    setSessionId(data.session_id);
+            let buffer = "";
+            while (true) {
+              const { done, value } = await reader.read();
+              if (done) break;
+
+              buffer += decoder.decode(value, { stream: true });
+              const frames = buffer.split("\n\n");
+              buffer = frames.pop() || "";
+
+              for (const frame of frames) {
+                let data: any = null;
+                for (const line of frame.split("\n")) {
+                  if (line.startsWith("id: ")) {
+                    lastEventId = line.slice(4);
+                  } else if (line.startsWith("data: ")) {
+                    try {
+                      data = JSON.parse(line.slice(6));
+                    } catch (e) {
+                      // Skip invalid JSON
+                    }
                   }
-                  // Mark all tool calls as completed
-                  if (assistantMessage.toolCalls?.length) {
-                    assistantMessage = {
-                      ...assistantMessage,
-                      toolCalls: assistantMessage.toolCalls.map((tc) => ({
-                        ...tc,
-                        status: "completed" as const,
-                      })),
-                    };
-                    setMessages((prev) => [
-                      ...prev.slice(0, -1),
-                      assistantMessage,
-                    ]);
+                }
+                if (data) {
+                  handleEvent(data);
+                  if (data.type === "done" || data.type === "error") {
+                    finished = true;
                   }
                 }
-              } catch (e) {
-                // Skip invalid JSON
               }
             }
+            finished = true;
+          } catch (err) {
+            // Only network drops mid-turn are resumable
+            if (!lastEventId || !streamSessionId || attempt >= 3) throw err;
+            await new Promise((resolve) => setTimeout(resolve, 500 * (attempt + 1)));
           }
         }
+      };
+
+      try {
+        try {
+          const { streamId, done } = channel.run(body, handleEvent);
+          setActiveStream(streamId);
+          await done;
+        } catch (err) {
+          // Fall back to one request per turn where WebSockets don't get through
+          if (!(err instanceof ChannelUnavailable)) throw err;
+          await streamOverSse();
+        }
       } catch (err) {
         console.error("Stream error:", err);
         setError(err instanceof Error ? err.message : "An error occurred");
@@ -442,6 +718,7 @@ export default function App() {
         setMessages((prev) => prev.slice(0, -1));
       } finally {
         setIsLoading(false);
+        setActiveStream(null);
       }
     },
     [sessionId, isLoading]
@@ -525,6 +802,15 @@ export default function App() {
               rows={1}
               style={{ minHeight: "56px", maxHeight: "200px" }}
             />
+            {activeStream && (
+              <button
+                onClick={() => channel.cancel(activeStream)}
+                title="Stop generating"
+                className="px-4 py-2 bg-slate-800 border border-slate-700 text-slate-300 rounded-xl hover:bg-slate-700 transition-colors flex items-center"
+              >
+                <Square className="w-4 h-4" />
+              </button>
+            )}
             <button
               onClick={handleSubmit}
               disabled={isLoading || !input.trim()}